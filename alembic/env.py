@@ -21,6 +21,19 @@ if config.config_file_name is not None:
 # Set target_metadata for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Tables the app creates outside the metadata: the SQLite FTS5 search
+# table with its shadow tables (books_fts_data, ...), and the yearly
+# loans_archive partitions on Postgres. Autogenerate would otherwise
+# report them as removed and drop them.
+UNMANAGED_TABLE_PREFIXES = ("books_fts", "loans_archive_y")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and reflected and compare_to is None and name.startswith(UNMANAGED_TABLE_PREFIXES):
+        return False
+    return True
+
+
 # Get database URL from environment variable
 from dotenv import load_dotenv
 load_dotenv()  # loads variables from .env
@@ -33,6 +46,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -50,7 +64,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,36 @@
+"""Loan lookup indexes
+
+Revision ID: 9b1d4c7e2a10
+Revises: 383b84942ab4
+Create Date: 2026-10-18 10:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1d4c7e2a10'
+down_revision: Union[str, Sequence[str], None] = '383b84942ab4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_loans_user_id_status_id', 'loans', ['user_id', 'status', 'id'], unique=False)
+    op.create_index('ix_loans_book_id_status_id', 'loans', ['book_id', 'status', 'id'], unique=False)
+    op.create_index(
+        'ix_loans_active_id', 'loans', ['id'], unique=False,
+        postgresql_where=sa.text("status = 'BORROWED'"),
+        sqlite_where=sa.text("status = 'BORROWED'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_loans_active_id', table_name='loans')
+    op.drop_index('ix_loans_book_id_status_id', table_name='loans')
+    op.drop_index('ix_loans_user_id_status_id', table_name='loans')
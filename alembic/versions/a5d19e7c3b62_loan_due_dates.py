@@ -0,0 +1,51 @@
+"""Loan due dates and the overdue index
+
+Revision ID: a5d19e7c3b62
+Revises: f2b6c8d41a93
+Create Date: 2026-10-18 16:11:48.630215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d19e7c3b62'
+down_revision: Union[str, Sequence[str], None] = 'f2b6c8d41a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# LOAN_PERIOD_DAYS when due dates were introduced; existing loans get it
+LOAN_PERIOD_DAYS = 14
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('loans', sa.Column('due_date', sa.DateTime(), nullable=True))
+    op.add_column('loans', sa.Column('overdue_notified_at', sa.DateTime(), nullable=True))
+    op.add_column('loans_archive', sa.Column('due_date', sa.DateTime(), nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        due = f"borrow_date + interval '{LOAN_PERIOD_DAYS} days'"
+    else:
+        due = f"datetime(borrow_date, '+{LOAN_PERIOD_DAYS} days')"
+    op.execute(f"UPDATE loans SET due_date = {due}")
+    op.execute(f"UPDATE loans_archive SET due_date = {due}")
+
+    op.create_index(
+        'ix_loans_active_due_date', 'loans', ['due_date', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'BORROWED'"),
+        sqlite_where=sa.text("status = 'BORROWED'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_loans_active_due_date', table_name='loans')
+    with op.batch_alter_table('loans_archive') as batch_op:
+        batch_op.drop_column('due_date')
+    with op.batch_alter_table('loans') as batch_op:
+        batch_op.drop_column('overdue_notified_at')
+        batch_op.drop_column('due_date')
@@ -0,0 +1,32 @@
+"""Partial index for the overdue scan
+
+Revision ID: a8c2e6f13b59
+Revises: e1c5b7d94f28
+Create Date: 2026-10-18 23:05:42.187305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c2e6f13b59'
+down_revision: Union[str, Sequence[str], None] = 'e1c5b7d94f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_loans_unnotified_due_date', 'loans', ['due_date', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'BORROWED' AND overdue_notified_at IS NULL"),
+        sqlite_where=sa.text("status = 'BORROWED' AND overdue_notified_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_loans_unnotified_due_date', table_name='loans')
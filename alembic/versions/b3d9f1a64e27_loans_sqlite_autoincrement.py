@@ -0,0 +1,40 @@
+"""Never reuse loan ids on SQLite
+
+Revision ID: b3d9f1a64e27
+Revises: a8c2e6f13b59
+Create Date: 2026-10-19 09:12:37.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9f1a64e27'
+down_revision: Union[str, Sequence[str], None] = 'a8c2e6f13b59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Postgres already draws loan ids from a sequence that never goes back.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    with op.batch_alter_table('loans', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    # start after every id handed out so far, archived ones included
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'loans'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'loans', max("
+        "coalesce((SELECT max(id) FROM loans), 0), coalesce((SELECT max(id) FROM loans_archive), 0))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    with op.batch_alter_table('loans', recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+        pass
@@ -0,0 +1,33 @@
+"""Row versions for ETags and optimistic concurrency
+
+Revision ID: b8e0f4a27c15
+Revises: a5d19e7c3b62
+Create Date: 2026-10-18 17:24:05.902731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e0f4a27c15'
+down_revision: Union[str, Sequence[str], None] = 'a5d19e7c3b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('books', 'users', 'loans', 'loans_archive')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
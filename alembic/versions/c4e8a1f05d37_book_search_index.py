@@ -0,0 +1,58 @@
+"""Book search index
+
+Revision ID: c4e8a1f05d37
+Revises: 9b1d4c7e2a10
+Create Date: 2026-10-18 11:02:15.604481
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f05d37'
+down_revision: Union[str, Sequence[str], None] = '9b1d4c7e2a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "CREATE INDEX ix_books_search ON books USING gin "
+            "((setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', author), 'B')))"
+        )
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE books_fts USING fts5("
+        "title, author, content='books', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute(
+        "CREATE TRIGGER books_fts_ai AFTER INSERT ON books BEGIN "
+        "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END"
+    )
+    op.execute(
+        "CREATE TRIGGER books_fts_ad AFTER DELETE ON books BEGIN "
+        "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); END"
+    )
+    op.execute(
+        "CREATE TRIGGER books_fts_au AFTER UPDATE OF title, author ON books BEGIN "
+        "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); "
+        "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END"
+    )
+    # index the rows that already exist
+    op.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index('ix_books_search', table_name='books')
+        return
+
+    for trigger in ("books_fts_au", "books_fts_ad", "books_fts_ai"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS books_fts")
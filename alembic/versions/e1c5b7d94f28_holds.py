@@ -0,0 +1,59 @@
+"""Holds (reservation queue)
+
+Revision ID: e1c5b7d94f28
+Revises: d3f7a9c26e81
+Create Date: 2026-10-18 20:41:13.508826
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1c5b7d94f28'
+down_revision: Union[str, Sequence[str], None] = 'd3f7a9c26e81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'holds',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.Enum('WAITING', 'READY', 'FULFILLED', 'EXPIRED', 'CANCELLED', name='holdstatusenum'),
+                  nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('ready_until', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_holds_waiting_book_id_id', 'holds', ['book_id', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'WAITING'"),
+        sqlite_where=sa.text("status = 'WAITING'"),
+    )
+    op.create_index(
+        'ix_holds_open_user_id_book_id', 'holds', ['user_id', 'book_id'], unique=True,
+        postgresql_where=sa.text("status IN ('WAITING', 'READY')"),
+        sqlite_where=sa.text("status IN ('WAITING', 'READY')"),
+    )
+    op.create_index(
+        'ix_holds_ready_until', 'holds', ['ready_until', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'READY'"),
+        sqlite_where=sa.text("status = 'READY'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_holds_ready_until', table_name='holds')
+    op.drop_index('ix_holds_open_user_id_book_id', table_name='holds')
+    op.drop_index('ix_holds_waiting_book_id_id', table_name='holds')
+    op.drop_table('holds')
+    sa.Enum(name='holdstatusenum').drop(op.get_bind(), checkfirst=True)
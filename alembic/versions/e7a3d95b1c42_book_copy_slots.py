@@ -0,0 +1,44 @@
+"""Sharded availability counters
+
+Revision ID: e7a3d95b1c42
+Revises: c4e8a1f05d37
+Create Date: 2026-10-18 13:20:41.507326
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3d95b1c42'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a1f05d37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('counter_slots', sa.Integer(), nullable=False, server_default='0'))
+    op.create_table(
+        'book_copy_slots',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('slot', sa.Integer(), nullable=False),
+        sa.Column('available', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id', 'slot'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # fold sharded titles back into the single counter before dropping the slots
+    op.execute(
+        "UPDATE books SET available_copies = available_copies + "
+        "(SELECT COALESCE(SUM(available), 0) FROM book_copy_slots WHERE book_copy_slots.book_id = books.id) "
+        "WHERE counter_slots > 0"
+    )
+    op.drop_table('book_copy_slots')
+    with op.batch_alter_table('books') as batch_op:
+        batch_op.drop_column('counter_slots')
@@ -0,0 +1,60 @@
+"""Archive table for returned loans, range-partitioned by borrow_date on Postgres
+
+Revision ID: f2b6c8d41a93
+Revises: e7a3d95b1c42
+Create Date: 2026-10-18 15:02:17.218904
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6c8d41a93'
+down_revision: Union[str, Sequence[str], None] = 'e7a3d95b1c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        # LIKE copies loans' column types, including whatever its status enum is
+        op.execute("CREATE TABLE loans_archive (LIKE loans) PARTITION BY RANGE (borrow_date)")
+        op.create_primary_key('loans_archive_pkey', 'loans_archive', ['id', 'borrow_date'])
+        # yearly partitions covering the loans already there; the archival
+        # job creates later ones as it needs them
+        first = op.get_bind().execute(sa.text("SELECT min(borrow_date) FROM loans")).scalar()
+        for year in range((first or datetime.utcnow()).year, datetime.utcnow().year + 1):
+            op.execute(
+                f"CREATE TABLE loans_archive_y{year} PARTITION OF loans_archive "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            )
+    else:
+        op.create_table(
+            'loans_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('book_id', sa.Integer(), nullable=False),
+            sa.Column('borrow_date', sa.DateTime(), nullable=False),
+            sa.Column('return_date', sa.DateTime(), nullable=True),
+            sa.Column('status', sa.Enum('BORROWED', 'RETURNED', name='loanstatusenum'), nullable=False),
+            sa.PrimaryKeyConstraint('id', 'borrow_date'),
+        )
+    op.create_index('ix_loans_archive_user_id_id', 'loans_archive', ['user_id', 'id'], unique=False)
+    op.create_index('ix_loans_archive_book_id_id', 'loans_archive', ['book_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # put archived history back before dropping the archive
+    op.execute(
+        "INSERT INTO loans (id, user_id, book_id, borrow_date, return_date, status) "
+        "SELECT id, user_id, book_id, borrow_date, return_date, status FROM loans_archive"
+    )
+    op.drop_index('ix_loans_archive_book_id_id', table_name='loans_archive')
+    op.drop_index('ix_loans_archive_user_id_id', table_name='loans_archive')
+    op.drop_table('loans_archive')  # drops the Postgres partitions with it
@@ -1,13 +1,30 @@
 # app/api/books.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from fastapi_cache.decorator import cache
+from typing import List, Optional
 
-from app.crud.crud import create_book, get_book, get_books, update_book, delete_book
-from app.schemas.schemas import BookCreate, Book
-from app.db.session_manager import get_db_session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.async_crud import (
+    create_book, get_book, get_books, update_book, delete_book, import_catalog, get_book_loans,
+    search_books, export_chunks, set_counter_slots, create_hold, get_hold, cancel_hold,
+)
+from app.schemas.schemas import (
+    BookCreate, Book, CounterSlotsUpdate, LoanResponse, Page, ImportFormat, ImportReport, ExportFormat,
+    Hold, HoldCreate,
+)
+from app.crud.export import FORMATS as EXPORT_MEDIA_TYPES
+from app.models.models import LoanStatusEnum
+from app.db.routing import read_session_factory
+from app.db.session_manager import get_async_db_session, get_async_read_db_session
+from app.utils.pagination import InvalidCursor
+from app.cache import BOOKS, LOANS, cached, invalidate
 from app.config.settings import settings
+from app.crud import VersionConflict
+from app.events import availability_feed, encode_events
+from app.utils.etag import if_match_version, page_etag, row_etag
+from app.utils.fastjson import page_response, row_response
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
@@ -20,59 +37,270 @@ def books_enabled():
 @router.post("/", response_model=Book, summary="Create a new book")
 async def api_create_book(
     book: BookCreate,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(books_enabled)
 ):
     """
     Create a new book in the system.
     """
     try:
-        return create_book(db, book)
+        created = await create_book(db, book)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    await invalidate(BOOKS)
+    return created
+
+
+# Registered before /{book_id} so "export", "search" and "stream" are not parsed as ids.
+@router.get("/export", summary="Stream the whole catalog as NDJSON or CSV")
+async def api_export_books(
+    request: Request,
+    format: ExportFormat = Query("ndjson", description="ndjson (one JSON object per line) or csv"),
+    _=Depends(books_enabled)
+):
+    return StreamingResponse(
+        export_chunks("books", format, settings.EXPORT_BATCH_SIZE, read_session_factory(request)),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="books.{format}"'},
+    )
+
+
+async def _availability_events(book_ids: Optional[List[int]]):
+    subscription = availability_feed.subscribe(book_ids)
+    try:
+        # sent at once, so clients and proxies see the stream open
+        yield b": connected\n\n"
+        while True:
+            batch = await subscription.next(settings.STREAM_HEARTBEAT_SECONDS)
+            yield b": keep-alive\n\n" if batch is None else encode_events(*batch)
+    finally:
+        availability_feed.unsubscribe(subscription)
+
+
+@router.get("/stream", summary="Live availability changes (Server-Sent Events)")
+async def api_stream_availability(
+    book_id: Optional[List[int]] = Query(None, description="Only these titles (repeat the parameter); all when omitted"),
+    _=Depends(books_enabled)
+):
+    """
+    A text/event-stream of `availability` events, `{"book_id", "available_copies"}`,
+    sent after a borrow, return or edit of a title commits. Changes to one
+    title within STREAM_COALESCE_MS arrive as one event. A `reset` event
+    means the client fell behind and changes were dropped: refetch.
+    """
+    if book_id and len(book_id) > settings.MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {settings.MAX_PAGE_SIZE} book_id filters")
+    if availability_feed.subscribers >= settings.STREAM_MAX_SUBSCRIBERS:
+        raise HTTPException(status_code=503, detail="Too many open streams", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        _availability_events(book_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/search", response_model=Page[Book], summary="Search books by title, author or ISBN")
+@cached(BOOKS, Page[Book])
+async def api_search_books(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to match, or an exact ISBN"),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    db: AsyncSession = Depends(get_async_read_db_session),
+    _=Depends(books_enabled)
+):
+    """
+    Best matches first. Each word matches as a prefix and all words must match;
+    a query equal to a stored ISBN returns just that book.
+    """
+    try:
+        items, next_cursor = await search_books(db, q, limit, after, settings.SEARCH_RANK_WINDOW)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.get("/{book_id}", response_model=Book, summary="Get book by ID")
+@cached(BOOKS, Book)
 async def api_get_book(
     book_id: int,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_read_db_session),
     _=Depends(books_enabled)
 ):
-    book = get_book(db, book_id)
+    book = await get_book(db, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    return row_response(book, row_etag(book))
 
 
-@router.get("/", response_model=list[Book], summary="Get all books")
-@cache(expire=settings.CACHE_EXPIRE if settings.ENABLE_CACHE else 0)
+@router.get("/", response_model=Page[Book], summary="List books, one page at a time")
+@cached(BOOKS, Page[Book])
 async def api_get_books(
-    db: Session = Depends(get_db_session),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    db: AsyncSession = Depends(get_async_read_db_session),
     _=Depends(books_enabled)
 ):
-    return get_books(db)
+    try:
+        items, next_cursor = await get_books(db, limit, after)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(items, next_cursor, page_etag(items, next_cursor))
+
+
+@router.get("/{book_id}/loans", response_model=Page[LoanResponse], summary="List a book's loans, one page at a time")
+@cached(LOANS, Page[LoanResponse])
+async def api_get_book_loans(
+    book_id: int,
+    status: Optional[LoanStatusEnum] = Query(None, description="Only loans in this status"),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    db: AsyncSession = Depends(get_async_read_db_session),
+    _=Depends(books_enabled)
+):
+    try:
+        items, next_cursor = await get_book_loans(db, book_id, status, limit, after)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(items, next_cursor, page_etag(items, next_cursor))
 
 
 @router.put("/{book_id}", response_model=Book, summary="Update a book")
 async def api_update_book(
     book_id: int,
     book: BookCreate,
-    db: Session = Depends(get_db_session),
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag from a GET; the edit fails with 412 if the book changed"),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(books_enabled)
 ):
+    """
+    Replace a book's details. Send the ETag you last saw as If-Match to make
+    sure nobody edited the book in between (borrows and returns do not count).
+    """
+    expected_version = None
+    if if_match is not None:
+        try:
+            expected_version = if_match_version(if_match)
+        except ValueError as e:
+            raise HTTPException(status_code=412, detail=str(e))
     try:
-        return update_book(db, book_id, book)
+        updated = await update_book(db, book_id, book, expected_version, settings.HOLD_PICKUP_HOURS)
+    except VersionConflict as e:
+        raise HTTPException(status_code=412 if if_match is not None else 409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    await invalidate(BOOKS)
+    availability_feed.changed(book_id)
+    response.headers["ETag"] = row_etag(updated)
+    return updated
+
+
+@router.put("/{book_id}/counter-slots", response_model=Book, summary="Shard a hot title's availability counter")
+async def api_set_counter_slots(
+    book_id: int,
+    request: CounterSlotsUpdate,
+    db: AsyncSession = Depends(get_async_db_session),
+    _=Depends(books_enabled)
+):
+    """
+    Spread the title's available copies over `slots` rows so concurrent
+    borrows lock different rows; `slots: 0` goes back to the single counter.
+    available_copies in responses is the same either way.
+    """
+    if request.slots > settings.MAX_COUNTER_SLOTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.MAX_COUNTER_SLOTS} counter slots")
+    try:
+        book = await set_counter_slots(db, book_id, request.slots)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await invalidate(BOOKS)
+    return book
+
+
+@router.post("/{book_id}/holds", response_model=Hold, summary="Join a title's waiting list")
+async def api_create_hold(
+    book_id: int,
+    request: HoldCreate,
+    db: AsyncSession = Depends(get_async_db_session),
+    _=Depends(books_enabled)
+):
+    """
+    Queue for a title with no copy on the shelf instead of retrying the
+    borrow. Returns the hold with its `position`; when a copy comes back the
+    first hold becomes `ready` and the patron can borrow it until `ready_until`.
+    """
+    try:
+        hold = await create_hold(db, book_id, request.user_id, settings.HOLD_PICKUP_HOURS)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # a copy returned meanwhile may have gone from the shelf to this hold
+    await invalidate(BOOKS)
+    availability_feed.changed(book_id)
+    return hold
+
+
+# Not cached: a position moves whenever a hold ahead is served or cancelled.
+@router.get("/{book_id}/holds/{hold_id}", response_model=Hold, summary="Get a hold and its queue position")
+async def api_get_hold(
+    book_id: int,
+    hold_id: int,
+    db: AsyncSession = Depends(get_async_read_db_session),
+    _=Depends(books_enabled)
+):
+    hold = await get_hold(db, book_id, hold_id)
+    if hold is None:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    return hold
+
+
+@router.delete("/{book_id}/holds/{hold_id}", response_model=Hold, summary="Leave a title's waiting list")
+async def api_cancel_hold(
+    book_id: int,
+    hold_id: int,
+    db: AsyncSession = Depends(get_async_db_session),
+    _=Depends(books_enabled)
+):
+    """
+    Cancel a waiting or ready hold. A ready hold's copy goes to the next
+    patron in the queue, or back on the shelf.
+    """
+    try:
+        hold = await cancel_hold(db, book_id, hold_id, settings.HOLD_PICKUP_HOURS)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await invalidate(BOOKS)
+    availability_feed.changed(book_id)
+    return hold
 
 
 @router.delete("/{book_id}", summary="Delete a book")
 async def api_delete_book(
     book_id: int,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(books_enabled)
 ):
     try:
-        return delete_book(db, book_id)
+        deleted = await delete_book(db, book_id)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+    await invalidate(BOOKS)
+    return deleted
+
+
+@router.post("/import", response_model=ImportReport, summary="Bulk import books from CSV or JSONL")
+async def api_import_books(
+    request: Request,
+    format: ImportFormat = Query("csv", description="csv (with header row) or jsonl"),
+    db: AsyncSession = Depends(get_async_db_session),
+    _=Depends(books_enabled)
+):
+    """
+    Stream the raw request body into the catalog, upserting on `isbn`.
+    Rows that fail validation are reported by line number and skipped.
+    """
+    report = await import_catalog(
+        db, "books", format, request.stream(), settings.IMPORT_CHUNK_SIZE, settings.HOLD_PICKUP_HOURS
+    )
+    if report["imported"]:
+        await invalidate(BOOKS)
+    return report
@@ -1,13 +1,36 @@
 # app/api/loans.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from fastapi_cache.decorator import cache
+from datetime import datetime
+from typing import Optional
 
-from app.crud.crud import create_loan, return_loan, get_loans
-from app.schemas.schemas import BookBorrowRequest, BookReturnRequest, LoanResponse
-from app.db.session_manager import get_db_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.async_crud import (
+    create_loan, return_loan, get_loans, create_loans_batch, return_loans_batch,
+    get_overdue_loans, export_chunks,
+)
+from app.schemas.schemas import (
+    BookBorrowRequest,
+    BookReturnRequest,
+    LoanResponse,
+    Page,
+    BatchBorrowRequest,
+    BatchReturnRequest,
+    BatchResponse,
+    BatchMode,
+    ExportFormat,
+)
+from app.crud.export import FORMATS as EXPORT_MEDIA_TYPES
+from app.models.models import LoanStatusEnum
+from app.db.routing import read_session_factory
+from app.db.session_manager import get_async_db_session, get_async_read_db_session
+from app.cache import BOOKS, LOANS, cached, invalidate
 from app.config.settings import settings
+from app.events import availability_feed
+from app.utils.etag import page_etag
+from app.utils.fastjson import page_response
 
 router = APIRouter(prefix="/loans", tags=["Loans"])
 
@@ -21,43 +44,160 @@ def loans_enabled():
 async def api_borrow_book(
     book_id: int,
     request: BookBorrowRequest,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(loans_enabled)
 ):
     """
     Borrow a book by providing the book_id and user_id.
     """
     try:
-        return create_loan(db, book_id, request.user_id)
+        loan = await create_loan(db, book_id, request.user_id, settings.LOAN_PERIOD_DAYS)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    await invalidate(BOOKS, LOANS)
+    availability_feed.changed(book_id)
+    return loan
 
 
 @router.post("/return", response_model=LoanResponse, summary="Return a borrowed book")
 async def api_return_book(
     request: BookReturnRequest,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
+    _=Depends(loans_enabled)
+):
+    """
+    Return a borrowed book using the loan_id. If the title has holds, the
+    copy is set aside for the first patron in the queue.
+    """
+    try:
+        loan = await return_loan(db, request.loan_id, settings.HOLD_PICKUP_HOURS)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await invalidate(BOOKS, LOANS)
+    availability_feed.changed(loan.book_id)
+    return loan
+
+
+async def _batch_response(response: Response, committed: bool, results) -> dict:
+    # An atomic batch that rolled back is a conflict; the body still says why per item.
+    if not committed:
+        response.status_code = 409
+    elif any(loan is not None for loan, _ in results):
+        await invalidate(BOOKS, LOANS)
+        availability_feed.changed(*{loan.book_id for loan, _ in results if loan is not None})
+    return {
+        "committed": committed,
+        "results": [
+            {"index": i, "ok": error is None, "loan": loan, "error": error}
+            for i, (loan, error) in enumerate(results)
+        ],
+    }
+
+
+def _check_batch_size(items):
+    if len(items) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {settings.MAX_BATCH_SIZE} items per batch")
+
+
+@router.post("/borrow/batch", response_model=BatchResponse, summary="Borrow many books in one transaction")
+async def api_borrow_books_batch(
+    request: BatchBorrowRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(loans_enabled)
 ):
     """
-    Return a borrowed book using the loan_id.
+    Borrow a stack of (user_id, book_id) items in one transaction.
+    In `atomic` mode any unavailable book rolls back every item (409);
+    in `partial` mode the available ones are committed.
     """
+    _check_batch_size(request.items)
     try:
-        return return_loan(db, request.loan_id)
+        committed, results = await create_loans_batch(
+            db, request.items, request.mode == BatchMode.ATOMIC, settings.LOAN_PERIOD_DAYS
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return await _batch_response(response, committed, results)
 
 
-@router.get("/", response_model=list[LoanResponse], summary="Get all loans")
-@cache(expire=settings.CACHE_EXPIRE if settings.ENABLE_CACHE else 0)
+@router.post("/return/batch", response_model=BatchResponse, summary="Return many loans in one transaction")
+async def api_return_books_batch(
+    request: BatchReturnRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db_session),
+    _=Depends(loans_enabled)
+):
+    """
+    Return a stack of loans in one transaction, with the same
+    `atomic` / `partial` semantics as the batch borrow.
+    """
+    _check_batch_size(request.items)
+    try:
+        committed, results = await return_loans_batch(
+            db, [item.loan_id for item in request.items], request.mode == BatchMode.ATOMIC,
+            settings.HOLD_PICKUP_HOURS,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await _batch_response(response, committed, results)
+
+
+@router.get("/", response_model=Page[LoanResponse], summary="List loans, one page at a time")
+@cached(LOANS, Page[LoanResponse])
 async def api_get_loans(
-    db: Session = Depends(get_db_session),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    status: Optional[LoanStatusEnum] = Query(None, description="Only loans in this status"),
+    db: AsyncSession = Depends(get_async_read_db_session),
     _=Depends(loans_enabled)
 ):
     """
-    Retrieve all loan records.
+    Retrieve loan records ordered by id. Pass `next_cursor` back as `after` for the next page.
     """
     try:
-        return get_loans(db)
+        items, next_cursor = await get_loans(db, limit, after, status)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(items, next_cursor, page_etag(items, next_cursor))
+
+
+# Not cached: a loan becomes overdue without any write invalidating the cache.
+@router.get("/overdue", response_model=Page[LoanResponse], summary="List overdue loans, longest overdue first")
+async def api_get_overdue_loans(
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    db: AsyncSession = Depends(get_async_read_db_session),
+    _=Depends(loans_enabled)
+):
+    """
+    Active loans whose due date has passed, ordered by due date.
+    """
+    try:
+        items, next_cursor = await get_overdue_loans(db, datetime.utcnow(), limit, after)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(items, next_cursor)
+
+
+@router.get("/export", summary="Stream loan history as NDJSON or CSV")
+async def api_export_loans(
+    request: Request,
+    format: ExportFormat = Query("ndjson", description="ndjson (one JSON object per line) or csv"),
+    status: Optional[LoanStatusEnum] = Query(None, description="Only loans in this status"),
+    since: Optional[datetime] = Query(None, description="Borrowed at or after this time"),
+    until: Optional[datetime] = Query(None, description="Borrowed before this time"),
+    _=Depends(loans_enabled)
+):
+    """
+    Rows are read from a server-side cursor and sent as they are encoded
+    (chunked transfer), so the export never holds the whole history in memory.
+    """
+    return StreamingResponse(
+        export_chunks(
+            "loans", format, settings.EXPORT_BATCH_SIZE, read_session_factory(request),
+            status=status, since=since, until=until,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="loans.{format}"'},
+    )
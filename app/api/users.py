@@ -1,13 +1,19 @@
 # app/api/users.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from fastapi_cache.decorator import cache
+from typing import Optional
 
-from app.crud.crud import create_user, get_user, get_users
-from app.schemas.schemas import UserCreate, User
-from app.db.session_manager import get_db_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.async_crud import create_user, get_user, get_users, get_user_loans, import_catalog
+from app.schemas.schemas import UserCreate, User, LoanResponse, Page, ImportFormat, ImportReport
+from app.models.models import LoanStatusEnum
+from app.db.session_manager import get_async_db_session, get_async_read_db_session
+from app.utils.pagination import InvalidCursor
+from app.cache import LOANS, USERS, cached, invalidate
 from app.config.settings import settings
+from app.utils.etag import page_etag, row_etag
+from app.utils.fastjson import page_response, row_response
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -19,40 +25,83 @@ def users_enabled():
 @router.post("/", response_model=User, summary="Create a new user")
 async def api_create_user(
     user: UserCreate,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(users_enabled)
 ):
     """
     Create a new user in the system.
     """
     try:
-        return create_user(db, user)
+        created = await create_user(db, user)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    await invalidate(USERS)
+    return created
 
 
 @router.get("/{user_id}", response_model=User, summary="Get user by ID")
+@cached(USERS, User)
 async def api_get_user(
     user_id: int,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_async_read_db_session),
     _=Depends(users_enabled)
 ):
     """
     Retrieve a user by their ID.
     """
-    user = get_user(db, user_id)
+    user = await get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return row_response(user, row_etag(user))
 
 
-@router.get("/", response_model=list[User], summary="Get all users")
-@cache(expire=settings.CACHE_EXPIRE if settings.ENABLE_CACHE else 0)
+@router.get("/", response_model=Page[User], summary="List users, one page at a time")
+@cached(USERS, Page[User])
 async def api_get_users(
-    db: Session = Depends(get_db_session),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    db: AsyncSession = Depends(get_async_read_db_session),
+    _=Depends(users_enabled)
+):
+    """
+    Retrieve users ordered by id. Pass `next_cursor` back as `after` for the next page.
+    """
+    try:
+        items, next_cursor = await get_users(db, limit, after)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(items, next_cursor, page_etag(items, next_cursor))
+
+
+@router.post("/import", response_model=ImportReport, summary="Bulk import users from CSV or JSONL")
+async def api_import_users(
+    request: Request,
+    format: ImportFormat = Query("csv", description="csv (with header row) or jsonl"),
+    db: AsyncSession = Depends(get_async_db_session),
     _=Depends(users_enabled)
 ):
     """
-    Retrieve all users.
+    Stream the raw request body into the catalog, upserting on `email`.
+    Rows that fail validation are reported by line number and skipped.
     """
-    return get_users(db)
\ No newline at end of file
+    report = await import_catalog(db, "users", format, request.stream(), settings.IMPORT_CHUNK_SIZE)
+    if report["imported"]:
+        await invalidate(USERS)
+    return report
+
+
+@router.get("/{user_id}/loans", response_model=Page[LoanResponse], summary="List a user's loans, one page at a time")
+@cached(LOANS, Page[LoanResponse])
+async def api_get_user_loans(
+    user_id: int,
+    status: Optional[LoanStatusEnum] = Query(None, description="Only loans in this status"),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor"),
+    db: AsyncSession = Depends(get_async_read_db_session),
+    _=Depends(users_enabled)
+):
+    try:
+        items, next_cursor = await get_user_loans(db, user_id, status, limit, after)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(items, next_cursor, page_etag(items, next_cursor))
@@ -0,0 +1,20 @@
+# app/cache/__init__.py
+from .cache import (
+    BOOKS,
+    USERS,
+    LOANS,
+    CacheStats,
+    InstrumentedBackend,
+    invalidate,
+    request_key_builder,
+    generation,
+    stats,
+)
+from .backends import (
+    LRUMemoryBackend,
+    SQLiteBackend,
+    RespBackend,
+    backend_from_url,
+)
+from .resp import RespClient, LocalRespServer
+from .decorator import cached
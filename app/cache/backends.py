@@ -0,0 +1,217 @@
+# app/cache/backends.py
+"""
+fastapi-cache backends selected by Settings.CACHE_URL:
+
+    memory://?max_entries=10000        per-process LRU (the default)
+    sqlite:////var/cache/libro.db      on-disk, shared by every worker on the host
+    redis://host:6379/0                any RESP server, shared across hosts
+
+All of them are bounded. The memory and SQLite backends evict least recently
+used entries past max_entries; for a RESP server set `maxmemory` with
+`maxmemory-policy allkeys-lru` on the server itself.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import aiosqlite
+from fastapi_cache.types import Backend
+
+from app.cache.resp import RespClient
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+def _expires_at(now: float, expire: Optional[int]) -> float:
+    # like a RESP SET without EX, a missing or zero expire means the entry never expires
+    return now + expire if expire else math.inf
+
+
+def _ttl(expires_at: float, now: float) -> int:
+    # reported as 0 for entries without expiry, as RespBackend does
+    return int(expires_at - now) if expires_at != math.inf else 0
+
+
+class LRUMemoryBackend(Backend):
+    """In-process cache with TTLs and least-recently-used eviction."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._store: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+
+    def _live(self, key: str):
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._store[key]
+            return None
+        self._store.move_to_end(key)
+        return entry
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        entry = self._live(key)
+        if entry is None:
+            return 0, None
+        return _ttl(entry[1], time.monotonic()), entry[0]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        self._store[key] = (value, _expires_at(time.monotonic(), expire))
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_entries:
+            self._store.popitem(last=False)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        if namespace:
+            doomed = [k for k in self._store if k.startswith(namespace)]
+        else:
+            doomed = [key] if key in self._store else []
+        for k in doomed:
+            del self._store[k]
+        return len(doomed)
+
+
+class SQLiteBackend(Backend):
+    """
+    Cache in a local SQLite file in WAL mode, so every uvicorn/gunicorn worker
+    on the host reads the same entries and sees the same invalidations.
+
+    Reads bump accessed_at at most once per second per key (an approximate
+    LRU that keeps hot reads from turning into writes), and every
+    `EVICT_EVERY` writes the oldest entries beyond max_entries are dropped.
+    """
+
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._db: Optional[aiosqlite.Connection] = None
+        self._writes = 0
+
+    async def _conn(self) -> aiosqlite.Connection:
+        if self._db is None:
+            db = await aiosqlite.connect(self.path, timeout=5)
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute("PRAGMA synchronous=OFF")
+            await db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            await db.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at)")
+            await db.commit()
+            self._db = db
+        return self._db
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        db = await self._conn()
+        now = time.time()
+        async with db.execute(
+            "SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ? AND expires_at > ?", (key, now)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return 0, None
+        if now - row[2] > 1:
+            await db.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            await db.commit()
+        return _ttl(row[1], now), row[0]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        db = await self._conn()
+        now = time.time()
+        await db.execute(
+            "INSERT INTO cache_entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+            "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+            (key, value, _expires_at(now, expire), now),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            await db.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+            await db.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        await db.commit()
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        db = await self._conn()
+        if namespace:
+            # range scan on the primary key instead of LIKE, which would treat _ and % as wildcards
+            cursor = await db.execute(
+                "DELETE FROM cache_entries WHERE key >= ? AND key < ?", (namespace, namespace + "\uffff")
+            )
+        else:
+            cursor = await db.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        await db.commit()
+        return cursor.rowcount
+
+    async def close(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+
+class RespBackend(Backend):
+    """Cache on a RESP server (Redis and compatibles); shared across hosts."""
+
+    def __init__(self, client: RespClient):
+        self.client = client
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        pttl, value = await self.client.pipeline(("PTTL", key), ("GET", key))
+        if value is None:
+            return 0, None
+        return max(pttl, 0) // 1000, value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        if expire:
+            await self.client.execute("SET", key, value, "EX", expire)
+        else:
+            await self.client.execute("SET", key, value)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        if not namespace:
+            return await self.client.execute("DEL", key)
+        removed, cursor = 0, b"0"
+        while True:
+            cursor, keys = await self.client.execute("SCAN", cursor, "MATCH", f"{namespace}*", "COUNT", 500)
+            if keys:
+                removed += await self.client.execute("DEL", *keys)
+            if cursor in (b"0", 0, "0"):
+                return removed
+
+    async def close(self):
+        await self.client.close()
+
+
+def backend_from_url(url: Optional[str], max_entries: int = DEFAULT_MAX_ENTRIES) -> Backend:
+    """Build the cache backend for a CACHE_URL; None means memory://."""
+    parsed = urlparse(url or "memory://")
+    options = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    max_entries = int(options.get("max_entries", max_entries))
+
+    if parsed.scheme == "memory":
+        return LRUMemoryBackend(max_entries)
+    if parsed.scheme == "sqlite":
+        # same convention as SQLAlchemy: sqlite:///relative.db, sqlite:////absolute.db
+        return SQLiteBackend(parsed.path[1:], max_entries)
+    if parsed.scheme in ("redis", "resp"):
+        return RespBackend(RespClient.from_url(url))
+    raise ValueError(f"Unsupported CACHE_URL scheme: {parsed.scheme}")
@@ -0,0 +1,116 @@
+# app/cache/cache.py
+"""
+Namespace-based invalidation for the fastapi-cache list endpoints.
+
+Every cached route is tagged with a namespace (books, users, loans) and keyed
+on its path and query string. Write paths call `invalidate()` with the
+namespaces they touched once their transaction has committed, so cached
+lists can use long TTLs without serving stale availability.
+"""
+
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi_cache import FastAPICache
+from fastapi_cache.types import Backend
+from starlette.requests import Request
+from starlette.responses import Response
+
+BOOKS = "books"
+USERS = "users"
+LOANS = "loans"
+
+
+class CacheStats:
+    """Process-local hit / miss / invalidation counters, per namespace."""
+
+    FIELDS = ("hits", "misses", "stale", "coalesced", "invalidations")
+
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+        self.stale = Counter()          # stale entries served while refreshing
+        self.coalesced = Counter()      # misses that waited on another request's load
+        self.invalidations = Counter()
+
+    def snapshot(self) -> dict:
+        namespaces = sorted(set().union(*(getattr(self, field) for field in self.FIELDS)))
+        return {ns: {field: getattr(self, field)[ns] for field in self.FIELDS} for ns in namespaces}
+
+    def reset(self):
+        for field in self.FIELDS:
+            getattr(self, field).clear()
+
+
+stats = CacheStats()
+
+# Bumped on every invalidation; a load that started under an older generation
+# must not write its (possibly pre-write) result back into the cache.
+generation = Counter()
+
+
+def _namespace_of(key: str) -> str:
+    # keys look like "<prefix>:<namespace>:<path>?<query>"
+    parts = key.split(":", 2)
+    return parts[1] if len(parts) == 3 else ""
+
+
+def request_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+) -> str:
+    """
+    Key on the request path and sorted query string. The default builder
+    hashes the endpoint kwargs, which include the per-request DB session,
+    so no two requests ever shared a key.
+    """
+    if request is None:
+        return f"{namespace}:{func.__module__}.{func.__name__}"
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{namespace}:{request.url.path}?{query}"
+
+
+class InstrumentedBackend(Backend):
+    """Wraps a fastapi-cache backend and counts hits and misses per namespace."""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        ttl, value = await self.backend.get_with_ttl(key)
+        (stats.misses if value is None else stats.hits)[_namespace_of(key)] += 1
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.backend.get(key)
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await self.backend.set(key, value, expire)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        return await self.backend.clear(namespace, key)
+
+    async def close(self):
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            await close()
+
+
+async def invalidate(*namespaces: str) -> None:
+    """
+    Drop every cached entry in the given namespaces. Call after the write
+    has committed; a no-op when caching is disabled or not initialised.
+    """
+    if not FastAPICache.get_enable() or FastAPICache._backend is None:
+        return
+    backend = FastAPICache.get_backend()
+    prefix = FastAPICache.get_prefix()
+    for namespace in namespaces:
+        generation[namespace] += 1
+        await backend.clear(namespace=f"{prefix}:{namespace}:")
+        stats.invalidations[namespace] += 1
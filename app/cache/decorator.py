@@ -0,0 +1,185 @@
+# app/cache/decorator.py
+"""
+Read-through cache for GET endpoints with single-flight misses and
+stale-while-revalidate.
+
+    @router.get("/", response_model=Page[Book])
+    @cached(BOOKS, Page[Book])
+    async def api_get_books(..., db: AsyncSession = Depends(get_async_db_session)):
+        ...
+
+* Concurrent misses on one key share a single call of the endpoint; the
+  rest await its result instead of each querying the database. The call
+  runs with its own DB session, so the first client leaving does not break
+  it for the others.
+* Entries stay in the backend for `stale_ttl` seconds past their freshness.
+  A request that finds a stale entry gets it straight away while one
+  background task reloads the key with its own DB session.
+* Responses are stored as the final JSON bytes, so a hit skips model
+  validation and serialisation entirely.
+* A client inside its read-your-writes window (app/db/routing.py) bypasses
+  the cache: an entry may have been filled from a lagging replica.
+* An ETag the endpoint sets on its Response is stored with the body, so an
+  If-None-Match that still matches gets a 304 straight from the entry. On
+  the uncached path the header is published to the endpoint (see
+  app/utils/etag.py), whose fast-path response then skips encoding the body.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi_cache import FastAPICache
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.cache.cache import generation, stats
+from app.config.settings import settings
+from app.db.routing import reads_primary
+from app.utils.etag import etag_matches, not_modified, request_if_none_match
+
+logger = logging.getLogger(__name__)
+
+# key -> task loading it; shared by single-flight misses and background refreshes
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def _pack(body: bytes, fresh_for: int, etag: Optional[str]) -> bytes:
+    return b"%.3f %s\n" % (time.time() + fresh_for, (etag or "").encode()) + body
+
+
+def _unpack(raw: bytes):
+    header, _, body = raw.partition(b"\n")
+    fresh_until, _, etag = header.partition(b" ")
+    return float(fresh_until), etag.decode() or None, body
+
+
+def _json_response(request: Request, body: bytes, etag: Optional[str], status: str) -> Response:
+    headers = {FastAPICache.get_cache_status_header(): status}
+    if etag:
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return not_modified(etag, headers)
+        headers["ETag"] = etag
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _conditional(request: Request, call):
+    """
+    Uncached path: run the endpoint with the request's If-None-Match
+    published, so a tagged fast-path response is a 304 before its body is
+    encoded; any other tagged Response is turned into one afterwards.
+    """
+    token = request_if_none_match.set(request.headers.get("If-None-Match"))
+    try:
+        result = await call
+    finally:
+        request_if_none_match.reset(token)
+    if isinstance(result, Response) and result.status_code != 304:
+        etag = result.headers.get("etag")
+        if etag and etag_matches(request.headers.get("If-None-Match"), etag):
+            return not_modified(etag)
+    return result
+
+
+def _log_failed_refresh(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background cache refresh failed", exc_info=task.exception())
+
+
+def cached(namespace: str, model: Any, expire: Optional[int] = None, stale_ttl: Optional[int] = None, session_factory=None):
+    """
+    Cache a GET endpoint under `namespace`, serialising its result as `model`
+    (pass the same type as the route's response_model).
+    """
+    adapter = TypeAdapter(model)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        params = list(signature.parameters.values())
+        db_param = next((p.name for p in params if p.annotation is AsyncSession), None)
+        request_param = next((p.name for p in params if p.annotation is Request), None)
+        inject_request = request_param is None
+        if inject_request:
+            request_param = "_cache_request"
+            params.append(inspect.Parameter(request_param, inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+
+        async def load(kwargs) -> Tuple[bytes, Optional[str]]:
+            result = await func(**kwargs)
+            if isinstance(result, Response):
+                # already encoded by the endpoint's fast path
+                return result.body, result.headers.get("etag")
+            return adapter.dump_json(adapter.validate_python(result, from_attributes=True)), None
+
+        async def fill(key: str, kwargs, fresh_for: int, keep_for: int) -> Tuple[bytes, Optional[str]]:
+            started_at = generation[namespace]
+            body, etag = await load(kwargs)
+            # Skip the write if the namespace was invalidated while we were
+            # loading; the body may predate the write that invalidated it.
+            if generation[namespace] == started_at:
+                await FastAPICache.get_backend().set(key, _pack(body, fresh_for, etag), keep_for)
+            return body, etag
+
+        async def detached_fill(key: str, kwargs, fresh_for: int, keep_for: int) -> Tuple[bytes, Optional[str]]:
+            # Shared loads (a coalesced miss, a background refresh) can outlive
+            # the request that started them, whose session is closed when it
+            # goes, so never borrow its session.
+            if db_param is None:
+                return await fill(key, kwargs, fresh_for, keep_for)
+            factory = session_factory
+            if factory is None:
+                from app.db.database import ReadAsyncSessionLocal as factory
+            async with factory() as db:
+                return await fill(key, {**kwargs, db_param: db}, fresh_for, keep_for)
+
+        def single_flight(key: str, make) -> asyncio.Task:
+            task = _inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(make())
+                _inflight[key] = task
+                task.add_done_callback(lambda _: _inflight.pop(key, None))
+            return task
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs[request_param]
+            if inject_request:
+                kwargs.pop(request_param)
+            if (not FastAPICache.get_enable() or request.headers.get("Cache-Control") == "no-store"
+                    or reads_primary(request)):
+                return await _conditional(request, func(*args, **kwargs))
+
+            fresh_for = expire if expire is not None else settings.CACHE_EXPIRE
+            stale_for = stale_ttl if stale_ttl is not None else settings.CACHE_STALE_TTL
+            key = FastAPICache.get_key_builder()(
+                func, f"{FastAPICache.get_prefix()}:{namespace}", request=request, response=None, args=args, kwargs=kwargs,
+            )
+
+            _, raw = await FastAPICache.get_backend().get_with_ttl(key)
+            if raw is not None and request.headers.get("Cache-Control") != "no-cache":
+                fresh_until, etag, body = _unpack(raw)
+                if time.time() < fresh_until:
+                    return _json_response(request, body, etag, "HIT")
+                if stale_for > 0:
+                    stats.stale[namespace] += 1
+                    if key not in _inflight:
+                        task = single_flight(key, lambda: detached_fill(key, kwargs, fresh_for, fresh_for + stale_for))
+                        task.add_done_callback(_log_failed_refresh)
+                    return _json_response(request, body, etag, "STALE")
+
+            task = _inflight.get(key)
+            if task is not None:
+                stats.coalesced[namespace] += 1
+            else:
+                task = single_flight(key, lambda: detached_fill(key, kwargs, fresh_for, fresh_for + stale_for))
+            # shield: a disconnecting client must not cancel the load others are waiting on
+            return _json_response(request, *await asyncio.shield(task), "MISS")
+
+        wrapper.__signature__ = signature.replace(parameters=params)
+        return wrapper
+
+    return decorator
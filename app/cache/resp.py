@@ -0,0 +1,251 @@
+# app/cache/resp.py
+"""
+Minimal asyncio client for the RESP wire protocol (Redis, Valkey, KeyDB,
+Dragonfly) plus a small in-process server that speaks the same subset, used
+as a local stand-in in tests and development.
+
+Only the commands the cache backend and the availability feed need are
+implemented: PING, GET, SET (EX/PX), PTTL, DEL, SCAN (MATCH/COUNT),
+FLUSHDB, PUBLISH and SUBSCRIBE.
+"""
+
+import asyncio
+import fnmatch
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class RespError(Exception):
+    """An error reply from the server."""
+
+
+def encode_command(*args) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise RespError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        size = int(payload)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        size = int(payload)
+        if size < 0:
+            return None
+        return [await read_reply(reader) for _ in range(size)]
+    raise RespError(f"Unknown reply type: {line!r}")
+
+
+class RespClient:
+    """
+    A small pool of RESP connections. Each command (or pipeline) checks one
+    connection out, so concurrent requests do not queue behind each other.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, pool_size: int = 8, timeout: float = 1.0):
+        self.host, self.port, self.db, self.password = host, port, db, password
+        self.timeout = timeout
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(pool_size)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RespClient":
+        """redis://[:password@]host[:port][/db][?pool_size=8]"""
+        parsed = urlparse(url)
+        options = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        return cls(
+            host=parsed.hostname or "127.0.0.1",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=parsed.password,
+            pool_size=int(options.get("pool_size", 8)),
+        )
+
+    async def _connect(self):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        for command in setup:
+            writer.write(encode_command(*command))
+            await writer.drain()
+            await read_reply(reader)
+        return reader, writer
+
+    async def pipeline(self, *commands: Tuple) -> List:
+        """Send several commands in one write and read all their replies."""
+        async with self._slots:
+            conn = self._idle.get_nowait() if not self._idle.empty() else await self._connect()
+            reader, writer = conn
+            try:
+                writer.write(b"".join(encode_command(*command) for command in commands))
+                await writer.drain()
+                replies = []
+                for _ in commands:
+                    try:
+                        replies.append(await asyncio.wait_for(read_reply(reader), self.timeout))
+                    except RespError as e:
+                        replies.append(e)
+            except BaseException:
+                writer.close()
+                raise
+            self._idle.put_nowait(conn)
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    async def execute(self, *command):
+        return (await self.pipeline(command))[0]
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        """
+        Yield the messages published to `channel`, on a connection of its
+        own (a subscribed connection takes no other commands). Runs until
+        the connection drops or the consumer stops iterating.
+        """
+        reader, writer = await self._connect()
+        try:
+            writer.write(encode_command("SUBSCRIBE", channel))
+            await writer.drain()
+            await read_reply(reader)
+            while True:
+                reply = await read_reply(reader)
+                if isinstance(reply, list) and reply[0] == b"message":
+                    yield reply[2]
+        finally:
+            writer.close()
+
+    async def close(self):
+        while not self._idle.empty():
+            _, writer = self._idle.get_nowait()
+            writer.close()
+
+
+class LocalRespServer:
+    """
+    In-process RESP server backed by a dict, for tests and local development.
+
+        server = LocalRespServer()
+        await server.start()          # listens on 127.0.0.1, random port
+        client = RespClient(port=server.port)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host, self.port = host, port
+        self.store: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.channels: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _get(self, key: bytes):
+        entry = self.store.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.store[key]
+            return None
+        return entry
+
+    def _reply(self, value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, str):
+            return b"+%s\r\n" % value.encode()
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self._reply(v) for v in value)
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _dispatch(self, name: str, args: List[bytes]):
+        if name == "PING":
+            return "PONG"
+        if name in ("AUTH", "SELECT"):
+            return "OK"
+        if name == "GET":
+            entry = self._get(args[0])
+            return entry[0] if entry else None
+        if name == "SET":
+            expires = None
+            options = [a.upper() for a in args[2:]]
+            if b"EX" in options:
+                expires = time.monotonic() + int(args[2 + options.index(b"EX") + 1])
+            elif b"PX" in options:
+                expires = time.monotonic() + int(args[2 + options.index(b"PX") + 1]) / 1000
+            self.store[args[0]] = (args[1], expires)
+            return "OK"
+        if name == "PTTL":
+            entry = self._get(args[0])
+            if entry is None:
+                return -2
+            return -1 if entry[1] is None else int((entry[1] - time.monotonic()) * 1000)
+        if name == "DEL":
+            return sum(1 for key in args if self.store.pop(key, None) is not None)
+        if name == "SCAN":
+            pattern = b"*"
+            if b"MATCH" in [a.upper() for a in args]:
+                pattern = args[[a.upper() for a in args].index(b"MATCH") + 1]
+            keys = [k for k in list(self.store) if self._get(k) and fnmatch.fnmatchcase(k.decode(), pattern.decode())]
+            return [b"0", keys]
+        if name == "FLUSHDB":
+            self.store.clear()
+            return "OK"
+        if name == "PUBLISH":
+            subscribers = self.channels.get(args[0], ())
+            for subscriber in subscribers:
+                subscriber.write(self._reply([b"message", args[0], args[1]]))
+            return len(subscribers)
+        raise RespError(f"ERR unknown command '{name}'")
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    command = await read_reply(reader)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    break
+                name = command[0].decode().upper()
+                if name == "SUBSCRIBE":
+                    for channel in command[1:]:
+                        self.channels.setdefault(channel, set()).add(writer)
+                        writer.write(self._reply([b"subscribe", channel, 1]))
+                    await writer.drain()
+                    continue
+                try:
+                    reply = self._reply(self._dispatch(name, command[1:]))
+                except RespError as e:
+                    reply = b"-%s\r\n" % str(e).encode()
+                writer.write(reply)
+                await writer.drain()
+        finally:
+            for subscribers in self.channels.values():
+                subscribers.discard(writer)
+            writer.close()
@@ -1,17 +1,71 @@
 # app/config/settings.py
 
+from typing import Dict, List, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    READ_DATABASE_URL: Optional[str] = None  # read replica for GET routes; unset reads the primary
+    READ_YOUR_WRITES_SECONDS: int = 5  # a client reads the primary this long after its own write
     ENABLE_BORROW: bool = True
     ENABLE_RETURN: bool = True
     ENABLE_BOOKS: bool = True
     ENABLE_USERS: bool = True
     ENABLE_CACHE: bool = True
+    ENABLE_METRICS: bool = True
+    ENABLE_QUERY_STATS: bool = True  # Server-Timing query count / DB time per response
     CACHE_EXPIRE: int = 60  # seconds
+    CACHE_STALE_TTL: int = 30  # seconds a stale entry may be served while one request refreshes it
+    CACHE_URL: Optional[str] = None  # memory:// (default), sqlite:///path or redis://host:port/db
+    CACHE_MAX_ENTRIES: int = 10000
     DEBUG: bool = True
-    API_RATE_LIMIT: int = 100  # requests per minute
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10  # seconds to wait for a connection before failing
+    DB_POOL_RECYCLE: int = 1800  # seconds; -1 keeps connections forever
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP: int = 0  # connections opened at startup (capped at DB_POOL_SIZE)
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None  # Postgres statement_timeout per connection
+    SLOW_QUERY_MS: Optional[float] = 200  # log statements at least this slow; None turns it off
+    SLOW_QUERY_EXPLAIN: bool = False  # add the EXPLAIN plan to slow-query log lines
+    QUERY_REPEAT_WARNING: int = 10  # log a statement run this many times in one request (N+1)
+    QUERY_BUDGET: Optional[int] = None  # strict mode for tests: fail requests running more statements
+    API_RATE_LIMIT: int = 100  # requests per minute per client
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BURST: Optional[int] = None  # requests a client may send at once; defaults to the limit
+    RATE_LIMIT_ROUTES: Dict[str, int] = {}  # per-route limits, e.g. {"POST /loans/borrow": 20}
+    RATE_LIMIT_CLIENTS: Dict[str, int] = {}  # per-client overrides of API_RATE_LIMIT, by IP
+    RATE_LIMIT_STORE_URL: Optional[str] = None  # memory:// (default) or sqlite:///path shared by workers
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # identify clients by X-Forwarded-For (behind a proxy)
+    RATE_LIMIT_EXEMPT: List[str] = ["/metrics", "/docs", "/openapi.json"]
+    DEFAULT_PAGE_SIZE: int = 50
+    MAX_PAGE_SIZE: int = 500
+    MAX_BATCH_SIZE: int = 50  # items per batch borrow/return
+    LOAN_PERIOD_DAYS: int = 14  # a loan's due date is this long after it is borrowed
+    OVERDUE_SCAN_INTERVAL: Optional[float] = 300  # seconds between overdue scans per worker; None turns it off
+    OVERDUE_BATCH_SIZE: int = 500  # overdue loans stamped per transaction
+    OVERDUE_MAX_BATCHES: int = 20  # batches per scan; any rest waits for the next scan
+    HOLD_PICKUP_HOURS: int = 48  # a copy handed to a hold waits this long for the patron to borrow it
+    HOLD_EXPIRY_SCAN_INTERVAL: Optional[float] = 300  # seconds between scans for lapsed holds; None turns it off
+    HOLD_EXPIRY_BATCH_SIZE: int = 500  # lapsed holds expired per transaction
+    LOAN_ARCHIVE_INTERVAL: Optional[float] = None  # also run the archival job in-process this often (seconds)
+    LOAN_ARCHIVE_AFTER_DAYS: int = 365  # returned loans older than this move to loans_archive
+    LOAN_ARCHIVE_BATCH_SIZE: int = 1000  # loans moved per archival transaction
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # how long a POST's response is replayed for its Idempotency-Key
+    IDEMPOTENCY_LEASE_SECONDS: int = 60  # a request still running after this may be taken over by a retry
+    IDEMPOTENCY_WAIT_SECONDS: float = 10  # a duplicate waits this long for the original, then gets 409
+    IDEMPOTENCY_PURGE_INTERVAL: Optional[float] = 3600  # seconds between purges of expired keys; None turns it off
+    IDEMPOTENCY_PURGE_BATCH_SIZE: int = 1000  # expired keys deleted per transaction
+    MAX_COUNTER_SLOTS: int = 64  # slot rows a hot title's availability may be sharded over
+    STREAM_COALESCE_MS: int = 250  # availability changes to one title within this window are sent once
+    STREAM_HEARTBEAT_SECONDS: float = 15  # comment line sent on idle /books/stream connections
+    STREAM_MAX_PENDING: int = 1000  # titles a slow stream may fall behind on before it gets a reset
+    STREAM_MAX_SUBSCRIBERS: int = 10000  # open /books/stream connections per worker
+    EVENTS_URL: Optional[str] = None  # redis://host:port/db to share availability changes between workers
+    SEARCH_RANK_WINDOW: int = 1000  # matches scored per search before paging
+    IMPORT_CHUNK_SIZE: int = 1000  # rows per bulk-import upsert
+    EXPORT_BATCH_SIZE: int = 1000  # rows fetched and encoded per export chunk
 
     class Config:
         env_file = ".env"
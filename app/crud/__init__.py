@@ -8,9 +8,29 @@ from .crud import (
     create_book,
     get_book,
     get_books,
+    get_availability,
     update_book,
+    VersionConflict,
     delete_book,
+    set_counter_slots,
     create_loan,
     return_loan,
+    create_loans_batch,
+    return_loans_batch,
     get_loans,
-)
\ No newline at end of file
+    get_user_loans,
+    get_book_loans,
+    get_overdue_loans,
+    mark_overdue_loans,
+    archive_loans,
+    create_hold,
+    get_hold,
+    cancel_hold,
+    expire_holds,
+    claim_idempotency_key,
+    get_idempotency_record,
+    save_idempotent_response,
+    release_idempotency_key,
+    purge_idempotency_keys,
+)
+from .search import search_books
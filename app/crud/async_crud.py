@@ -0,0 +1,176 @@
+# app/crud/async_crud.py
+"""
+Async CRUD used by the API routers.
+
+Each function runs its counterpart from app.crud.crud through
+AsyncSession.run_sync. The ORM logic is written once, but every round-trip
+goes through the asyncio driver (asyncpg / aiosqlite), so a request waiting on
+the database yields the event loop to other requests instead of blocking it.
+"""
+
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.crud import crud, export, search
+from app.crud.bulk_import import CatalogImport, aiter_lines
+from app.crud.crud import DEFAULT_PAGE_SIZE
+from app.db.database import AsyncSessionLocal
+from app.models.models import LoanStatusEnum
+
+# -------------------
+# Loans CRUD
+# -------------------
+async def create_loan(db: AsyncSession, book_id: int, user_id: int, loan_days: Optional[int] = None):
+    return await db.run_sync(crud.create_loan, book_id, user_id, loan_days)
+
+async def return_loan(db: AsyncSession, loan_id: int, hold_hours: Optional[int] = None):
+    return await db.run_sync(crud.return_loan, loan_id, hold_hours)
+
+async def create_loans_batch(db: AsyncSession, items, atomic: bool = True, loan_days: Optional[int] = None):
+    return await db.run_sync(crud.create_loans_batch, items, atomic, loan_days)
+
+async def return_loans_batch(db: AsyncSession, loan_ids, atomic: bool = True,
+                             hold_hours: Optional[int] = None):
+    return await db.run_sync(crud.return_loans_batch, loan_ids, atomic, hold_hours)
+
+async def get_loans(db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+                    status: Optional[LoanStatusEnum] = None):
+    return await db.run_sync(crud.get_loans, limit, after, status)
+
+async def get_user_loans(db: AsyncSession, user_id: int, status: Optional[LoanStatusEnum] = None,
+                         limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    return await db.run_sync(crud.get_user_loans, user_id, status, limit, after)
+
+async def get_book_loans(db: AsyncSession, book_id: int, status: Optional[LoanStatusEnum] = None,
+                         limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    return await db.run_sync(crud.get_book_loans, book_id, status, limit, after)
+
+async def get_overdue_loans(db: AsyncSession, now: datetime, limit: int = DEFAULT_PAGE_SIZE,
+                            after: Optional[str] = None):
+    return await db.run_sync(crud.get_overdue_loans, now, limit, after)
+
+async def mark_overdue_loans(db: AsyncSession, now: datetime, batch_size: int):
+    return await db.run_sync(crud.mark_overdue_loans, now, batch_size)
+
+async def archive_loans(db: AsyncSession, returned_before: datetime, batch_size: int) -> int:
+    return await db.run_sync(crud.archive_loans, returned_before, batch_size)
+
+
+# -------------------
+# Holds
+# -------------------
+async def create_hold(db: AsyncSession, book_id: int, user_id: int, hold_hours: Optional[int] = None):
+    return await db.run_sync(crud.create_hold, book_id, user_id, hold_hours)
+
+async def get_hold(db: AsyncSession, book_id: int, hold_id: int):
+    return await db.run_sync(crud.get_hold, book_id, hold_id)
+
+async def cancel_hold(db: AsyncSession, book_id: int, hold_id: int, hold_hours: Optional[int] = None):
+    return await db.run_sync(crud.cancel_hold, book_id, hold_id, hold_hours)
+
+async def expire_holds(db: AsyncSession, now: datetime, batch_size: int, hold_hours: Optional[int] = None):
+    return await db.run_sync(crud.expire_holds, now, batch_size, hold_hours)
+
+
+# -------------------
+# Idempotency keys
+# -------------------
+async def get_idempotency_record(db: AsyncSession, key: bytes):
+    return await db.run_sync(crud.get_idempotency_record, key)
+
+async def claim_idempotency_key(db: AsyncSession, key: bytes, fingerprint: bytes, now: datetime,
+                                lease_until: datetime):
+    return await db.run_sync(crud.claim_idempotency_key, key, fingerprint, now, lease_until)
+
+async def save_idempotent_response(db: AsyncSession, key: bytes, status_code: int, content_type: Optional[str],
+                                   body: bytes, expires_at: datetime):
+    return await db.run_sync(crud.save_idempotent_response, key, status_code, content_type, body, expires_at)
+
+async def release_idempotency_key(db: AsyncSession, key: bytes):
+    return await db.run_sync(crud.release_idempotency_key, key)
+
+async def purge_idempotency_keys(db: AsyncSession, now: datetime, batch_size: int) -> int:
+    return await db.run_sync(crud.purge_idempotency_keys, now, batch_size)
+
+
+# -------------------
+# Users CRUD
+# -------------------
+async def create_user(db: AsyncSession, user_data):
+    return await db.run_sync(crud.create_user, user_data)
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_user, user_id)
+
+async def get_users(db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    return await db.run_sync(crud.get_users, limit, after)
+
+
+# -------------------
+# Books CRUD
+# -------------------
+async def create_book(db: AsyncSession, book_data):
+    return await db.run_sync(crud.create_book, book_data)
+
+async def get_book(db: AsyncSession, book_id: int):
+    return await db.run_sync(crud.get_book, book_id)
+
+async def get_books(db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    return await db.run_sync(crud.get_books, limit, after)
+
+async def search_books(db: AsyncSession, q: str, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+                       window: int = search.RANK_WINDOW):
+    return await db.run_sync(search.search_books, q, limit, after, window)
+
+async def get_availability(db: AsyncSession, book_ids) -> dict:
+    return await db.run_sync(crud.get_availability, book_ids)
+
+async def update_book(db: AsyncSession, book_id: int, book_data, expected_version: Optional[int] = None,
+                      hold_hours: Optional[int] = None):
+    return await db.run_sync(crud.update_book, book_id, book_data, expected_version, hold_hours)
+
+async def delete_book(db: AsyncSession, book_id: int):
+    return await db.run_sync(crud.delete_book, book_id)
+
+async def set_counter_slots(db: AsyncSession, book_id: int, slots: int):
+    return await db.run_sync(crud.set_counter_slots, book_id, slots)
+
+
+# -------------------
+# Bulk import
+# -------------------
+async def import_catalog(db: AsyncSession, kind: str, fmt: str, chunks: AsyncIterator[bytes], chunk_size: int,
+                         hold_hours: Optional[int] = None):
+    """Stream a CSV/JSONL body into the catalog, one upsert per chunk of lines."""
+    job = CatalogImport(kind, fmt, hold_hours)
+    lines = []
+    async for line in aiter_lines(chunks):
+        lines.append(line)
+        if len(lines) >= chunk_size:
+            await db.run_sync(job.write, job.parse(lines))
+            lines = []
+    if lines:
+        await db.run_sync(job.write, job.parse(lines))
+    return job.report()
+
+
+# -------------------
+# Export
+# -------------------
+async def export_chunks(kind: str, fmt: str, batch_size: int,
+                        session_factory: async_sessionmaker = AsyncSessionLocal,
+                        **filters) -> AsyncIterator[bytes]:
+    """
+    Yield an NDJSON/CSV export one encoded batch at a time. The generator
+    opens its own session because it outlives the request handler: the
+    response body is still being sent after the route has returned.
+    """
+    statement = export.export_statement(kind, **filters)
+    names = [column.key for column in export.EXPORT_COLUMNS[kind]]
+    async with session_factory() as db:
+        result = await db.stream(statement.execution_options(yield_per=batch_size))
+        yield export.encode_header(fmt, names)
+        async for rows in result.partitions():
+            yield export.encode_rows(fmt, names, rows)
@@ -0,0 +1,199 @@
+# app/crud/bulk_import.py
+"""
+Streaming bulk import of books and users from CSV or JSONL.
+
+Input is consumed in chunks of lines, so memory stays flat whatever the
+file size. Each chunk is validated against BookCreate / UserCreate and
+written as one multi-row INSERT ... ON CONFLICT DO UPDATE (Postgres and
+SQLite), upserting on isbn / email. Bad rows are reported by line number and
+skipped; they never abort the load.
+"""
+
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.crud.crud import pickup_deadline, rebalance_counter_slots, serve_holds_from_shelf
+from app.models.models import Book, User
+from app.schemas.schemas import BookCreate, UserCreate
+
+FORMATS = ("csv", "jsonl")
+MAX_REPORTED_ERRORS = 100
+
+
+def _book_values(book: BookCreate) -> dict:
+    values = book.model_dump()
+    values["available_copies"] = book.total_copies
+    return values
+
+
+def _book_upsert_set(excluded) -> dict:
+    # Keep outstanding loans: shift available_copies by the change in total_copies.
+    return {
+        "title": excluded.title,
+        "author": excluded.author,
+        "publication_year": excluded.publication_year,
+        "total_copies": excluded.total_copies,
+        "available_copies": Book.available_copies + excluded.total_copies - Book.total_copies,
+        "version": Book.version + 1,
+    }
+
+
+def _book_after_upsert(db: Session, isbns: list, hold_hours: Optional[int]):
+    # sharded titles got the total_copies change in the column; spread it over their slots
+    rebalance_counter_slots(db, Book.isbn.in_(isbns))
+    # copies added to a title with a queue go to its waiting holds, not the shelf
+    serve_holds_from_shelf(db, Book.isbn.in_(isbns), pickup_deadline(datetime.utcnow(), hold_hours))
+
+
+def _user_upsert_set(excluded) -> dict:
+    return {"name": excluded.name, "version": User.version + 1}
+
+
+# kind -> (schema, model, conflict column, row builder, ON CONFLICT SET builder, after-upsert hook)
+IMPORTERS = {
+    "books": (BookCreate, Book, "isbn", _book_values, _book_upsert_set, _book_after_upsert),
+    "users": (UserCreate, User, "email", lambda user: user.model_dump(), _user_upsert_set, None),
+}
+
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+async def aiter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of UTF-8 byte chunks (e.g. a request body) into lines."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_chunks(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CatalogImport:
+    """
+    Incremental importer: call parse() with successive chunks of input lines
+    and write() with the rows it returns, then read the report. The split lets
+    the CLI drive it with a sync Session and the API with AsyncSession.run_sync.
+    CSV input needs a header row and one record per line.
+    """
+
+    def __init__(self, kind: str, fmt: str, hold_hours: Optional[int] = None):
+        if kind not in IMPORTERS:
+            raise ValueError(f"Unknown import kind: {kind}")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown import format: {fmt}")
+        self.schema, self.model, self.key, self.to_values, self.upsert_set, self.after_upsert = IMPORTERS[kind]
+        self.fmt = fmt
+        self.hold_hours = hold_hours
+        self.header = None
+        self.line_no = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def _fail(self, line_no: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": error})
+
+    def _records(self, lines):
+        for line in lines:
+            self.line_no += 1
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                continue
+            if self.fmt == "jsonl":
+                try:
+                    yield self.line_no, json.loads(line)
+                except ValueError as e:
+                    self._fail(self.line_no, f"Invalid JSON: {e}")
+            elif self.header is None:
+                self.header = next(csv.reader([line]))
+            else:
+                yield self.line_no, dict(zip(self.header, next(csv.reader([line]))))
+
+    def parse(self, lines: Iterable[str]) -> list:
+        """
+        Validate a chunk of lines. Returns [(line_no, values)] with one entry
+        per conflict key - the last occurrence wins, as it would row by row.
+        """
+        rows = {}
+        for line_no, record in self._records(lines):
+            try:
+                values = self.to_values(self.schema.model_validate(record))
+            except ValidationError as e:
+                self._fail(line_no, "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+                ))
+                continue
+            rows.pop(values[self.key], None)
+            rows[values[self.key]] = (line_no, values)
+        return list(rows.values())
+
+    def _statement(self, dialect_name: str, values: list):
+        table = self.model.__table__
+        make_insert = _UPSERT_DIALECTS.get(dialect_name)
+        if make_insert is None:
+            return insert(table).values(values)
+        stmt = make_insert(table).values(values)
+        return stmt.on_conflict_do_update(index_elements=[self.key], set_=self.upsert_set(stmt.excluded))
+
+    def _upsert(self, db: Session, dialect_name: str, values: list):
+        db.execute(self._statement(dialect_name, values))
+        if self.after_upsert is not None:
+            self.after_upsert(db, [row[self.key] for row in values], self.hold_hours)
+        db.commit()
+
+    def write(self, db: Session, rows: list):
+        """Upsert one parsed chunk in a single statement and commit it."""
+        if not rows:
+            return
+        dialect_name = db.get_bind().dialect.name
+        try:
+            self._upsert(db, dialect_name, [values for _, values in rows])
+            self.imported += len(rows)
+        except IntegrityError:
+            # Something in the chunk violates a constraint the upsert does not
+            # cover; retry row by row so only the offending rows are rejected.
+            db.rollback()
+            for line_no, values in rows:
+                try:
+                    self._upsert(db, dialect_name, [values])
+                    self.imported += 1
+                except IntegrityError as e:
+                    db.rollback()
+                    self._fail(line_no, str(e.orig))
+
+    def report(self) -> dict:
+        return {"imported": self.imported, "failed": self.failed, "errors": self.errors}
+
+
+def import_lines(db: Session, kind: str, fmt: str, lines: Iterable[str], chunk_size: int,
+                 hold_hours: Optional[int] = None) -> dict:
+    job = CatalogImport(kind, fmt, hold_hours)
+    for chunk in iter_chunks(lines, chunk_size):
+        job.write(db, job.parse(chunk))
+    return job.report()
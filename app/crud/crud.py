@@ -1,38 +1,720 @@
 # app/crud/crud.py
 
-from sqlalchemy.orm import Session
-from datetime import datetime
-from app.models.models import User, Book, Loan, LoanStatusEnum
+from collections import Counter
+from types import SimpleNamespace
+
+from sqlalchemy import Integer, bindparam, case, delete, func, insert, literal, select, text, tuple_, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import datetime, timedelta
+from typing import Optional
+from app.config.settings import settings
+from app.models.models import (
+    User, Book, BookCopySlot, Loan, ArchivedLoan, Hold, HoldStatusEnum, IdempotencyKey, LoanStatusEnum,
+    archive_partition_ddl, available_copies_expression, loan_history_models,
+)
+from app.utils.pagination import decode_keys, encode_cursor, keyset_paginate
+
+DEFAULT_PAGE_SIZE = 50
+
+# List reads select these columns, named and ordered like the response
+# models' fields, instead of whole ORM objects: rows skip identity-map
+# bookkeeping and are encoded to JSON as they are.
+BOOK_COLUMNS = (Book.title, Book.author, Book.isbn, Book.publication_year, Book.total_copies,
+                Book.id, available_copies_expression().label("available_copies"), Book.version)
+USER_COLUMNS = (User.name, User.email, User.id, User.version)
+
+def loan_columns(model=Loan):
+    """The loan list columns, from `loans` or from loans_archive."""
+    return (model.id, model.book_id, model.user_id, model.borrow_date, model.due_date,
+            model.return_date, model.status, model.version)
+
+LOAN_COLUMNS = loan_columns(Loan)
+
+# -------------------
+# Availability counters
+# -------------------
+# A title is either simple (books.available_copies holds the count) or
+# sharded over BookCopySlot rows (books.counter_slots > 0). Every copy
+# update below first tries the simple-mode UPDATE, which matches no row for
+# a sharded title and so takes no lock on it, then falls back to the slots.
+def _claim_book_statement(book_id: int, count: int = 1):
+    return (
+        update(Book)
+        .where(Book.id == book_id, Book.available_copies >= count, Book.counter_slots == 0)
+        .values(available_copies=Book.available_copies - count)
+        .execution_options(synchronize_session=False)
+    )
+
+def _claim_slot_statement(book_id: int, skip_locked: bool = True):
+    """
+    Take one copy from any slot that has one. On Postgres the slot is picked
+    with FOR UPDATE SKIP LOCKED, so concurrent borrowers of one title each
+    grab a different slot instead of waiting on the first.
+    """
+    pick = (
+        select(BookCopySlot.slot)
+        .where(BookCopySlot.book_id == book_id, BookCopySlot.available > 0)
+        .limit(1)
+        .with_for_update(skip_locked=skip_locked)
+        .scalar_subquery()
+    )
+    return (
+        update(BookCopySlot)
+        .where(BookCopySlot.book_id == book_id, BookCopySlot.slot == pick)
+        .values(available=BookCopySlot.available - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def _claim_slot_copies(db: Session, book_id: int, count: int) -> bool:
+    """Take `count` copies across a sharded title's slots, all or none."""
+    slots = db.execute(
+        select(BookCopySlot.slot, BookCopySlot.available)
+        .where(BookCopySlot.book_id == book_id, BookCopySlot.available > 0)
+        .with_for_update()
+    ).all()
+    if sum(available for _, available in slots) < count:
+        return False
+    taken = []
+    for slot, available in slots:
+        take = min(available, count)
+        taken.append({"b_id": book_id, "s": slot, "n": take})
+        count -= take
+        if not count:
+            break
+    db.execute(
+        update(BookCopySlot.__table__)
+        .where(BookCopySlot.book_id == bindparam("b_id"), BookCopySlot.slot == bindparam("s"))
+        .values(available=BookCopySlot.available - bindparam("n")),
+        taken,
+    )
+    return True
+
+def _restore_slot_copies(db: Session, loans):
+    """
+    Put returned copies of sharded titles back, each loan (or hold) into slot
+    id % N, capped like simple titles: column plus slots never exceed
+    total_copies.
+    """
+    book_ids = {loan.book_id for loan in loans}
+    sharded = dict(db.execute(
+        select(Book.id, Book.counter_slots).where(Book.id.in_(book_ids), Book.counter_slots > 0)
+    ).all())
+    per_slot = Counter((loan.book_id, loan.id % sharded[loan.book_id]) for loan in loans if loan.book_id in sharded)
+    if per_slot:
+        slots, books = BookCopySlot.__table__, Book.__table__
+        every_slot = slots.alias("every_slot")
+        room = (
+            select(
+                books.c.total_copies - books.c.available_copies
+                - select(func.coalesce(func.sum(every_slot.c.available), 0))
+                .where(every_slot.c.book_id == bindparam("b_id"))
+                .scalar_subquery()
+            )
+            .where(books.c.id == bindparam("b_id"))
+            .scalar_subquery()
+        )
+        returned = bindparam("n", type_=Integer)
+        db.execute(
+            update(slots)
+            .where(slots.c.book_id == bindparam("b_id"), slots.c.slot == bindparam("s"))
+            .values(available=slots.c.available + case(
+                (room < returned, case((room > 0, room), else_=0)), else_=returned,
+            )),
+            [{"b_id": book_id, "s": slot, "n": n} for (book_id, slot), n in per_slot.items()],
+        )
+
+def _restore_copies(db: Session, items):
+    """Put one copy per item (a returned loan, a lapsed hold) back on the shelf, capped at total_copies."""
+    per_book = Counter(item.book_id for item in items)
+    if per_book:
+        books = Book.__table__
+        restored = books.c.available_copies + bindparam("returned")
+        db.execute(
+            update(books)
+            .where(books.c.id == bindparam("b_id"), books.c.counter_slots == 0)
+            .values(available_copies=case((restored > books.c.total_copies, books.c.total_copies), else_=restored)),
+            [{"b_id": book_id, "returned": count} for book_id, count in per_book.items()],
+        )
+        _restore_slot_copies(db, items)
+
+def _spread_copies(db: Session, book: Book, slots: int):
+    """
+    Move a title's whole availability (column plus slots) into `slots` even
+    slot rows, or back into the column when `slots` is 0. Locks the title.
+    """
+    held = db.scalars(
+        select(BookCopySlot.available).where(BookCopySlot.book_id == book.id).with_for_update()
+    ).all()
+    available = book.available_copies + sum(held)
+    db.execute(delete(BookCopySlot).where(BookCopySlot.book_id == book.id))
+    book.counter_slots = slots
+    book.available_copies = available
+    if slots:
+        share, extra = divmod(max(available, 0), slots)
+        db.execute(insert(BookCopySlot), [
+            {"book_id": book.id, "slot": n, "available": share + (n < extra)} for n in range(slots)
+        ])
+        # a negative count (copies removed while out on loan) stays in the column
+        book.available_copies = min(available, 0)
+
+def set_counter_slots(db: Session, book_id: int, slots: int):
+    """
+    Switch a title between simple mode (slots=0) and N sharded slot rows,
+    keeping its available count.
+    """
+    book = db.scalars(select(Book).where(Book.id == book_id).with_for_update()).first()
+    if not book:
+        raise Exception("Book not found")
+    _spread_copies(db, book, slots)
+    db.commit()
+    return get_book(db, book_id)
+
+def rebalance_counter_slots(db: Session, condition):
+    """Re-spread the sharded titles matching `condition` after their totals changed."""
+    for book in db.scalars(select(Book).where(condition, Book.counter_slots > 0).with_for_update()):
+        _spread_copies(db, book, book.counter_slots)
+
 
 # -------------------
 # Loans CRUD
 # -------------------
-def create_loan(db: Session, book_id: int, user_id: int):
-    book = db.query(Book).filter(Book.id == book_id).first()
-    if not book or book.available_copies <= 0:
-        raise Exception("Book not available")
-    loan = Loan(user_id=user_id, book_id=book_id, status=LoanStatusEnum.BORROWED)
-    book.available_copies -= 1
-    db.add(loan)
+def _borrow_cte_statement(book_id: int, user_id: int, now: datetime, due: datetime, skip_locked: bool = True):
+    """
+    Postgres: claim a copy and insert the loan in a single statement.
+    The INSERT selects from the UPDATEs' RETURNING rows - the books row for a
+    simple title, a slot row for a sharded one; only one of them can match -
+    so when no copy is left the CTEs return nothing and no loan is written.
+    """
+    claimed_book = _claim_book_statement(book_id).returning(Book.id).cte("claimed_book")
+    claimed_slot = (
+        _claim_slot_statement(book_id, skip_locked).returning(BookCopySlot.book_id.label("id")).cte("claimed_slot")
+    )
+    claimed = union_all(select(claimed_book.c.id), select(claimed_slot.c.id)).subquery("claimed")
+    return (
+        insert(Loan)
+        .from_select(
+            ["user_id", "book_id", "status", "borrow_date", "due_date"],
+            select(
+                literal(user_id),
+                claimed.c.id,
+                literal(LoanStatusEnum.BORROWED, Loan.__table__.c.status.type),
+                literal(now, Loan.__table__.c.borrow_date.type),
+                literal(due, Loan.__table__.c.due_date.type),
+            ),
+        )
+        .returning(Loan)
+    )
+
+def create_loan(db: Session, book_id: int, user_id: int, loan_days: Optional[int] = None):
+    """
+    Borrow a copy without reading the book first. The decrement is a
+    conditional UPDATE (available_copies > 0), so the database - not Python -
+    decides who gets the last copy and concurrent borrows cannot oversell.
+    A patron whose hold is READY gets the copy held for them instead.
+    The loan is due `loan_days` (default LOAN_PERIOD_DAYS) from now.
+    """
+    now = datetime.utcnow()
+    due = now + timedelta(days=loan_days if loan_days is not None else settings.LOAN_PERIOD_DAYS)
+    if _fulfil_holds(db, [(user_id, book_id)], now):
+        loan = _insert_loan(db, book_id, user_id, now, due)
+    elif db.get_bind().dialect.name == "postgresql":
+        loan = db.scalars(_borrow_cte_statement(book_id, user_id, now, due)).first()
+        if loan is None:
+            # every slot with a copy may have been locked by other borrowers;
+            # wait for them once before saying no
+            loan = db.scalars(_borrow_cte_statement(book_id, user_id, now, due, skip_locked=False)).first()
+        if loan is None:
+            db.rollback()
+            raise Exception("Book not available")
+    else:
+        claimed = (
+            db.execute(_claim_book_statement(book_id)).rowcount == 1
+            or db.execute(_claim_slot_statement(book_id)).rowcount == 1
+        )
+        if not claimed:
+            db.rollback()
+            raise Exception("Book not available")
+        loan = _insert_loan(db, book_id, user_id, now, due)
     db.commit()
-    db.refresh(loan)
     return loan
 
-def return_loan(db: Session, loan_id: int):
-    loan = db.query(Loan).filter(Loan.id == loan_id).first()
-    if not loan or loan.status != LoanStatusEnum.BORROWED:
+def _insert_loan(db: Session, book_id: int, user_id: int, now: datetime, due: datetime):
+    return db.scalars(
+        insert(Loan)
+        .values(user_id=user_id, book_id=book_id, status=LoanStatusEnum.BORROWED, borrow_date=now, due_date=due)
+        .returning(Loan)
+    ).one()
+
+def return_loan(db: Session, loan_id: int, hold_hours: Optional[int] = None):
+    """
+    Return a loan with conditional UPDATEs in one transaction: the loan
+    flips only if it is still BORROWED, then the copy goes to the title's
+    oldest waiting hold (READY for `hold_hours`) or, if nobody is waiting,
+    back on the shelf while available_copies is below total_copies.
+    """
+    now = datetime.utcnow()
+    loan = db.scalars(
+        update(Loan)
+        .where(Loan.id == loan_id, Loan.status == LoanStatusEnum.BORROWED)
+        .values(status=LoanStatusEnum.RETURNED, return_date=now, version=Loan.version + 1)
+        .returning(Loan)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if loan is None:
+        db.rollback()
         raise Exception("Loan not valid for return")
-    loan.status = LoanStatusEnum.RETURNED
-    loan.return_date = datetime.utcnow()
-    book = db.query(Book).filter(Book.id == loan.book_id).first()
-    if book:
-        book.available_copies += 1
+    if not _promote_holds(db, loan.book_id, 1, pickup_deadline(now, hold_hours)):
+        restored = db.execute(
+            update(Book)
+            .where(Book.id == loan.book_id, Book.available_copies < Book.total_copies, Book.counter_slots == 0)
+            .values(available_copies=Book.available_copies + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if restored.rowcount != 1:
+            _restore_slot_copies(db, [loan])
     db.commit()
-    db.refresh(loan)
     return loan
 
-def get_loans(db: Session):
-    return db.query(Loan).all()
+def _claim_copies(db: Session, book_id: int, count: int) -> bool:
+    if db.execute(_claim_book_statement(book_id, count)).rowcount == 1:
+        return True
+    return _claim_slot_copies(db, book_id, count)
+
+def create_loans_batch(db: Session, items, atomic: bool = True, loan_days: Optional[int] = None):
+    """
+    Borrow many (user_id, book_id) items in one transaction.
+
+    Copies are claimed with one conditional UPDATE per distinct title and
+    all loans are written with a single multi-row INSERT ... RETURNING.
+    In partial mode a title that cannot cover its whole demand falls back
+    to claiming copy by copy, so as many items as possible succeed. Items
+    whose patron has a READY hold on the title take the held copy.
+
+    Returns (committed, results) where results[i] is (loan, error) for items[i].
+    """
+    now = datetime.utcnow()
+    due = now + timedelta(days=loan_days if loan_days is not None else settings.LOAN_PERIOD_DAYS)
+    errors = [None] * len(items)
+    held = _fulfil_holds(db, {(item.user_id, item.book_id) for item in items}, now)
+    from_hold = []
+    for item in items:
+        from_hold.append((item.user_id, item.book_id) in held)
+        held.discard((item.user_id, item.book_id))
+    demand = Counter(item.book_id for item, hold in zip(items, from_hold) if not hold)
+
+    for book_id, count in demand.items():
+        if _claim_copies(db, book_id, count):
+            continue
+        if atomic:
+            db.rollback()
+            return False, [
+                (None, "Book not available" if item.book_id == book_id else "Batch rolled back")
+                for item in items
+            ]
+        for i, item in enumerate(items):
+            if item.book_id == book_id and not from_hold[i] and not _claim_copies(db, book_id, 1):
+                errors[i] = "Book not available"
+
+    granted = [i for i, error in enumerate(errors) if error is None]
+    loans = []
+    if granted:
+        loans = db.scalars(
+            insert(Loan).returning(Loan, sort_by_parameter_order=True),
+            [
+                {"user_id": items[i].user_id, "book_id": items[i].book_id,
+                 "status": LoanStatusEnum.BORROWED, "borrow_date": now, "due_date": due}
+                for i in granted
+            ],
+        ).all()
+    db.commit()
+
+    results = [(None, error) for error in errors]
+    for i, loan in zip(granted, loans):
+        results[i] = (loan, None)
+    return True, results
+
+def return_loans_batch(db: Session, loan_ids, atomic: bool = True, hold_hours: Optional[int] = None):
+    """
+    Return many loans in one transaction: a single UPDATE ... WHERE id IN
+    (...) AND status = BORROWED flips every returnable loan, waiting holds
+    get their copies per title, then one executemany puts the rest back,
+    capped at total_copies.
+
+    Returns (committed, results) where results[i] is (loan, error) for loan_ids[i].
+    """
+    now = datetime.utcnow()
+    returned = db.scalars(
+        update(Loan)
+        .where(Loan.id.in_(set(loan_ids)), Loan.status == LoanStatusEnum.BORROWED)
+        .values(status=LoanStatusEnum.RETURNED, return_date=now, version=Loan.version + 1)
+        .returning(Loan)
+        .execution_options(synchronize_session=False)
+    ).all()
+    by_id = {loan.id: loan for loan in returned}
+
+    results, seen = [], set()
+    for loan_id in loan_ids:
+        if loan_id in by_id and loan_id not in seen:
+            results.append((by_id[loan_id], None))
+        elif loan_id in seen:
+            results.append((None, "Duplicate loan_id in batch"))
+        else:
+            results.append((None, "Loan not valid for return"))
+        seen.add(loan_id)
+
+    if atomic and any(error for _, error in results):
+        db.rollback()
+        return False, [(None, error or "Batch rolled back") for _, error in results]
+
+    _hand_over_copies(db, returned, pickup_deadline(now, hold_hours))
+    db.commit()
+    return True, results
+
+def _loans_page(db: Session, status: Optional[LoanStatusEnum], limit: int, after: Optional[str], **filters):
+    """
+    One keyset page of loans by id. Active loans are only ever in `loans`;
+    any other read also covers loans_archive: each table contributes its
+    own first limit + 1 matches (an index range scan each) and the merged
+    page is the lowest ids of those.
+    """
+    after_id = decode_keys(after, [Loan.id])[0] if after is not None else None
+    branches = []
+    for model in loan_history_models(status):
+        branch = select(*loan_columns(model)).where(*(getattr(model, k) == v for k, v in filters.items()))
+        if status is not None:
+            branch = branch.where(model.status == status)
+        if after_id is not None:
+            branch = branch.where(model.id > after_id)
+        branches.append(branch.order_by(model.id).limit(limit + 1))
+    if len(branches) == 1:
+        rows = db.execute(branches[0]).all()
+    else:
+        merged = union_all(*(select(branch.subquery()) for branch in branches)).subquery()
+        rows = db.execute(select(merged).order_by(merged.c.id).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].id])
+    return rows, next_cursor
+
+def get_loans(db: Session, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+              status: Optional[LoanStatusEnum] = None):
+    return _loans_page(db, status, limit, after)
+
+def get_user_loans(db: Session, user_id: int, status: Optional[LoanStatusEnum] = None,
+                   limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    """A user's loans by id, served from ix_loans_user_id_status_id (and its archive index)."""
+    return _loans_page(db, status, limit, after, user_id=user_id)
+
+def get_book_loans(db: Session, book_id: int, status: Optional[LoanStatusEnum] = None,
+                   limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    """A book's loans by id, served from ix_loans_book_id_status_id (and its archive index)."""
+    return _loans_page(db, status, limit, after, book_id=book_id)
+
+def get_overdue_loans(db: Session, now: datetime, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    """Active loans past due, longest overdue first, served from ix_loans_active_due_date."""
+    query = db.query(*LOAN_COLUMNS).filter(Loan.status == LoanStatusEnum.BORROWED, Loan.due_date < now)
+    return keyset_paginate(query, [Loan.due_date, Loan.id], limit, after)
+
+def mark_overdue_loans(db: Session, now: datetime, batch_size: int):
+    """
+    Stamp overdue_notified_at on up to `batch_size` overdue loans that have
+    not been stamped yet, longest overdue first, and return them. One short
+    UPDATE per batch; the candidates are read from ix_loans_unnotified_due_date,
+    so the cost follows the number of loans still to notify, not the table
+    size or the loans stamped by earlier runs.
+    On Postgres they are locked with SKIP LOCKED, so concurrent scanners
+    take disjoint batches.
+    """
+    candidates = (
+        select(Loan.id)
+        .where(Loan.status == LoanStatusEnum.BORROWED, Loan.due_date < now, Loan.overdue_notified_at.is_(None))
+        .order_by(Loan.due_date, Loan.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    loans = db.scalars(
+        update(Loan)
+        .where(Loan.id.in_(candidates), Loan.overdue_notified_at.is_(None))
+        .values(overdue_notified_at=now)
+        .returning(Loan)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return loans
+
+
+# -------------------
+# Holds
+# -------------------
+# A title's queue is its WAITING holds in id order, read through a partial
+# index on (book_id, id): promoting the head is one index probe and a
+# position is a count over the entries ahead. A copy moves to the head
+# inside the transaction that frees it (a return, a lapsed or cancelled
+# READY hold), so it never reaches the shelf while someone is waiting.
+def _hold_position():
+    """1-based place in the queue of a WAITING hold, else NULL."""
+    ahead = aliased(Hold)
+    count = (
+        select(func.count())
+        .where(ahead.book_id == Hold.book_id, ahead.status == HoldStatusEnum.WAITING, ahead.id <= Hold.id)
+        .scalar_subquery()
+    )
+    return case((Hold.status == HoldStatusEnum.WAITING, count), else_=None)
+
+HOLD_COLUMNS = (Hold.id, Hold.book_id, Hold.user_id, Hold.status, Hold.created_at, Hold.ready_until,
+                _hold_position().label("position"))
+
+def pickup_deadline(now: datetime, hold_hours: Optional[int]) -> datetime:
+    """When a copy handed over now stops being held: `hold_hours` (default HOLD_PICKUP_HOURS) later."""
+    return now + timedelta(hours=hold_hours if hold_hours is not None else settings.HOLD_PICKUP_HOURS)
+
+def _promote_holds(db: Session, book_id: int, count: int, ready_until: datetime) -> list:
+    """
+    Make the title's `count` oldest WAITING holds READY until `ready_until`;
+    returns them. Concurrent returns of one title skip each other's locked
+    heads on Postgres instead of waiting for them.
+    """
+    head = (
+        select(Hold.id)
+        .where(Hold.book_id == book_id, Hold.status == HoldStatusEnum.WAITING)
+        .order_by(Hold.id)
+        .limit(count)
+        .with_for_update(skip_locked=True)
+    )
+    return db.scalars(
+        update(Hold)
+        .where(Hold.id.in_(head), Hold.status == HoldStatusEnum.WAITING)
+        .values(status=HoldStatusEnum.READY, ready_until=ready_until)
+        .returning(Hold)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+def _fulfil_holds(db: Session, pairs, now: datetime) -> set:
+    """Close the unexpired READY holds of these (user_id, book_id) pairs; returns the pairs that had one."""
+    if not pairs:
+        return set()
+    fulfilled = db.execute(
+        update(Hold)
+        .where(
+            tuple_(Hold.user_id, Hold.book_id).in_(list(pairs)),
+            Hold.status == HoldStatusEnum.READY,
+            Hold.ready_until > now,
+        )
+        .values(status=HoldStatusEnum.FULFILLED)
+        .returning(Hold.user_id, Hold.book_id)
+        .execution_options(synchronize_session=False)
+    )
+    return {tuple(row) for row in fulfilled}
+
+def _hand_over_copies(db: Session, items, ready_until: datetime):
+    """One copy per item goes to its title's next WAITING hold; copies nobody waits for go back on the shelf."""
+    handed = Counter({
+        book_id: len(_promote_holds(db, book_id, count, ready_until))
+        for book_id, count in Counter(item.book_id for item in items).items()
+    })
+    shelved = []
+    for item in items:
+        if handed[item.book_id]:
+            handed[item.book_id] -= 1
+        else:
+            shelved.append(item)
+    _restore_copies(db, shelved)
+
+def serve_holds_from_shelf(db: Session, condition, ready_until: datetime):
+    """
+    Move copies on the shelf of the titles matching `condition` to their
+    WAITING holds. For copies that reach the shelf without a return handing
+    them over: an import raising total_copies, a return racing a new hold.
+    """
+    waiting = (
+        select(Hold.book_id, func.count().label("waiting"))
+        .where(Hold.status == HoldStatusEnum.WAITING)
+        .group_by(Hold.book_id)
+        .subquery()
+    )
+    shelved = db.execute(
+        select(Book.id, waiting.c.waiting, available_copies_expression())
+        .join(waiting, waiting.c.book_id == Book.id)
+        .where(condition, available_copies_expression() > 0)
+    ).all()
+    for book_id, count, available in shelved:
+        take = min(count, available)
+        if not _claim_copies(db, book_id, take):
+            continue  # borrowed in the meantime
+        handed = len(_promote_holds(db, book_id, take, ready_until))
+        # heads locked by a concurrent return go back on the shelf
+        _restore_copies(db, [SimpleNamespace(book_id=book_id, id=n) for n in range(take - handed)])
+
+def create_hold(db: Session, book_id: int, user_id: int, hold_hours: Optional[int] = None):
+    """
+    Join the title's queue. Only while no copy is on the shelf: those can
+    simply be borrowed. The books row is locked for the check (Postgres), and
+    a copy returned before the hold commits is handed to the queue at once.
+    """
+    available = db.scalar(
+        select(available_copies_expression()).where(Book.id == book_id).with_for_update(of=Book)
+    )
+    if available is None:
+        raise Exception("Book not found")
+    if available > 0:
+        raise Exception("Book is available; borrow it instead")
+    if db.scalar(select(User.id).where(User.id == user_id)) is None:
+        raise Exception("User not found")
+    try:
+        hold_id = db.scalar(
+            insert(Hold)
+            .values(book_id=book_id, user_id=user_id, status=HoldStatusEnum.WAITING, created_at=datetime.utcnow())
+            .returning(Hold.id)
+        )
+        serve_holds_from_shelf(db, Book.id == book_id, pickup_deadline(datetime.utcnow(), hold_hours))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise Exception("User already has an open hold on this book")
+    return get_hold(db, book_id, hold_id)
+
+def get_hold(db: Session, book_id: int, hold_id: int):
+    return db.execute(select(*HOLD_COLUMNS).where(Hold.id == hold_id, Hold.book_id == book_id)).first()
+
+def cancel_hold(db: Session, book_id: int, hold_id: int, hold_hours: Optional[int] = None):
+    """Leave the queue; a READY hold's copy goes to the next in line."""
+    status = db.scalar(select(Hold.status).where(Hold.id == hold_id, Hold.book_id == book_id))
+    if status not in (HoldStatusEnum.WAITING, HoldStatusEnum.READY):
+        raise Exception("Hold not found or already closed")
+    cancelled = db.execute(
+        update(Hold)
+        .where(Hold.id == hold_id, Hold.status == status)
+        .values(status=HoldStatusEnum.CANCELLED)
+        .returning(Hold.id, Hold.book_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not cancelled:
+        db.rollback()
+        raise Exception("Hold not found or already closed")
+    if status == HoldStatusEnum.READY:
+        _hand_over_copies(db, cancelled, pickup_deadline(datetime.utcnow(), hold_hours))
+    db.commit()
+    return get_hold(db, book_id, hold_id)
+
+def expire_holds(db: Session, now: datetime, batch_size: int, hold_hours: Optional[int] = None):
+    """
+    Expire up to `batch_size` READY holds whose pickup window has passed and
+    pass their copies on; returns the expired (id, book_id) rows.
+    """
+    lapsed = (
+        select(Hold.id)
+        .where(Hold.status == HoldStatusEnum.READY, Hold.ready_until <= now)
+        .order_by(Hold.ready_until, Hold.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    expired = db.execute(
+        update(Hold)
+        .where(Hold.id.in_(lapsed), Hold.status == HoldStatusEnum.READY)
+        .values(status=HoldStatusEnum.EXPIRED)
+        .returning(Hold.id, Hold.book_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    _hand_over_copies(db, expired, pickup_deadline(now, hold_hours))
+    db.commit()
+    return expired
+
+
+# -------------------
+# Loan archival
+# -------------------
+ARCHIVE_COLUMNS = ("id", "user_id", "book_id", "borrow_date", "due_date", "return_date", "status", "version")
+
+def archive_loans(db: Session, returned_before: datetime, batch_size: int) -> int:
+    """
+    Move up to `batch_size` loans returned before `returned_before` from
+    `loans` to loans_archive in one transaction; returns how many moved.
+    Candidates are locked with SKIP LOCKED on Postgres, so several workers
+    can archive at once. Returned loans never change again, so the copy is
+    exact.
+    """
+    candidates = db.execute(
+        select(Loan.id, Loan.borrow_date)
+        .where(Loan.status == LoanStatusEnum.RETURNED, Loan.return_date < returned_before)
+        .order_by(Loan.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not candidates:
+        db.rollback()
+        return 0
+    if db.get_bind().dialect.name == "postgresql":
+        for year in sorted({row.borrow_date.year for row in candidates}):
+            db.execute(text(archive_partition_ddl(year)))
+
+    ids = [row.id for row in candidates]
+    source = select(*(getattr(Loan, name) for name in ARCHIVE_COLUMNS)).where(Loan.id.in_(ids))
+    db.execute(insert(ArchivedLoan).from_select(ARCHIVE_COLUMNS, source))
+    db.execute(delete(Loan).where(Loan.id.in_(ids)).execution_options(synchronize_session=False))
+    db.commit()
+    return len(ids)
+
+
+# -------------------
+# Idempotency keys
+# -------------------
+IDEMPOTENCY_COLUMNS = (IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.content_type,
+                       IdempotencyKey.body, IdempotencyKey.expires_at)
+
+def get_idempotency_record(db: Session, key: bytes):
+    return db.execute(select(*IDEMPOTENCY_COLUMNS).where(IdempotencyKey.key == key)).first()
+
+def claim_idempotency_key(db: Session, key: bytes, fingerprint: bytes, now: datetime, lease_until: datetime):
+    """
+    Take the key for a new request until `lease_until`. Returns None when
+    the caller now owns it, else the existing record (a stored response, or
+    a request still in flight). An expired record, either an old response
+    or the lease of a request that died, is taken over.
+    """
+    while True:
+        try:
+            db.execute(insert(IdempotencyKey).values(key=key, fingerprint=fingerprint, expires_at=lease_until))
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+        taken = db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+            .values(fingerprint=fingerprint, status_code=None, content_type=None, body=None, expires_at=lease_until)
+        )
+        db.commit()
+        if taken.rowcount:
+            return None
+        record = get_idempotency_record(db, key)
+        if record is not None:
+            return record
+        # purged between the insert and the read: try the insert again
+
+def save_idempotent_response(db: Session, key: bytes, status_code: int, content_type: Optional[str],
+                             body: bytes, expires_at: datetime):
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+        .values(status_code=status_code, content_type=content_type, body=body, expires_at=expires_at)
+    )
+    db.commit()
+
+def release_idempotency_key(db: Session, key: bytes):
+    """Drop an in-flight claim, so a retry runs the request again."""
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)))
+    db.commit()
+
+def purge_idempotency_keys(db: Session, now: datetime, batch_size: int) -> int:
+    """Delete up to `batch_size` expired keys; returns how many went."""
+    expired = select(IdempotencyKey.key).where(IdempotencyKey.expires_at <= now).limit(batch_size)
+    purged = db.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired))).rowcount
+    db.commit()
+    return purged
 
 
 # -------------------
@@ -46,15 +728,19 @@ def create_user(db: Session, user_data):
     return user
 
 def get_user(db: Session, user_id: int):
-    return db.query(User).filter(User.id == user_id).first()
+    return db.query(*USER_COLUMNS).filter(User.id == user_id).first()
 
-def get_users(db: Session):
-    return db.query(User).all()
+def get_users(db: Session, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    return keyset_paginate(db.query(*USER_COLUMNS), [User.id], limit, after)
 
 
 # -------------------
 # Books CRUD
 # -------------------
+class VersionConflict(Exception):
+    """The row is not at the version the client expected (HTTP 412 / 409)."""
+
+
 def create_book(db: Session, book_data):
     book = Book(
         title=book_data.title,
@@ -70,15 +756,34 @@ def create_book(db: Session, book_data):
     return book
 
 def get_book(db: Session, book_id: int):
-    return db.query(Book).filter(Book.id == book_id).first()
+    return db.query(*BOOK_COLUMNS).filter(Book.id == book_id).first()
 
-def get_books(db: Session):
-    return db.query(Book).all()
+def get_books(db: Session, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None):
+    return keyset_paginate(db.query(*BOOK_COLUMNS), [Book.id], limit, after)
 
-def update_book(db: Session, book_id: int, book_data):
+def get_availability(db: Session, book_ids) -> dict:
+    """{book_id: available_copies} for these titles, in one query; unknown ids are left out."""
+    return dict(db.execute(
+        select(Book.id, available_copies_expression()).where(Book.id.in_(set(book_ids)))
+    ).all())
+
+def update_book(db: Session, book_id: int, book_data, expected_version: Optional[int] = None,
+                hold_hours: Optional[int] = None):
+    """
+    Edit a title. With `expected_version` (a client's If-Match) the edit only
+    applies to that version; the ORM also checks the version in the UPDATE
+    itself, so another edit committed in between is never overwritten.
+    Borrows and returns do not bump the version: the change in total_copies
+    is applied to available_copies in SQL, so one committed in between is
+    kept rather than overwritten. Added copies go to waiting holds first,
+    as a returned copy does; the rest go on the shelf.
+    """
     book = db.query(Book).filter(Book.id == book_id).first()
     if not book:
         raise Exception("Book not found")
+    if expected_version is not None and book.version != expected_version:
+        db.rollback()
+        raise VersionConflict(f"Book is at version {book.version}, not {expected_version}")
     
     # Update fields
     book.title = book_data.title
@@ -88,12 +793,27 @@ def update_book(db: Session, book_id: int, book_data):
     
     # Adjust copies
     diff = book_data.total_copies - book.total_copies
+    shelved = diff
+    if diff > 0:
+        # copies still owed for loans out past a shrunk total are not free to hand over
+        available = db.scalar(select(available_copies_expression()).where(Book.id == book_id))
+        free = min(diff, max(available + diff, 0))
+        if free:
+            shelved -= len(_promote_holds(db, book_id, free, pickup_deadline(datetime.utcnow(), hold_hours)))
     book.total_copies = book_data.total_copies
-    book.available_copies += diff
-    
-    db.commit()
-    db.refresh(book)
-    return book
+    if book.counter_slots:
+        # borrows and returns of a sharded title only touch its slots, which _spread_copies locks
+        book.available_copies += shelved
+        _spread_copies(db, book, book.counter_slots)
+    else:
+        book.available_copies = Book.available_copies + shelved
+
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise VersionConflict("Book was changed by another request")
+    return get_book(db, book_id)
 
 def delete_book(db: Session, book_id: int):
     book = db.query(Book).filter(Book.id == book_id).first()
@@ -0,0 +1,103 @@
+# app/crud/search.py
+"""
+Catalog search over book titles and authors, plus exact ISBN lookup.
+
+Postgres matches the weighted tsvector from book_search_document(), which has
+its own GIN index; SQLite matches the books_fts FTS5 table. All words in the
+query must match, the last one as a prefix. Results come best match
+first and page with the same opaque cursors as the list endpoints, keyed on
+(score, id) so ties stay in a stable order. The FTS5 table keeps 2- and
+3-character prefix indexes so short prefixes do not expand term by term.
+"""
+
+import re
+from typing import Optional
+
+from sqlalchemy import Float, Integer, and_, column, func, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from app.crud.crud import BOOK_COLUMNS, DEFAULT_PAGE_SIZE
+from app.models.models import Book, book_search_document
+from app.utils.pagination import decode_keys, encode_cursor
+
+MAX_TERMS = 8
+RANK_WINDOW = 1000
+
+TOKEN = re.compile(r"\w+")
+
+books_fts = table("books_fts", column("rowid", Integer))
+
+
+def search_terms(q: str) -> list:
+    """
+    (word, is_prefix) pairs for the lower-cased words of the query. Only the
+    last word is a prefix, as in search-as-you-type: the words before it are
+    finished. Punctuation never reaches the FTS parser.
+    """
+    words = TOKEN.findall(q.lower())[:MAX_TERMS]
+    return [(word, i == len(words) - 1) for i, word in enumerate(words)]
+
+
+def _postgres_candidates(terms, window):
+    document = book_search_document()
+    words = [f"{term}:*" if prefix else term for term, prefix in terms]
+    tsquery = func.to_tsquery(text("'simple'"), " & ".join(words))
+    # ts_rank_cd is higher-is-better; negate it so every backend sorts ascending.
+    score = -func.ts_rank_cd(document, tsquery)
+    return (
+        select(Book.id.label("book_id"), score.label("score"))
+        .where(document.op("@@")(tsquery))
+        .order_by(score, Book.id)
+        .limit(window)
+    )
+
+
+def _sqlite_candidates(terms, window):
+    match = " ".join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in terms)
+    score = func.bm25(literal_column("books_fts"), 2.0, 1.0)  # title counts double
+    return (
+        select(books_fts.c.rowid.label("book_id"), score.label("score"))
+        .where(literal_column("books_fts").op("MATCH")(match))
+        .order_by(score, books_fts.c.rowid)
+        .limit(window)
+    )
+
+
+def search_books(db: Session, q: str, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+                 window: int = RANK_WINDOW):
+    """
+    Return one page of books matching `q` and the cursor for the next page.
+    A query that is exactly a stored ISBN returns just that book.
+
+    Only the `window` best-scoring matches are kept (a top-N selection in the
+    search index, the same set on every page) and joined to books for
+    paging. That keeps a one-letter query on a million-book catalog from
+    paging through every match; clients narrow the query rather than page
+    deep into a vague one.
+    """
+    if after is None:
+        book = db.execute(select(*BOOK_COLUMNS).where(Book.isbn == q.strip())).first()
+        if book is not None:
+            return [book], None
+
+    terms = search_terms(q)
+    if not terms:
+        return [], None
+
+    if db.get_bind().dialect.name == "postgresql":
+        candidates = _postgres_candidates(terms, window).subquery()
+    else:
+        candidates = _sqlite_candidates(terms, window).subquery()
+    score = candidates.c.score
+    statement = select(*BOOK_COLUMNS, score).join(candidates, candidates.c.book_id == Book.id)
+
+    if after is not None:
+        last_score, last_id = decode_keys(after, [column("score", Float), Book.id])
+        statement = statement.where(or_(score > last_score, and_(score == last_score, Book.id > last_id)))
+
+    rows = db.execute(statement.order_by(score, Book.id).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].score, rows[-1].id])
+    return rows, next_cursor
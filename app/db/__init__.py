@@ -1,3 +1,5 @@
 # app/db/__init__.py
-from .database import Base, engine, SessionLocal
+from .database import (
+    Base, engine, SessionLocal, async_engine, AsyncSessionLocal, read_async_engine, ReadAsyncSessionLocal,
+)
 from app.models import models
\ No newline at end of file
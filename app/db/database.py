@@ -1,15 +1,58 @@
 # app/db/database.py
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
+from app.config.settings import settings
+from app.db.pool import engine_options
+
 DATABASE_URL = os.getenv(
     "DATABASE_URL", "postgresql+psycopg2://nityashukla:password123@db:5432/libro_db"
 )
 
-engine = create_engine(DATABASE_URL)
+# asyncio drivers for the backends we run on
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Swap the sync DBAPI driver in a URL for its asyncio counterpart,
+    e.g. postgresql+psycopg2:// -> postgresql+asyncpg://.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Pool size, timeouts and pre-ping come from Settings (see app/db/pool.py).
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine used by the API routers. expire_on_commit=False keeps committed
+# objects readable after the session is done; there is no lazy IO under asyncio.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Optional read replica for the GET routes (see app/db/routing.py). Without
+# READ_DATABASE_URL the read names are the primary's engine and sessions.
+READ_DATABASE_URL = settings.READ_DATABASE_URL
+if READ_DATABASE_URL:
+    READ_ASYNC_DATABASE_URL = to_async_url(READ_DATABASE_URL)
+    read_async_engine = create_async_engine(READ_ASYNC_DATABASE_URL, **engine_options(READ_ASYNC_DATABASE_URL))
+    ReadAsyncSessionLocal = async_sessionmaker(
+        read_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+else:
+    read_async_engine = async_engine
+    ReadAsyncSessionLocal = AsyncSessionLocal
+
 Base = declarative_base()
 
 # Import all models here so that they are registered with Base
@@ -23,6 +66,11 @@ def get_db():
     finally:
         db.close()
 
+# Async dependency to get DB session in FastAPI
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Create all tables in the database
 def init_db():
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,141 @@
+# app/db/pool.py
+"""
+Connection pool configuration, warm-up and metrics.
+
+Pool size, overflow, checkout timeout, recycle, pre-ping and a per-connection
+statement_timeout come from Settings. Wherever SQLAlchemy would use a
+QueuePool for the URL (Postgres, SQLite files), the pool is swapped for a
+subclass that records how long each checkout waited, how often the pool had
+to open overflow connections and how many checkouts timed out. Pools that do
+not queue (aiosqlite's NullPool, in-memory SQLite) keep SQLAlchemy's default.
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config.settings import settings
+
+
+class PoolStats:
+    """Counters for one pool. Wait times are in seconds."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def observe_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+class MeasuredPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        overflow = self._overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.observe_wait(time.perf_counter() - start)
+        # _overflow counts up from -pool_size as connections are opened
+        if self._overflow > overflow and self._overflow > 0:
+            self.stats.overflow_events += 1
+        return connection
+
+
+class MeasuredQueuePool(MeasuredPoolMixin, QueuePool):
+    pass
+
+
+class MeasuredAsyncAdaptedQueuePool(MeasuredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+MEASURED_POOLS = {QueuePool: MeasuredQueuePool, AsyncAdaptedQueuePool: MeasuredAsyncAdaptedQueuePool}
+
+
+def _statement_timeout_args(url) -> dict:
+    """connect_args that set statement_timeout on every new Postgres connection."""
+    ms = settings.DB_STATEMENT_TIMEOUT_MS
+    if not ms or url.get_backend_name() != "postgresql":
+        return {}
+    if url.get_driver_name() == "asyncpg":
+        return {"server_settings": {"statement_timeout": str(ms)}}
+    return {"options": f"-c statement_timeout={ms}"}
+
+
+def engine_options(database_url: str) -> dict:
+    """Keyword arguments for create_engine / create_async_engine."""
+    url = make_url(database_url)
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    pool_class = url.get_dialect().get_pool_class(url)
+    if pool_class in MEASURED_POOLS:
+        options.update(
+            poolclass=MEASURED_POOLS[pool_class],
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    connect_args = _statement_timeout_args(url)
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+async def warm_up(async_engine, connections: int) -> int:
+    """
+    Open up to `connections` connections at once and hand them back to the
+    pool, so the first requests after startup do not pay for connecting.
+    Returns how many were opened.
+    """
+    pool = async_engine.pool
+    if not isinstance(pool, QueuePool):
+        return 0
+    count = min(connections, pool.size())
+    if count <= 0:
+        return 0
+    opened = await asyncio.gather(*(async_engine.connect() for _ in range(count)))
+    for connection in opened:
+        await connection.close()
+    return count
+
+
+def pool_snapshot(engine) -> dict:
+    pool = engine.pool
+    snapshot = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        snapshot.update(
+            size=pool.size(),
+            in_use=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        snapshot.update(
+            checkouts=stats.checkouts,
+            checkout_wait_avg_ms=round(1000 * stats.wait_total / stats.checkouts, 3) if stats.checkouts else 0.0,
+            checkout_wait_max_ms=round(1000 * stats.wait_max, 3),
+            overflow_events=stats.overflow_events,
+            timeouts=stats.timeouts,
+        )
+    return snapshot
@@ -0,0 +1,75 @@
+# app/db/routing.py
+"""
+Read/write routing for an optional read replica (Settings.READ_DATABASE_URL).
+
+GET routes take their session from get_async_read_db_session, which hands
+out a replica session unless the client wrote something within the last
+READ_YOUR_WRITES_SECONDS. Write routes keep using the primary.
+
+Read-your-writes: after a successful write, ReadYourWritesMiddleware sets
+a cookie holding the time until which that client reads from the primary,
+so a client never reads a replica that has not yet caught up with its own
+write. Clients that do not keep cookies can send the same value back in
+the X-Read-Primary-Until header. Other clients may see the replica's lag.
+
+Without a replica both session makers are the same and nothing is routed.
+"""
+
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+
+from app.config.settings import settings
+from app.db import database
+
+STICKY_COOKIE = "libro_primary_until"
+STICKY_HEADER = "x-read-primary-until"
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+def reads_primary(request: Request) -> bool:
+    """True while this client's read-your-writes window is open (and a replica is configured)."""
+    if not settings.READ_DATABASE_URL:
+        return False
+    until = request.headers.get(STICKY_HEADER) or request.cookies.get(STICKY_COOKIE)
+    try:
+        return float(until) > time.time()
+    except (TypeError, ValueError):
+        return False
+
+
+def read_session_factory(request: Request) -> async_sessionmaker:
+    """The session maker a read-only request should use."""
+    if not settings.READ_DATABASE_URL or reads_primary(request):
+        return database.AsyncSessionLocal
+    return database.ReadAsyncSessionLocal
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware: marks the client as sticky to the primary after
+    any request that is not GET/HEAD/OPTIONS and did not fail.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not settings.READ_DATABASE_URL:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.READ_YOUR_WRITES_SECONDS
+                until = "%.3f" % (time.time() + window)
+                headers = MutableHeaders(scope=message)
+                headers.append(STICKY_HEADER, until)
+                headers.append(
+                    "set-cookie", f"{STICKY_COOKIE}={until}; Max-Age={window}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -1,7 +1,9 @@
 # app/db/session_manager.py
 
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
+from starlette.requests import Request
+from app.db.database import SessionLocal, AsyncSessionLocal
+from app.db.routing import read_session_factory
 
 def get_db_session():
     """
@@ -15,4 +17,26 @@ def get_db_session():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db_session():
+    """
+    Async dependency for FastAPI endpoints. The routers use this one so a
+    query awaits the asyncio driver instead of blocking the event loop.
+    Usage in a route:
+        async def route(db: AsyncSession = Depends(get_async_db_session)):
+            ...
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db_session(request: Request):
+    """
+    Async dependency for read-only endpoints: a session on the read replica
+    when one is configured, or on the primary for a client that has just
+    written (see app/db/routing.py). Never write through it.
+        async def route(db: AsyncSession = Depends(get_async_read_db_session)):
+            ...
+    """
+    async with read_session_factory(request)() as db:
+        yield db
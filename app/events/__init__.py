@@ -0,0 +1,8 @@
+# app/events/__init__.py
+from .availability import (
+    AvailabilityFeed,
+    Subscription,
+    encode_events,
+    feed as availability_feed,
+    relay_from_url,
+)
@@ -0,0 +1,207 @@
+# app/events/availability.py
+"""
+Live availability feed behind GET /books/stream (Server-Sent Events).
+
+Write routes call `feed.changed(book_id, ...)` once their transaction has
+committed. Changes are coalesced: the first one opens a window of
+STREAM_COALESCE_MS, and when it closes the feed reads available_copies for
+every title touched in the window with one query, then hands each value to
+the subscribers watching that title. A borrow rush on one title is one read
+and one event per window, whatever the number of borrows or subscribers.
+
+Subscribers are indexed by the titles they watch (plus a set of those
+watching everything), so a change only touches interested connections, and
+an idle connection is one parked coroutine. A subscriber keeps only the
+latest value per title it has not been sent yet. A slow client that falls
+more than STREAM_MAX_PENDING titles behind gets its backlog dropped and a
+`reset` event (refetch what you show), instead of growing a queue.
+
+Each worker serves its own subscribers. With EVENTS_URL=redis://... the
+worker that read a change also publishes it on a RESP channel, so clients
+connected to other workers see it too; without it (the default) clients
+see the changes committed by the worker they are connected to.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import Counter
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.cache.resp import RespClient
+from app.config.settings import settings
+from app.crud.async_crud import get_availability
+from app.db import database
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "libro:availability"
+
+
+class Subscription:
+    """One stream's pending changes: latest available_copies per title, not yet sent."""
+
+    __slots__ = ("book_ids", "max_pending", "pending", "overflowed", "_ready")
+
+    def __init__(self, book_ids: Optional[frozenset], max_pending: int):
+        self.book_ids = book_ids
+        self.max_pending = max_pending
+        self.pending: Dict[int, int] = {}
+        self.overflowed = False
+        self._ready = asyncio.Event()
+
+    def push(self, book_id: int, available: int):
+        self.pending[book_id] = available
+        if len(self.pending) > self.max_pending:
+            self.pending.clear()
+            self.overflowed = True
+        self._ready.set()
+
+    async def next(self, timeout: float):
+        """
+        Wait up to `timeout` for changes. Returns None on timeout, else
+        (changes, overflowed); overflowed means changes were dropped.
+        """
+        if not self._ready.is_set():
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self._ready.clear()
+        changes, self.pending = self.pending, {}
+        overflowed, self.overflowed = self.overflowed, False
+        return changes, overflowed
+
+
+class AvailabilityFeed:
+    def __init__(self, session_factory: Optional[async_sessionmaker] = None):
+        self.session_factory = session_factory
+        self.origin = uuid.uuid4().hex  # tells this worker's relayed messages apart
+        self.by_book: Dict[int, Set[Subscription]] = {}
+        self.everything: Set[Subscription] = set()
+        self.stats = Counter()
+        self._dirty: Set[int] = set()
+        self._flushing: Optional[asyncio.Task] = None
+        self._relay: Optional[RespClient] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def subscribers(self) -> int:
+        return int(self.stats["subscribed"] - self.stats["unsubscribed"])
+
+    # ----- subscribers
+
+    def subscribe(self, book_ids: Optional[Iterable[int]] = None) -> Subscription:
+        """Watch these titles (all titles when None)."""
+        watched = frozenset(book_ids) if book_ids else None
+        subscription = Subscription(watched, settings.STREAM_MAX_PENDING)
+        if watched is None:
+            self.everything.add(subscription)
+        else:
+            for book_id in watched:
+                self.by_book.setdefault(book_id, set()).add(subscription)
+        self.stats["subscribed"] += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription.book_ids is None:
+            self.everything.discard(subscription)
+        else:
+            for book_id in subscription.book_ids:
+                watchers = self.by_book.get(book_id)
+                if watchers is not None:
+                    watchers.discard(subscription)
+                    if not watchers:
+                        del self.by_book[book_id]
+        self.stats["unsubscribed"] += 1
+
+    def deliver(self, changes: Dict[int, int]):
+        """Hand new available_copies values to the subscribers watching those titles."""
+        for book_id, available in changes.items():
+            for subscription in self.by_book.get(book_id, ()):
+                subscription.push(book_id, available)
+            for subscription in self.everything:
+                subscription.push(book_id, available)
+        self.stats["changes"] += len(changes)
+
+    # ----- publishers
+
+    def changed(self, *book_ids: int):
+        """Record committed changes to these titles; they are sent after the coalescing window."""
+        if not (self.by_book or self.everything or self._relay):
+            return
+        self._dirty.update(book_ids)
+        if self._flushing is None:
+            self._flushing = asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        try:
+            await asyncio.sleep(settings.STREAM_COALESCE_MS / 1000)
+            dirty, self._dirty = self._dirty, set()
+            async with (self.session_factory or database.AsyncSessionLocal)() as db:
+                changes = await get_availability(db, dirty)
+            self.deliver(changes)
+            self.stats["flushes"] += 1
+            if self._relay is not None and changes:
+                await self._relay.execute("PUBLISH", CHANNEL, json.dumps({"origin": self.origin, "changes": changes}))
+        except Exception:
+            logger.exception("Could not send availability changes")
+        finally:
+            self._flushing = None
+            if self._dirty:
+                self._flushing = asyncio.ensure_future(self._flush())
+
+    # ----- relay between workers
+
+    async def start(self, relay: Optional[RespClient] = None):
+        self._relay = relay
+        if relay is not None:
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._relay.subscribe(CHANNEL):
+                    event = json.loads(message)
+                    if event["origin"] != self.origin:
+                        self.deliver({int(book_id): available for book_id, available in event["changes"].items()})
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Availability relay dropped; reconnecting")
+                await asyncio.sleep(1)
+
+    async def stop(self):
+        self._dirty.clear()
+        for task in (self._listener, self._flushing):
+            if task is not None:
+                task.cancel()
+        self._listener = None
+        if self._relay is not None:
+            await self._relay.close()
+            self._relay = None
+
+
+def relay_from_url(url: Optional[str]) -> Optional[RespClient]:
+    """The RESP client for EVENTS_URL; None (or memory://) keeps the feed per worker."""
+    if not url or url.startswith("memory:"):
+        return None
+    if url.startswith(("redis:", "resp:")):
+        return RespClient.from_url(url)
+    raise ValueError(f"Unsupported EVENTS_URL: {url}")
+
+
+def encode_events(changes: Dict[int, int], overflowed: bool = False) -> bytes:
+    """SSE frames for one batch of changes."""
+    frames = ["event: reset\ndata: {}\n\n"] if overflowed else []
+    frames.extend(
+        f'event: availability\ndata: {{"book_id": {book_id}, "available_copies": {available}}}\n\n'
+        for book_id, available in changes.items()
+    )
+    return "".join(frames).encode()
+
+
+feed = AvailabilityFeed()
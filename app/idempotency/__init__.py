@@ -0,0 +1,2 @@
+# app/idempotency/__init__.py
+from .middleware import IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotencyMiddleware, request_fingerprint
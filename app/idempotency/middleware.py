@@ -0,0 +1,200 @@
+# app/idempotency/middleware.py
+"""
+Idempotency-Key support for POST routes.
+
+A client that may retry a POST (a kiosk whose borrow timed out) sends a
+unique Idempotency-Key header. The first request with a key runs as usual
+and its response is stored; a retry with the same key gets the stored
+response back, marked Idempotent-Replayed: true, without running again.
+A retry that arrives while the first request is still running waits for
+it (up to IDEMPOTENCY_WAIT_SECONDS, then 409) instead of running too.
+
+    missing header            runs as usual, nothing stored
+    key reused, other request 422: different method, path, query or body
+    first request fails (5xx) key released, so a retry runs again
+
+Keys live in the idempotency_keys table (one primary-key probe per request)
+and expire after IDEMPOTENCY_TTL_SECONDS; app/jobs/idempotency.py purges
+them. Waiters in the same worker are woken by the original request; waiters
+in other workers poll the row.
+"""
+
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from app.config.settings import settings
+from app.crud.async_crud import (
+    claim_idempotency_key, get_idempotency_record, release_idempotency_key, save_idempotent_response,
+)
+from app.db import database
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = "idempotent-replayed"
+MAX_KEY_LENGTH = 255
+MAX_POLL_SECONDS = 0.25
+
+
+def _digest(*parts: bytes) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.digest()
+
+
+def request_fingerprint(scope, body: bytes) -> bytes:
+    return _digest(scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def _error(status_code: int, detail: str, headers: Optional[dict] = None) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code, headers=headers)
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware; only POSTs under `prefixes` that carry the header are handled."""
+
+    def __init__(self, app, prefixes: Iterable[str] = ("/books", "/users", "/loans"),
+                 session_factory: Optional[async_sessionmaker] = None):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+        self.session_factory = session_factory
+        # key -> set when this worker's request holding it finishes
+        self._inflight: Dict[bytes, asyncio.Event] = {}
+
+    def _sessions(self) -> async_sessionmaker:
+        return self.session_factory or database.AsyncSessionLocal
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+        raw_key = Headers(scope=scope).get(IDEMPOTENCY_HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(raw_key) <= MAX_KEY_LENGTH:
+            await _error(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        key, fingerprint = _digest(raw_key.encode()), request_fingerprint(scope, body)
+        response = await self._settle(key, fingerprint)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+        await self._run(scope, receive, send, key, body)
+
+    async def _claim(self, key: bytes, fingerprint: bytes):
+        now = datetime.utcnow()
+        async with self._sessions()() as db:
+            return await claim_idempotency_key(
+                db, key, fingerprint, now, now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+            )
+
+    async def _settle(self, key: bytes, fingerprint: bytes) -> Optional[Response]:
+        """Claim the key (returns None), or the response a duplicate gets: a replay, 422 or 409."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        delay = 0.01
+        record = await self._claim(key, fingerprint)
+        while record is not None:
+            if record.fingerprint != fingerprint:
+                return _error(422, "Idempotency-Key was already used for a different request")
+            if record.status_code is not None:
+                return Response(
+                    record.body, status_code=record.status_code, media_type=record.content_type,
+                    headers={REPLAYED_HEADER: "true"},
+                )
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return _error(409, "A request with this Idempotency-Key is still in progress", {"Retry-After": "1"})
+
+            event = self._inflight.get(key)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, MAX_POLL_SECONDS)
+            async with self._sessions()() as db:
+                record = await get_idempotency_record(db, key)
+            if record is None or record.expires_at <= datetime.utcnow():
+                record = await self._claim(key, fingerprint)
+        return None
+
+    async def _release(self, key: bytes):
+        async with self._sessions()() as db:
+            await release_idempotency_key(db, key)
+
+    async def _run(self, scope, receive, send, key: bytes, body: bytes):
+        """Run the request holding the key; store its response before the client sees it."""
+        event = self._inflight[key] = asyncio.Event()
+        body_sent = False
+        start, chunks = None, []
+
+        async def replay_body():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            content = b"".join(chunks)
+            await self._store(key, start, content)
+            await send(start)
+            await send({"type": "http.response.body", "body": content})
+
+        try:
+            await self.app(scope, replay_body, capture)
+        except BaseException:
+            await asyncio.shield(self._release(key))
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            event.set()
+
+    async def _store(self, key: bytes, start, content: bytes):
+        status_code = start["status"]
+        if status_code >= 500:
+            await self._release(key)
+            return
+        expires_at = datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        try:
+            async with self._sessions()() as db:
+                await save_idempotent_response(
+                    db, key, status_code, Headers(raw=start["headers"]).get("content-type"), content, expires_at
+                )
+        except Exception:
+            # The request did run: keep the lease so a duplicate does not run it again.
+            logger.exception("Could not store the response for an idempotency key")
@@ -0,0 +1,6 @@
+# app/jobs/__init__.py
+from .archive import archive_returned_loans
+from .holds import expire_lapsed_holds
+from .idempotency import purge_expired_idempotency_keys
+from .overdue import log_overdue_notices, process_overdue_loans
+from .scheduler import Scheduler
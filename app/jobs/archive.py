@@ -0,0 +1,67 @@
+# app/jobs/archive.py
+"""
+Archival of returned loans.
+
+Moves loans returned more than LOAN_ARCHIVE_AFTER_DAYS ago from `loans` to
+loans_archive, LOAN_ARCHIVE_BATCH_SIZE rows per transaction, so `loans`
+only holds active and recently returned loans and its indexes stay small.
+History reads (loan lists and exports) cover both tables, so nothing
+disappears from the API.
+
+    python -m app.jobs.archive
+    python -m app.jobs.archive --days 90 --max-batches 100
+
+Safe to run from several workers at once, and to stop at any point: each
+batch is its own transaction.
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config.settings import settings
+from app.crud.async_crud import archive_loans
+from app.db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+async def archive_returned_loans(session_factory: async_sessionmaker = AsyncSessionLocal,
+                                 retention_days: Optional[int] = None, batch_size: Optional[int] = None,
+                                 max_batches: Optional[int] = None) -> int:
+    """Archive batches until none are left (or `max_batches` ran); returns the loans moved."""
+    days = retention_days if retention_days is not None else settings.LOAN_ARCHIVE_AFTER_DAYS
+    size = batch_size or settings.LOAN_ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        async with session_factory() as db:
+            count = await archive_loans(db, cutoff, size)
+        moved += count
+        batches += 1
+        if count < size:
+            break
+    if moved:
+        logger.info("Archived %d loans returned before %s", moved, cutoff.isoformat())
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=None, help="retention window; defaults to LOAN_ARCHIVE_AFTER_DAYS")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    moved = asyncio.run(archive_returned_loans(
+        retention_days=args.days, batch_size=args.batch_size, max_batches=args.max_batches,
+    ))
+    print(f"archived {moved} loans")
+
+
+if __name__ == "__main__":
+    main()
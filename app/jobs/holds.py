@@ -0,0 +1,58 @@
+# app/jobs/holds.py
+"""
+Expiry of lapsed holds: a copy handed to a hold is the patron's for
+HOLD_PICKUP_HOURS. After that the hold expires and the copy goes to the
+next hold in the title's queue, or back on the shelf. Runs from the
+in-process scheduler every HOLD_EXPIRY_SCAN_INTERVAL seconds, or once:
+
+    python -m app.jobs.holds
+
+Each batch of HOLD_EXPIRY_BATCH_SIZE holds is its own transaction, found
+through the partial index on READY holds by pickup deadline.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.cache import BOOKS, invalidate
+from app.config.settings import settings
+from app.crud.async_crud import expire_holds
+from app.db.database import AsyncSessionLocal
+from app.events import availability_feed
+
+logger = logging.getLogger(__name__)
+
+
+async def expire_lapsed_holds(session_factory: async_sessionmaker = AsyncSessionLocal,
+                              batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> int:
+    """Expire batches until none are left (or `max_batches` ran); returns how many holds expired."""
+    size = batch_size or settings.HOLD_EXPIRY_BATCH_SIZE
+    now = datetime.utcnow()
+    expired, book_ids, batches = 0, set(), 0
+    while max_batches is None or batches < max_batches:
+        async with session_factory() as db:
+            holds = await expire_holds(db, now, size, settings.HOLD_PICKUP_HOURS)
+        expired += len(holds)
+        book_ids.update(hold.book_id for hold in holds)
+        batches += 1
+        if len(holds) < size:
+            break
+    if expired:
+        # copies nobody was waiting for are back on the shelf
+        await invalidate(BOOKS)
+        availability_feed.changed(*book_ids)
+        logger.info("Expired %d holds not picked up in time", expired)
+    return expired
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    print(f"expired {asyncio.run(expire_lapsed_holds())} holds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# app/jobs/idempotency.py
+"""
+Purge of expired idempotency keys (see app/idempotency). Expired keys are
+already ignored by lookups; this only keeps the table small. Runs from the
+in-process scheduler every IDEMPOTENCY_PURGE_INTERVAL seconds, or once:
+
+    python -m app.jobs.idempotency
+
+Each batch of IDEMPOTENCY_PURGE_BATCH_SIZE deletes is its own transaction,
+found through the index on expires_at.
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config.settings import settings
+from app.crud.async_crud import purge_idempotency_keys
+from app.db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_expired_idempotency_keys(session_factory: async_sessionmaker = AsyncSessionLocal,
+                                         batch_size: Optional[int] = None,
+                                         max_batches: Optional[int] = None) -> int:
+    """Delete expired keys until none are left (or `max_batches` ran); returns how many went."""
+    size = batch_size or settings.IDEMPOTENCY_PURGE_BATCH_SIZE
+    now = datetime.utcnow()
+    purged = batches = 0
+    while max_batches is None or batches < max_batches:
+        async with session_factory() as db:
+            count = await purge_idempotency_keys(db, now, size)
+        purged += count
+        batches += 1
+        if count < size:
+            break
+    if purged:
+        logger.info("Purged %d expired idempotency keys", purged)
+    return purged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    purged = asyncio.run(purge_expired_idempotency_keys(batch_size=args.batch_size, max_batches=args.max_batches))
+    print(f"purged {purged} idempotency keys")
+
+
+if __name__ == "__main__":
+    main()
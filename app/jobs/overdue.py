@@ -0,0 +1,61 @@
+# app/jobs/overdue.py
+"""
+Overdue-loan scan: stamps overdue_notified_at on active loans past their
+due date and hands each batch to a notifier (by default, a log line per
+loan). Runs from the in-process scheduler every OVERDUE_SCAN_INTERVAL
+seconds (see app/jobs/scheduler.py), or once from the command line:
+
+    python -m app.jobs.overdue
+
+Each batch is one short UPDATE ... RETURNING and its own transaction, and a
+scan stops after OVERDUE_MAX_BATCHES, so a backlog is worked off over
+several scans instead of in one long transaction. A loan is stamped once;
+notices are sent after the stamp commits (at most once per loan).
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config.settings import settings
+from app.crud.async_crud import mark_overdue_loans
+from app.db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+async def log_overdue_notices(loans: List) -> None:
+    for loan in loans:
+        logger.info("Loan %d overdue: user %d, book %d, due %s", loan.id, loan.user_id, loan.book_id,
+                    loan.due_date.isoformat())
+
+
+async def process_overdue_loans(session_factory: async_sessionmaker = AsyncSessionLocal,
+                                batch_size: Optional[int] = None, max_batches: Optional[int] = None,
+                                notify: Callable[[List], Awaitable[None]] = log_overdue_notices) -> int:
+    """One scan; returns how many loans were newly found overdue."""
+    size = batch_size or settings.OVERDUE_BATCH_SIZE
+    batches = max_batches or settings.OVERDUE_MAX_BATCHES
+    now = datetime.utcnow()
+    found = 0
+    for _ in range(batches):
+        async with session_factory() as db:
+            loans = await mark_overdue_loans(db, now, size)
+        if loans:
+            await notify(loans)
+        found += len(loans)
+        if len(loans) < size:
+            break
+    return found
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    print(f"{asyncio.run(process_overdue_loans())} loans newly overdue")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# app/jobs/scheduler.py
+"""
+A minimal in-process scheduler for the periodic jobs: each job is a
+coroutine function run every `interval` seconds on the app's event loop,
+started and stopped with the app.
+
+Every worker runs its own scheduler, so the jobs must tolerate running in
+several processes at once (the overdue scan and the archival job claim
+rows with conditional UPDATEs / SKIP LOCKED). The first run of each job is
+delayed by a random part of its interval so that workers started together
+do not all scan at the same moment. A failed run is logged and the job
+runs again at its next interval.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs: List[Tuple[str, float, Callable[[], Awaitable]]] = []
+        self.runs = Counter()
+        self.failures = Counter()
+        self.last_seconds: Dict[str, float] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def every(self, interval: float, job: Callable[[], Awaitable], name: Optional[str] = None):
+        if interval <= 0:
+            raise ValueError("Job interval must be positive")
+        self.jobs.append((name or job.__name__, interval, job))
+
+    async def run(self, name: str, job: Callable[[], Awaitable]):
+        """Run a job once, recording its duration; exceptions are logged, not raised."""
+        start = time.perf_counter()
+        try:
+            await job()
+        except Exception:
+            self.failures[name] += 1
+            logger.exception("Scheduled job %s failed", name)
+        finally:
+            self.runs[name] += 1
+            self.last_seconds[name] = time.perf_counter() - start
+
+    async def _loop(self, name: str, interval: float, job: Callable[[], Awaitable]):
+        await asyncio.sleep(random.uniform(0, interval))
+        while True:
+            await self.run(name, job)
+            await asyncio.sleep(interval)
+
+    def start(self):
+        self._tasks = [asyncio.ensure_future(self._loop(*entry)) for entry in self.jobs]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def snapshot(self) -> dict:
+        return {
+            name: {"interval": interval, "runs": self.runs[name], "failures": self.failures[name],
+                   "last_seconds": round(self.last_seconds.get(name, 0.0), 6)}
+            for name, interval, _ in self.jobs
+        }
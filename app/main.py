@@ -1,14 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
-
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from slowapi.util import get_remote_address
+from starlette.responses import Response
 
 from app.api import users, books, loans
+from app.cache import InstrumentedBackend, backend_from_url, request_key_builder, stats as cache_stats
 from app.config.settings import settings
+from app.db.database import async_engine, engine, read_async_engine
+from app.db.pool import pool_snapshot, warm_up
+from app.db.routing import ReadYourWritesMiddleware
+from app.events import availability_feed, relay_from_url
+from app.idempotency import IdempotencyMiddleware
+from app.jobs import (
+    Scheduler, archive_returned_loans, expire_lapsed_holds, process_overdue_loans, purge_expired_idempotency_keys,
+)
+from app.metrics import MetricsMiddleware, QueryStatsMiddleware, instrument_engine, registry as metrics_registry
+from app.metrics import collectors  # noqa: F401 - registers pool, cache and rate limit metrics
+from app.ratelimit import RateLimiter, RateLimitMiddleware
 
 app = FastAPI(
     title="Libro API v2",
@@ -18,11 +26,21 @@ app = FastAPI(
 )
 
 # -------------------------------
-# Rate Limiter Setup
+# Idempotency-Key replay for POSTs (innermost, so rate-limited requests never claim a key; see app/idempotency)
+# -------------------------------
+app.add_middleware(IdempotencyMiddleware)
+
+# -------------------------------
+# Rate Limiter (per client, per route; see app/ratelimit)
+# -------------------------------
+rate_limiter = RateLimiter.from_settings(settings)
+app.state.rate_limiter = rate_limiter
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
+# -------------------------------
+# Read-Your-Writes (sticks a client to the primary after it writes; see app/db/routing.py)
 # -------------------------------
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_middleware(ReadYourWritesMiddleware)
 
 # -------------------------------
 # CORS Middleware
@@ -35,6 +53,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# -------------------------------
+# Query Counts, DB Time and Slow-Query Log
+# -------------------------------
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if read_async_engine is not async_engine:
+    instrument_engine(read_async_engine.sync_engine)
+if settings.ENABLE_QUERY_STATS:
+    app.add_middleware(QueryStatsMiddleware)
+
+# -------------------------------
+# Request Metrics (outermost, so it times everything below it)
+# -------------------------------
+if settings.ENABLE_METRICS:
+    app.add_middleware(MetricsMiddleware)
+
 # -------------------------------
 # Include Routers
 # -------------------------------
@@ -42,17 +76,86 @@ app.include_router(users.router)   # prefix already set in router
 app.include_router(books.router)   # prefix already set in router
 app.include_router(loans.router)   # prefix already set in router
 
+# -------------------------------
+# Periodic Jobs (per worker; see app/jobs)
+# -------------------------------
+scheduler = Scheduler()
+if settings.OVERDUE_SCAN_INTERVAL:
+    scheduler.every(settings.OVERDUE_SCAN_INTERVAL, process_overdue_loans, "overdue_loans")
+if settings.HOLD_EXPIRY_SCAN_INTERVAL:
+    scheduler.every(settings.HOLD_EXPIRY_SCAN_INTERVAL, expire_lapsed_holds, "hold_expiry")
+if settings.LOAN_ARCHIVE_INTERVAL:
+    scheduler.every(settings.LOAN_ARCHIVE_INTERVAL, archive_returned_loans, "loan_archive")
+if settings.IDEMPOTENCY_PURGE_INTERVAL:
+    scheduler.every(settings.IDEMPOTENCY_PURGE_INTERVAL, purge_expired_idempotency_keys, "idempotency_purge")
+
 # -------------------------------
 # Startup Event
 # -------------------------------
 @app.on_event("startup")
 async def startup():
-    if settings.ENABLE_CACHE:
-        FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+    # Always initialise so @cache-decorated routes work with caching switched off.
+    FastAPICache.init(
+        InstrumentedBackend(backend_from_url(settings.CACHE_URL, settings.CACHE_MAX_ENTRIES)),
+        prefix="fastapi-cache",
+        key_builder=request_key_builder,
+        enable=settings.ENABLE_CACHE,
+    )
+    if settings.DB_POOL_WARMUP:
+        await warm_up(async_engine, settings.DB_POOL_WARMUP)
+        if read_async_engine is not async_engine:
+            await warm_up(read_async_engine, settings.DB_POOL_WARMUP)
+    scheduler.start()
+    await availability_feed.start(relay_from_url(settings.EVENTS_URL))
+
+@app.on_event("shutdown")
+async def shutdown():
+    await scheduler.stop()
+    await availability_feed.stop()
+    backend = FastAPICache._backend
+    if backend is not None:
+        await backend.close()
+    FastAPICache.reset()
+    rate_limiter.store.close()
 
 # -------------------------------
 # Root Endpoint
 # -------------------------------
 @app.get("/")
 async def root():
-    return {"message": "Welcome to Libro API v2"}
\ No newline at end of file
+    return {"message": "Welcome to Libro API v2"}
+
+# -------------------------------
+# Cache Stats
+# -------------------------------
+@app.get("/cache/stats", tags=["Ops"])
+async def get_cache_stats():
+    """Per-namespace hit, miss and invalidation counters for this worker."""
+    return cache_stats.snapshot()
+
+# -------------------------------
+# Scheduled Job Stats
+# -------------------------------
+@app.get("/jobs/stats", tags=["Ops"])
+async def get_job_stats():
+    """Runs, failures and last run time of this worker's periodic jobs."""
+    return scheduler.snapshot()
+
+# -------------------------------
+# Connection Pool Stats
+# -------------------------------
+@app.get("/db/pool/stats", tags=["Ops"])
+async def get_pool_stats():
+    """Connections in use, overflow and checkout wait times for this worker's pools."""
+    pools = {"async": pool_snapshot(async_engine), "sync": pool_snapshot(engine)}
+    if read_async_engine is not async_engine:
+        pools["read"] = pool_snapshot(read_async_engine)
+    return pools
+
+# -------------------------------
+# Prometheus Metrics
+# -------------------------------
+@app.get("/metrics", tags=["Ops"])
+async def get_metrics():
+    """Request latency and size histograms, pool and cache counters, in Prometheus text format."""
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
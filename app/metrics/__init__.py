@@ -0,0 +1,19 @@
+# app/metrics/__init__.py
+from .registry import Gauge, Histogram, Registry, LATENCY_BUCKETS, SIZE_BUCKETS
+from .middleware import (
+    MetricsMiddleware,
+    registry,
+    request_duration,
+    requests_in_flight,
+    request_size,
+    response_size,
+)
+from .queries import (
+    QueryBudgetExceeded,
+    QueryStats,
+    QueryStatsMiddleware,
+    current_stats,
+    instrument_engine,
+    query_budget,
+    track_queries,
+)
@@ -0,0 +1,65 @@
+# app/metrics/collectors.py
+"""Scrape-time metrics for numbers kept elsewhere: connection pools, the cache, the rate limiter and the availability feed."""
+
+from app.cache import stats as cache_stats
+from app.db.database import async_engine, engine, read_async_engine
+from app.events import availability_feed
+from app.metrics.middleware import registry
+from app.metrics.registry import sample_lines
+from app.ratelimit import rejections as rate_limit_rejections
+
+ENGINES = {"async": async_engine, "sync": engine}
+if read_async_engine is not async_engine:
+    ENGINES["read"] = read_async_engine
+
+
+@registry.collector
+def pool_metrics():
+    pools = {(name,): e.pool for name, e in ENGINES.items()}
+    queued = {labels: pool for labels, pool in pools.items() if hasattr(pool, "checkedout")}
+    measured = {labels: pool.stats for labels, pool in pools.items() if hasattr(pool, "stats")}
+    families = [
+        ("db_pool_in_use", "gauge", "Connections checked out of the pool.",
+         {labels: pool.checkedout() for labels, pool in queued.items()}),
+        ("db_pool_idle", "gauge", "Connections idle in the pool.",
+         {labels: pool.checkedin() for labels, pool in queued.items()}),
+        ("db_pool_overflow", "gauge", "Connections open beyond the pool size.",
+         {labels: max(pool.overflow(), 0) for labels, pool in queued.items()}),
+        ("db_pool_checkouts_total", "counter", "Connection checkouts.",
+         {labels: stats.checkouts for labels, stats in measured.items()}),
+        ("db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a connection.",
+         {labels: stats.wait_total for labels, stats in measured.items()}),
+        ("db_pool_overflow_events_total", "counter", "Checkouts that opened an overflow connection.",
+         {labels: stats.overflow_events for labels, stats in measured.items()}),
+        ("db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection.",
+         {labels: stats.timeouts for labels, stats in measured.items()}),
+    ]
+    return [(name, kind, help, sample_lines(name, ("engine",), values)) for name, kind, help, values in families]
+
+
+@registry.collector
+def cache_metrics():
+    snapshot = cache_stats.snapshot()
+    return [
+        (f"cache_{field}_total", "counter", f"Cache {field} per namespace.",
+         sample_lines(f"cache_{field}_total", ("namespace",), {(ns,): counts[field] for ns, counts in snapshot.items()}))
+        for field in cache_stats.FIELDS
+    ]
+
+
+@registry.collector
+def rate_limit_metrics():
+    values = {(rule,): count for rule, count in rate_limit_rejections.items()}
+    return [("rate_limit_rejected_total", "counter", "Requests answered 429, per rule.",
+             sample_lines("rate_limit_rejected_total", ("rule",), values))]
+
+
+@registry.collector
+def availability_feed_metrics():
+    stats = availability_feed.stats
+    return [
+        ("availability_stream_subscribers", "gauge", "Open /books/stream connections.",
+         sample_lines("availability_stream_subscribers", (), {(): availability_feed.subscribers})),
+        ("availability_stream_changes_total", "counter", "Title availability changes sent to the streams.",
+         sample_lines("availability_stream_changes_total", (), {(): stats["changes"]})),
+    ]
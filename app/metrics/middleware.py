@@ -0,0 +1,82 @@
+# app/metrics/middleware.py
+"""
+Pure ASGI middleware recording per-route request metrics.
+
+Routes are labelled by their path template (/books/{book_id}, not
+/books/42) so series stay bounded; requests that match no route share the
+"<unmatched>" label. Sizes are the bytes actually received and sent, so
+streamed and chunked bodies are counted too.
+"""
+
+import time
+
+from app.metrics.registry import SIZE_BUCKETS, Gauge, Histogram, Registry
+
+UNMATCHED = "<unmatched>"
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from request start to the last byte of the response.",
+    ("method", "route", "status"),
+))
+requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled.", ("method",),
+))
+request_size = registry.register(Histogram(
+    "http_request_size_bytes", "Request body size.", ("method", "route"), SIZE_BUCKETS,
+))
+response_size = registry.register(Histogram(
+    "http_response_size_bytes", "Response body size.", ("method", "route", "status"), SIZE_BUCKETS,
+))
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._templates = None  # endpoint -> path template, built on first request
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED
+        if self._templates is None:
+            self._templates = {
+                route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._templates.get(endpoint, UNMATCHED)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        # status, request bytes, response bytes
+        seen = [500, 0, 0]
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                seen[1] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                seen[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                seen[2] += len(message.get("body", b""))
+            await send(message)
+
+        requests_in_flight.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.dec((method,))
+            route = self._route(scope)
+            status = str(seen[0])
+            request_duration.observe((method, route, status), elapsed)
+            request_size.observe((method, route), seen[1])
+            response_size.observe((method, route, status), seen[2])
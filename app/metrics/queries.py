@@ -0,0 +1,160 @@
+# app/metrics/queries.py
+"""
+Per-request SQL accounting.
+
+Cursor-execute events on both engines add every statement to the QueryStats
+of the current request (a ContextVar, so it follows the request into
+AsyncSession greenlets and threadpool endpoints). QueryStatsMiddleware then:
+
+* adds `Server-Timing: db;dur=<ms>;desc="<n> queries"` to the response,
+* logs statements that repeat QUERY_REPEAT_WARNING times in one request -
+  the usual shape of an N+1 lazy load,
+* with QUERY_BUDGET set (tests only), raises QueryBudgetExceeded for any
+  request that runs more statements than the budget.
+
+Statements slower than SLOW_QUERY_MS are logged with their parameters and,
+with SLOW_QUERY_EXPLAIN, the plan the database reports for them.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when a request or block runs too many statements."""
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int):
+        return [(statement, n) for statement, n in self.statements.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track_queries():
+    """Count the statements run inside the block, e.g. around direct CRUD calls."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def query_budget(limit: int):
+    """Fail the block if it runs more than `limit` statements."""
+    with track_queries() as stats:
+        yield stats
+    _check_budget(stats, limit, "block")
+
+
+def _check_budget(stats: QueryStats, limit: int, what: str):
+    if stats.count > limit:
+        worst = "; ".join(f"{n}x {statement[:120]}" for statement, n in stats.statements.most_common(3))
+        raise QueryBudgetExceeded(f"{what} ran {stats.count} queries, budget is {limit}: {worst}")
+
+
+# -------------------
+# Engine events
+# -------------------
+def _explain(conn, statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    conn.info["explaining"] = True
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    except Exception as e:  # the plan is a diagnostic; never fail the request over it
+        return f"(EXPLAIN failed: {e})"
+    finally:
+        conn.info["explaining"] = False
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    if conn.info.get("explaining"):
+        return
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    threshold = settings.SLOW_QUERY_MS
+    if threshold is not None and elapsed * 1000 >= threshold:
+        plan = ""
+        if settings.SLOW_QUERY_EXPLAIN and not executemany:
+            plan = "\n" + _explain(conn, statement, parameters)
+        logger.warning("Slow query (%.1f ms): %s | params=%r%s", elapsed * 1000, statement, parameters, plan)
+
+
+def instrument_engine(engine):
+    """Attach the query hooks to a sync Engine (pass async_engine.sync_engine for async)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# -------------------
+# Middleware
+# -------------------
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def timing_send(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timing_send)
+        finally:
+            _current.reset(token)
+
+        for statement, n in stats.repeated(settings.QUERY_REPEAT_WARNING):
+            logger.warning("Possible N+1 on %s %s: ran %d times: %s", scope["method"], scope["path"], n, statement)
+        if settings.QUERY_BUDGET is not None:
+            _check_budget(stats, settings.QUERY_BUDGET, f"{scope['method']} {scope['path']}")
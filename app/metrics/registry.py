@@ -0,0 +1,133 @@
+# app/metrics/registry.py
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Histograms have fixed buckets chosen up front: an observation is one bisect
+and three integer/float additions on preallocated lists, and cumulative
+bucket counts are only summed when /metrics is scraped. Series are keyed by a
+tuple of label values. Everything is per worker process.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# seconds; wide enough for a cache hit and a slow batch borrow alike
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# bytes
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """One labelled family of fixed-bucket histograms."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._bounds = ['le="%s"' % _number(bound) for bound in self.buckets] + ['le="+Inf"']
+        # label values -> [per-bucket counts (last is +Inf), [sum, count]]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), [0.0, 0]]
+        series[0][bisect_left(self.buckets, value)] += 1
+        totals = series[1]
+        totals[0] += value
+        totals[1] += 1
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, (total, count)) in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self._bounds, counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, bound)} {cumulative}"
+            plain = _labels(self.label_names, labels)
+            yield f"{self.name}_sum{plain} {_number(total)}"
+            yield f"{self.name}_count{plain} {count}"
+
+    def reset(self):
+        self._series.clear()
+
+
+class Gauge:
+    """One labelled family of gauges that the app moves up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+    def reset(self):
+        self._values.clear()
+
+
+class Registry:
+    """
+    Metrics plus collectors: callables that return (name, kind, help, samples)
+    tuples read at scrape time, for numbers kept elsewhere (pool, cache).
+    """
+
+    def __init__(self):
+        self.metrics: List = []
+        self.collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, func: Callable[[], Iterable[tuple]]):
+        self.collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        lines = []
+        families = [(m.name, m.kind, m.help, m.samples()) for m in self.metrics]
+        for collect in self.collectors:
+            families.extend(collect())
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
+
+
+def sample_lines(name: str, label_names: Sequence[str], values: Dict[Tuple, float]) -> List[str]:
+    """Sample lines for a collector, from {label values: number}."""
+    return [f"{name}{_labels(label_names, labels)} {_number(value)}" for labels, value in values.items()]
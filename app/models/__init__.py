@@ -1,2 +1,2 @@
 # app/models/__init__.py
-from .models import User, Book, Loan, LoanStatusEnum
\ No newline at end of file
+from .models import User, Book, Loan, LoanStatusEnum, Hold, HoldStatusEnum
\ No newline at end of file
@@ -1,6 +1,7 @@
 # app/models/models.py
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import DDL, Column, Integer, LargeBinary, SmallInteger, String, DateTime, ForeignKey, Index, Enum as SQLEnum, case, event, func, select, text
+from sqlalchemy.dialects import postgresql  # noqa: F401 - registers typed to_tsvector() / to_tsquery()
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from enum import Enum
@@ -13,6 +14,13 @@ class LoanStatusEnum(str, Enum):
     BORROWED = "borrowed"
     RETURNED = "returned"
 
+class HoldStatusEnum(str, Enum):
+    WAITING = "waiting"      # in the title's queue
+    READY = "ready"          # a returned copy is held for the patron until ready_until
+    FULFILLED = "fulfilled"  # the patron borrowed the held copy
+    EXPIRED = "expired"      # not picked up in time; the copy moved on
+    CANCELLED = "cancelled"
+
 # -----------------------
 # User model
 # -----------------------
@@ -22,9 +30,12 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     loans = relationship("Loan", back_populates="user")
 
+    __mapper_args__ = {"version_id_col": version}
+
 # -----------------------
 # Book model
 # -----------------------
@@ -38,8 +49,79 @@ class Book(Base):
     publication_year = Column(Integer, nullable=False)
     total_copies = Column(Integer, nullable=False)
     available_copies = Column(Integer, nullable=False)
+    # 0: available_copies is the whole count. N > 0: most copies live in N
+    # BookCopySlot rows and availability is available_copies + their sum.
+    counter_slots = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by the ORM on every flush of the row, and by the Core writes
+    # that change what the API returns (see app/utils/etag.py).
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     loans = relationship("Loan", back_populates="book")
+    copy_slots = relationship("BookCopySlot", cascade="all, delete-orphan")
+
+    __mapper_args__ = {"version_id_col": version}
+
+# -----------------------
+# Sharded availability counter
+# -----------------------
+class BookCopySlot(Base):
+    """
+    One shard of a hot title's available copies. Borrows claim any slot with
+    a copy left (skipping slots another transaction holds), so concurrent
+    borrows of one title lock different rows instead of queueing on books.
+    """
+    __tablename__ = "book_copy_slots"
+
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    slot = Column(Integer, primary_key=True)
+    available = Column(Integer, nullable=False, default=0)
+
+
+def available_copies_expression():
+    """
+    Available copies as the API reports them: the books column, plus the
+    slot rows for sharded titles. The correlated sum only runs for those.
+    """
+    slot_total = (
+        select(func.coalesce(func.sum(BookCopySlot.available), 0))
+        .where(BookCopySlot.book_id == Book.id)
+        .scalar_subquery()
+    )
+    return case((Book.counter_slots > 0, Book.available_copies + slot_total), else_=Book.available_copies)
+
+# -----------------------
+# Book search index
+# -----------------------
+def book_search_document():
+    """
+    Postgres: the weighted tsvector searched by /books/search. Title words
+    weigh more than author words. Queries must use this exact expression
+    for the planner to pick ix_books_search.
+    """
+    def weighted(column, weight):
+        return func.setweight(func.to_tsvector(text("'simple'"), column), text(f"'{weight}'"))
+    books = Book.__table__
+    return weighted(books.c.title, "A").op("||")(weighted(books.c.author, "B"))
+
+Index("ix_books_search", book_search_document(), postgresql_using="gin").ddl_if(dialect="postgresql")
+
+# SQLite: an external-content FTS5 table over books, kept in step by
+# triggers. The update trigger only fires when title or author change, so
+# borrow/return updates to the copy counters never touch the text index.
+SQLITE_BOOKS_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+    "title, author, content='books', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN "
+    "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author ON books BEGIN "
+    "INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author); "
+    "INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author); END",
+]
+for statement in SQLITE_BOOKS_FTS:
+    event.listen(Book.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Book.__table__, "before_drop", DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite"))
 
 # -----------------------
 # Loan model
@@ -51,10 +133,156 @@ class Loan(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
     borrow_date = Column(DateTime, default=datetime.utcnow, nullable=False)
+    due_date = Column(DateTime, nullable=True)  # set at borrow time from LOAN_PERIOD_DAYS
     return_date = Column(DateTime, nullable=True)
+    overdue_notified_at = Column(DateTime, nullable=True)  # set once by the overdue scanner
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on return
 
     # ✅ use SQLAlchemy Enum for status
     status = Column(SQLEnum(LoanStatusEnum), default=LoanStatusEnum.BORROWED, nullable=False)
 
     user = relationship("User", back_populates="loans")
-    book = relationship("Book", back_populates="loans")
\ No newline at end of file
+    book = relationship("Book", back_populates="loans")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    # Lookup indexes: id is the trailing column so keyset pages of one
+    # user's / book's loans are a single index range scan. The partial index
+    # holds only active loans (the enum is stored by name).
+    __table_args__ = (
+        Index("ix_loans_user_id_status_id", "user_id", "status", "id"),
+        Index("ix_loans_book_id_status_id", "book_id", "status", "id"),
+        Index(
+            "ix_loans_active_id", "id",
+            postgresql_where=text("status = 'BORROWED'"),
+            sqlite_where=text("status = 'BORROWED'"),
+        ),
+        # Active loans by due date: the overdue scan and /loans/overdue read
+        # only the overdue end of it, however long the loan history is.
+        Index(
+            "ix_loans_active_due_date", "due_date", "id",
+            postgresql_where=text("status = 'BORROWED'"),
+            sqlite_where=text("status = 'BORROWED'"),
+        ),
+        # The scanner's side of it: loans drop out once stamped, so each run
+        # starts at the oldest loan it has not notified yet.
+        Index(
+            "ix_loans_unnotified_due_date", "due_date", "id",
+            postgresql_where=text("status = 'BORROWED' AND overdue_notified_at IS NULL"),
+            sqlite_where=text("status = 'BORROWED' AND overdue_notified_at IS NULL"),
+        ),
+        # Archived loans keep their ids: SQLite must never hand out the
+        # highest one again once it has moved to loans_archive.
+        {"sqlite_autoincrement": True},
+    )
+
+
+# -----------------------
+# Archived loans
+# -----------------------
+class ArchivedLoan(Base):
+    """
+    Returned loans moved out of `loans` by the archival job (app/jobs/archive.py),
+    so `loans` holds only active and recently returned loans. Same columns,
+    no foreign keys. On Postgres the table is range-partitioned by
+    borrow_date, one partition per year, created as rows arrive; the
+    partition key has to be part of the primary key.
+
+    `loans` itself stays unpartitioned: partitioning it by borrow_date would
+    put borrow_date in its primary key, so every lookup of a loan by id
+    (returns, holds, ETags) would probe each partition. Only the history,
+    which is written once and read by range, is partitioned.
+    """
+    __tablename__ = "loans_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    book_id = Column(Integer, nullable=False)
+    borrow_date = Column(DateTime, primary_key=True)
+    due_date = Column(DateTime, nullable=True)
+    return_date = Column(DateTime, nullable=True)
+    status = Column(SQLEnum(LoanStatusEnum), nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        Index("ix_loans_archive_user_id_id", "user_id", "id"),
+        Index("ix_loans_archive_book_id_id", "book_id", "id"),
+        {"postgresql_partition_by": "RANGE (borrow_date)"},
+    )
+
+
+# -----------------------
+# Holds (reservation queue)
+# -----------------------
+class Hold(Base):
+    """
+    A patron's place in a title's FIFO queue. A return hands its copy to
+    the oldest WAITING hold instead of the shelf; the hold is then READY
+    and the copy is the patron's until ready_until.
+    """
+    __tablename__ = "holds"
+
+    id = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(SQLEnum(HoldStatusEnum), default=HoldStatusEnum.WAITING, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    ready_until = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # The queue: its head is the first entry for the title, and a
+        # position is a count over the entries before it.
+        Index(
+            "ix_holds_waiting_book_id_id", "book_id", "id",
+            postgresql_where=text("status = 'WAITING'"),
+            sqlite_where=text("status = 'WAITING'"),
+        ),
+        # One open hold per patron and title; also how a borrow finds its held copy.
+        Index(
+            "ix_holds_open_user_id_book_id", "user_id", "book_id", unique=True,
+            postgresql_where=text("status IN ('WAITING', 'READY')"),
+            sqlite_where=text("status IN ('WAITING', 'READY')"),
+        ),
+        # Held copies by pickup deadline, for the expiry scan.
+        Index(
+            "ix_holds_ready_until", "ready_until", "id",
+            postgresql_where=text("status = 'READY'"),
+            sqlite_where=text("status = 'READY'"),
+        ),
+    )
+
+
+def loan_history_models(status=None):
+    """The tables a loan read must cover: active loans are never archived."""
+    if status == LoanStatusEnum.BORROWED:
+        return (Loan,)
+    return (Loan, ArchivedLoan)
+
+
+def archive_partition_ddl(year: int) -> str:
+    """Postgres: the loans_archive partition for one calendar year."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS loans_archive_y{year} PARTITION OF loans_archive "
+        f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+    )
+
+
+# -----------------------
+# Idempotency keys
+# -----------------------
+class IdempotencyKey(Base):
+    """
+    One row per Idempotency-Key a client sent with a POST (see
+    app/idempotency). Keys and request fingerprints are stored as 16-byte
+    digests, so a lookup is one primary-key probe on a small index. While
+    the first request runs, status_code is NULL and expires_at is its
+    lease; afterwards expires_at is when the stored response may be purged.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(LargeBinary(16), primary_key=True)
+    fingerprint = Column(LargeBinary(16), nullable=False)  # method, path, query string and body
+    status_code = Column(SmallInteger, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
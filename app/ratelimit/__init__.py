@@ -0,0 +1,10 @@
+# app/ratelimit/__init__.py
+from .limiter import (
+    Decision,
+    MemoryStore,
+    RateLimiter,
+    Rule,
+    SQLiteStore,
+    store_from_url,
+)
+from .middleware import RateLimitMiddleware, client_id, rejections
@@ -0,0 +1,182 @@
+# app/ratelimit/limiter.py
+"""
+GCRA rate limiting (the generic cell rate algorithm, a token bucket kept as
+one timestamp per key).
+
+A limit of L requests per period P with burst B gives an emission interval
+T = P / L. Each key stores its theoretical arrival time (TAT): a request at
+`now` is allowed if max(TAT, now) + T - now <= T * B, and then moves the TAT
+forward by T. One read and one write per check, no timers, no per-request
+allocation beyond the key string.
+
+Stores, selected by Settings.RATE_LIMIT_STORE_URL:
+
+    memory://?max_keys=100000   per-process, LRU-bounded (the default; also what tests use)
+    sqlite:////var/run/libro-rl.db   one file shared by every worker on the host
+
+The SQLite store does the check and the update in one UPSERT ... RETURNING,
+so workers cannot race each other past a limit.
+"""
+
+import logging
+import sqlite3
+import time
+from collections import OrderedDict, namedtuple
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from starlette.routing import compile_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_KEYS = 100_000
+
+Decision = namedtuple("Decision", "allowed rule limit remaining retry_after")
+
+
+class MemoryStore:
+    """TATs in an in-process LRU dict; evicting a key just refills its bucket."""
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+
+    def hit(self, key: str, now: float, interval: float, window: float) -> Tuple[bool, float]:
+        """Returns (allowed, TAT after the check)."""
+        tat = max(self._tat.get(key, now), now)
+        if tat + interval - now > window:
+            return False, tat
+        self._tat[key] = tat + interval
+        self._tat.move_to_end(key)
+        if len(self._tat) > self.max_keys:
+            self._tat.popitem(last=False)
+        return True, tat + interval
+
+    def close(self):
+        self._tat.clear()
+
+
+class SQLiteStore:
+    """
+    TATs in a SQLite file in WAL mode, shared by every worker on the host.
+
+    Uses the blocking sqlite3 module on purpose: a single-row UPSERT takes
+    microseconds, far less than handing it to a thread. If the file stays
+    locked past `timeout` the request is let through rather than stalled.
+    """
+
+    PRUNE_EVERY = 1000
+
+    UPSERT = (
+        "INSERT INTO rate_limits (key, tat) VALUES (?1, ?2 + ?3) "
+        "ON CONFLICT(key) DO UPDATE SET tat = max(tat, ?2) + ?3 "
+        "WHERE max(tat, ?2) + ?3 - ?2 <= ?4 "
+        "RETURNING tat"
+    )
+
+    def __init__(self, path: str, timeout: float = 0.05):
+        self.path = path
+        self.timeout = timeout
+        self._db: Optional[sqlite3.Connection] = None
+        self._hits = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")
+            db.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID")
+            self._db = db
+        return self._db
+
+    def hit(self, key: str, now: float, interval: float, window: float) -> Tuple[bool, float]:
+        try:
+            db = self._conn()
+            row = db.execute(self.UPSERT, (key, now, interval, window)).fetchone()
+            if row is not None:
+                self._hits += 1
+                if self._hits % self.PRUNE_EVERY == 0:
+                    # a TAT in the past is a full bucket, the same as no row
+                    db.execute("DELETE FROM rate_limits WHERE tat < ?", (now,))
+                return True, row[0]
+            return False, db.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()[0]
+        except sqlite3.OperationalError as e:
+            logger.warning("Rate limit store unavailable, allowing request: %s", e)
+            return True, now
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def store_from_url(url: Optional[str]):
+    """Build the rate limit store for a RATE_LIMIT_STORE_URL; None means memory://."""
+    parsed = urlparse(url or "memory://")
+    options = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    if parsed.scheme == "memory":
+        return MemoryStore(int(options.get("max_keys", DEFAULT_MAX_KEYS)))
+    if parsed.scheme == "sqlite":
+        # same convention as SQLAlchemy: sqlite:///relative.db, sqlite:////absolute.db
+        return SQLiteStore(parsed.path[1:])
+    raise ValueError(f"Unsupported RATE_LIMIT_STORE_URL scheme: {parsed.scheme}")
+
+
+class Rule:
+    __slots__ = ("name", "limit", "interval", "window")
+
+    def __init__(self, name: str, limit: int, period: float, burst: Optional[int] = None):
+        if limit <= 0:
+            raise ValueError(f"Rate limit for {name} must be positive")
+        self.name = name
+        self.limit = limit
+        self.interval = period / limit
+        self.window = self.interval * (burst or limit)
+
+
+class RateLimiter:
+    """
+    Per-client limits: every client gets `default_limit` requests per
+    `period` across the API, except on routes listed in `routes`
+    ({"POST /loans/borrow": 20}), which get a bucket of their own. `clients`
+    overrides the default limit for particular client ids.
+    """
+
+    def __init__(self, store, default_limit: int, period: float = 60, burst: Optional[int] = None,
+                 routes: Optional[Dict[str, int]] = None, clients: Optional[Dict[str, int]] = None,
+                 clock=time.time):
+        self.store = store
+        self.clock = clock
+        self.default = Rule("default", default_limit, period, burst)
+        self.clients = {client: Rule("default", limit, period, burst) for client, limit in (clients or {}).items()}
+        # method -> [(path regex, rule)]; only configured routes are ever matched
+        self.routes: Dict[str, list] = {}
+        for spec, limit in (routes or {}).items():
+            method, _, path = spec.strip().partition(" ")
+            regex = compile_path(path.strip())[0]
+            self.routes.setdefault(method.upper(), []).append((regex, Rule(spec, limit, period, burst)))
+
+    def _rule(self, client: str, method: str, path: str) -> Rule:
+        for regex, rule in self.routes.get(method, ()):
+            if regex.match(path):
+                return rule
+        return self.clients.get(client, self.default)
+
+    def check(self, client: str, method: str, path: str) -> Decision:
+        rule = self._rule(client, method, path)
+        now = self.clock()
+        allowed, tat = self.store.hit(f"{rule.name}|{client}", now, rule.interval, rule.window)
+        if allowed:
+            remaining = int((rule.window - (tat - now)) / rule.interval)
+            return Decision(True, rule.name, rule.limit, remaining, 0.0)
+        return Decision(False, rule.name, rule.limit, 0, tat + rule.interval - rule.window - now)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            store_from_url(settings.RATE_LIMIT_STORE_URL),
+            settings.API_RATE_LIMIT,
+            burst=settings.RATE_LIMIT_BURST,
+            routes=settings.RATE_LIMIT_ROUTES,
+            clients=settings.RATE_LIMIT_CLIENTS,
+        )
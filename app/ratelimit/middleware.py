@@ -0,0 +1,55 @@
+# app/ratelimit/middleware.py
+"""
+Pure ASGI middleware that checks every request against the RateLimiter
+before routing, and answers 429 with Retry-After when the client is over
+its limit. Clients are identified by IP address (the first X-Forwarded-For
+hop when RATE_LIMIT_TRUST_FORWARDED is set, i.e. behind a trusted proxy).
+"""
+
+import math
+from collections import Counter
+
+from starlette.responses import JSONResponse
+
+from app.config.settings import settings
+
+# rule name -> rejected requests, for /metrics
+rejections = Counter()
+
+
+def client_id(scope) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",", 1)[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, limiter):
+        self.app = app
+        self.limiter = limiter
+        self.exempt = frozenset(settings.RATE_LIMIT_EXEMPT)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        decision = self.limiter.check(client_id(scope), scope["method"], scope["path"])
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+
+        rejections[decision.rule] += 1
+        response = JSONResponse(
+            {"detail": f"Rate limit exceeded: {decision.limit} per minute"},
+            status_code=429,
+            headers={
+                "Retry-After": str(max(1, math.ceil(decision.retry_after))),
+                "RateLimit-Limit": str(decision.limit),
+                "RateLimit-Remaining": "0",
+            },
+        )
+        await response(scope, receive, send)
@@ -7,5 +7,16 @@ from .schemas import (
     Loan,
     LoanCreate,
     BookBorrowRequest,
-    BookReturnRequest
+    BookReturnRequest,
+    LoanResponse,
+    Hold,
+    HoldCreate,
+    Page,
+    BatchMode,
+    BatchBorrowRequest,
+    BatchReturnRequest,
+    BatchItemResult,
+    BatchResponse,
+    ImportRowError,
+    ImportReport,
 )
\ No newline at end of file
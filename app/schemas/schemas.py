@@ -1,6 +1,16 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Generic, Literal, Optional, TypeVar
 from datetime import datetime
+from enum import Enum
+
+T = TypeVar("T")
+
+# ------------------------
+# Pagination
+# ------------------------
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: Optional[str] = None
 
 # ------------------------
 # Book Schemas
@@ -23,9 +33,14 @@ class BookUpdate(BaseModel):
     publication_year: Optional[int] = None
     total_copies: Optional[int] = None
 
+# Sharded availability counter for hot titles; 0 switches back to simple mode
+class CounterSlotsUpdate(BaseModel):
+    slots: int = Field(..., ge=0)
+
 class Book(BookBase):
     id: int
     available_copies: int
+    version: int  # also sent as the ETag; see app/utils/etag.py
 
     class Config:
         from_attributes = True
@@ -42,6 +57,7 @@ class UserCreate(UserBase):
 
 class User(UserBase):
     id: int
+    version: int
 
     class Config:
         from_attributes = True
@@ -53,7 +69,7 @@ class LoanBase(BaseModel):
     book_id: int
     user_id: int
     borrow_date: Optional[datetime]
-    due_date: Optional[datetime]
+    due_date: Optional[datetime] = None
     return_date: Optional[datetime]
     status: str
 
@@ -63,6 +79,7 @@ class LoanCreate(BaseModel):
 
 class Loan(LoanBase):
     id: int
+    version: int
 
     class Config:
         from_attributes = True
@@ -72,9 +89,28 @@ class LoanResponse(BaseModel):
     book_id: int
     user_id: int
     borrow_date: Optional[datetime]
-    due_date: Optional[datetime]
+    due_date: Optional[datetime] = None
     return_date: Optional[datetime]
     status: str
+    version: int
+
+    class Config:
+        from_attributes = True
+
+# ------------------------
+# Hold Schemas
+# ------------------------
+class HoldCreate(BaseModel):
+    user_id: int
+
+class Hold(BaseModel):
+    id: int
+    book_id: int
+    user_id: int
+    status: str
+    created_at: datetime
+    ready_until: Optional[datetime] = None  # once READY: borrow before this or the copy moves on
+    position: Optional[int] = None  # 1 = next in line; only while waiting
 
     class Config:
         from_attributes = True
@@ -86,4 +122,48 @@ class BookBorrowRequest(BaseModel):
     user_id: int
 
 class BookReturnRequest(BaseModel):
-    loan_id: int
\ No newline at end of file
+    loan_id: int
+
+# ------------------------
+# Batch Borrow/Return Schemas
+# ------------------------
+class BatchMode(str, Enum):
+    ATOMIC = "atomic"    # any failed item rolls the whole batch back
+    PARTIAL = "partial"  # commit the items that succeeded
+
+class BatchBorrowRequest(BaseModel):
+    items: list[LoanCreate] = Field(..., min_length=1)
+    mode: BatchMode = BatchMode.ATOMIC
+
+class BatchReturnRequest(BaseModel):
+    items: list[BookReturnRequest] = Field(..., min_length=1)
+    mode: BatchMode = BatchMode.ATOMIC
+
+class BatchItemResult(BaseModel):
+    index: int
+    ok: bool
+    loan: Optional[LoanResponse] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: list[BatchItemResult]
+
+# ------------------------
+# Bulk Import Schemas
+# ------------------------
+ImportFormat = Literal["csv", "jsonl"]
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ImportRowError]  # first MAX_REPORTED_ERRORS only
+
+# ------------------------
+# Export
+# ------------------------
+ExportFormat = Literal["ndjson", "csv"]
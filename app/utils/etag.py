@@ -0,0 +1,81 @@
+# app/utils/etag.py
+"""
+Strong ETags from row versions.
+
+Books, users and loans carry a `version` column that every write changing
+their representation bumps, so a tag is a few integers formatted, not a
+hash of the response body. A book's available_copies moves on every borrow
+and return without a version bump (that would put another write on the
+hottest path, and a sharded title's borrow never touches the books row),
+so book tags include it:
+
+    detail   "<version>.<available_copies>"   e.g. "3.12", or "2" for a user
+    page     "p<digest of (id, version, ...) per row and the next cursor>"
+
+If-Match on a write compares the version part only: a borrow between a
+client's GET and its PUT does not conflict with an edit of the title.
+
+A request served without the cache has its If-None-Match published in
+`request_if_none_match` (see app/cache/decorator.py), so the fast-path
+responses answer 304 before encoding a body.
+"""
+
+import hashlib
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from starlette.responses import Response
+
+# columns that change without a version bump
+VOLATILE = ("available_copies",)
+
+request_if_none_match: ContextVar[Optional[str]] = ContextVar("request_if_none_match", default=None)
+
+
+def _parts(row) -> tuple:
+    return (row.version, *(getattr(row, name) for name in VOLATILE if hasattr(row, name)))
+
+
+def row_etag(row) -> str:
+    return '"%s"' % ".".join(str(part) for part in _parts(row))
+
+
+def page_etag(rows: Iterable, next_cursor: Optional[str]) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    for row in rows:
+        digest.update(repr((row.id, *_parts(row))).encode())
+    digest.update((next_cursor or "").encode())
+    return f'"p{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def if_match_version(if_match: str) -> Optional[int]:
+    """
+    The version an If-Match header expects; None for "*" (any version).
+    Raises ValueError for a tag this API did not issue.
+    """
+    tag = if_match.split(",")[0].strip()
+    if tag == "*":
+        return None
+    if not (len(tag) > 2 and tag[0] == tag[-1] == '"'):
+        raise ValueError(f"Malformed entity tag: {tag}")
+    return int(tag[1:-1].split(".")[0])
+
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    return Response(status_code=304, headers={**(headers or {}), "ETag": etag})
+
+
+def unchanged(etag: Optional[str]) -> Optional[Response]:
+    """The 304 for the current request when it already has `etag`, else None."""
+    if etag and etag_matches(request_if_none_match.get(), etag):
+        return not_modified(etag)
+    return None
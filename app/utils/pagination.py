@@ -0,0 +1,93 @@
+# app/utils/pagination.py
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue."""
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot put {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the sort-key values of the last row on a page into an opaque,
+    URL-safe cursor string. Datetimes are stored as ISO strings.
+    """
+    raw = json.dumps(list(values), separators=(",", ":"), default=_json_default).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        raise InvalidCursor("Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Invalid pagination cursor")
+    return values
+
+
+def _key_value(key, value):
+    """
+    Turn a decoded cursor value back into what `key` compares against;
+    a value of the wrong type for the column is an invalid cursor, not a
+    database error.
+    """
+    try:
+        python_type = key.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor("Invalid pagination cursor")
+    if python_type is float:
+        python_type = (int, float)
+    if isinstance(value, bool) or not isinstance(value, python_type):
+        raise InvalidCursor("Invalid pagination cursor")
+    return value
+
+
+def decode_keys(cursor: str, keys: Sequence) -> list:
+    """Decode a cursor issued for `keys`, checking each value against its column's type."""
+    return [_key_value(key, value) for key, value in zip(keys, decode_cursor(cursor, len(keys)))]
+
+
+def keyset_paginate(query: Query, keys: Sequence, limit: int, after: Optional[str] = None):
+    """
+    Return one page of `query` ordered by `keys` and the cursor for the next page.
+
+    `keys` must be unique as a tuple (end with the primary key) so the ordering
+    is stable across pages. Instead of OFFSET we seek past the last seen key,
+    so every page is an index range scan no matter how deep the client goes.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if after is not None:
+        values = decode_keys(after, keys)
+        if len(keys) == 1:
+            query = query.filter(keys[0] > values[0])
+        else:
+            query = query.filter(tuple_(*keys) > tuple_(*values))
+
+    # Fetch one extra row to learn whether another page exists.
+    rows = query.order_by(*keys).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, key.key) for key in keys])
+    return rows, next_cursor
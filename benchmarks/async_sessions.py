@@ -0,0 +1,128 @@
+# benchmarks/async_sessions.py
+"""
+Concurrency benchmark: sync Session inside `async def` vs AsyncSession.
+
+Fires N concurrent "requests" at one event loop, the way a single uvicorn
+worker sees them. Each request makes one simulated network round-trip to the
+database (`--latency-ms`) and then loads a book through the CRUD layer:
+
+* sync:  what the routers used to do - crud.get_book on a sync Session.
+         Every round-trip blocks the loop, so requests run one after another.
+* async: async_crud.get_book on an AsyncSession. Round-trips are awaited, so
+         up to pool-size requests are in flight at once.
+
+Runs against a throwaway SQLite file by default, where the round-trip is
+simulated by a `sleep_ms()` SQL function executed inside the driver. Point
+BENCH_DATABASE_URL at a Postgres database to use pg_sleep() instead.
+
+    python -m benchmarks.async_sessions --requests 200 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.crud import async_crud, crud
+from app.db.database import Base, to_async_url
+from app.schemas.schemas import BookCreate
+
+
+def _sleep_statement(url: str):
+    if url.startswith("postgresql"):
+        return text("SELECT pg_sleep(:ms / 1000.0)")
+    return text("SELECT sleep_ms(:ms)")
+
+
+def _register_sqlite_sleep(engine):
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, _):
+        # aiosqlite wraps the sqlite3 connection; the function runs on its driver thread
+        raw = getattr(dbapi_conn, "driver_connection", dbapi_conn)
+        raw = getattr(raw, "_conn", raw)
+        raw.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000.0) or ms)
+
+
+async def run_sync_path(Session, book_id: int, requests: int, latency_ms: int, sleep_sql):
+    async def one_request():
+        db = Session()
+        try:
+            db.execute(sleep_sql, {"ms": latency_ms})
+            return crud.get_book(db, book_id)
+        finally:
+            db.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    return time.perf_counter() - start
+
+
+async def run_async_path(AsyncSession, book_id: int, requests: int, latency_ms: int, sleep_sql):
+    async def one_request():
+        async with AsyncSession() as db:
+            await db.execute(sleep_sql, {"ms": latency_ms})
+            return await async_crud.get_book(db, book_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{tmpdir.name}/bench.db"
+
+    pool = {"pool_size": args.pool_size, "max_overflow": 0}
+    sync_engine = create_engine(url, poolclass=QueuePool, **pool)
+    async_engine = create_async_engine(to_async_url(url), poolclass=AsyncAdaptedQueuePool, **pool)
+    if url.startswith("sqlite"):
+        _register_sqlite_sleep(sync_engine)
+        _register_sqlite_sleep(async_engine.sync_engine)
+
+    Base.metadata.create_all(sync_engine)
+    Session = sessionmaker(bind=sync_engine, autoflush=False)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    with Session() as db:
+        book = crud.create_book(db, BookCreate(
+            title="Benchmark", author="Bench", isbn=f"bench-{time.time_ns()}",
+            publication_year=2025, total_copies=1,
+        ))
+        book_id = book.id
+
+    sleep_sql = _sleep_statement(url)
+
+    async def bench():
+        sync_s = await run_sync_path(Session, book_id, args.requests, args.latency_ms, sleep_sql)
+        async_s = await run_async_path(AsyncSession, book_id, args.requests, args.latency_ms, sleep_sql)
+        await async_engine.dispose()
+        return sync_s, async_s
+
+    sync_s, async_s = asyncio.run(bench())
+    sync_engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+    print(f"{args.requests} concurrent requests, {args.latency_ms} ms DB round-trip, pool size {args.pool_size}")
+    print(f"  sync Session  : {sync_s:8.3f} s  {args.requests / sync_s:9.1f} req/s")
+    print(f"  AsyncSession  : {async_s:8.3f} s  {args.requests / async_s:9.1f} req/s")
+    print(f"  speedup       : {sync_s / async_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
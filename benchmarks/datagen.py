@@ -0,0 +1,115 @@
+# benchmarks/datagen.py
+"""
+Synthetic library data for the benchmarks.
+
+Popularity is Zipf-skewed: a handful of titles account for most loans, and
+some readers borrow far more than others, so indexes, caches and row locks
+see the same hot spots they would in production. Everything is drawn from
+one random.Random, so a seed always produces the same dataset.
+
+Expects empty tables: ids are assumed to start at 1.
+"""
+
+import itertools
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import insert, select
+
+from app.models.models import Book, Loan, LoanStatusEnum, User
+
+WORDS = (
+    "river night garden silent empire glass winter stone shadow golden paper city "
+    "ocean letter forest fire memory island secret house storm light bridge wolf "
+    "north dream song iron crown salt mirror orchard harbour machine thread summer"
+).split()
+
+
+def zipf_weights(n: int, s: float = 1.0) -> List[float]:
+    """Cumulative weights for rng.choices: rank r is picked with probability ~ 1/r**s."""
+    return list(itertools.accumulate(1 / (rank + 1) ** s for rank in range(n)))
+
+
+@dataclass
+class Dataset:
+    users: int
+    books: int
+    loans: int
+    book_weights: List[float] = field(repr=False)
+    user_weights: List[float] = field(repr=False)
+    active_loan_ids: List[int] = field(repr=False)
+
+    def pick_book(self, rng: random.Random) -> int:
+        return rng.choices(range(1, self.books + 1), cum_weights=self.book_weights)[0]
+
+    def pick_user(self, rng: random.Random) -> int:
+        return rng.choices(range(1, self.users + 1), cum_weights=self.user_weights)[0]
+
+    def pick_prefix(self, rng: random.Random) -> str:
+        word = rng.choice(WORDS)
+        return word[: rng.randint(3, len(word))]
+
+
+def seed(Session, users: int, books: int, loans: int, rng: random.Random,
+         active_share: float = 0.05, batch: int = 20000) -> Dataset:
+    """
+    Insert `users` readers, `books` titles and `loans` loans, of which about
+    `active_share` are still out. Popular titles get more copies, and every
+    title keeps at least one copy on the shelf.
+    """
+    book_weights = zipf_weights(books, 1.1)
+    user_weights = zipf_weights(users, 0.8)
+    book_ids = range(1, books + 1)
+    user_ids = range(1, users + 1)
+    now = datetime.utcnow()
+
+    with Session() as db:
+        for start in range(0, users, batch):
+            db.execute(insert(User), [
+                {"name": f"Reader {n}", "email": f"reader{n}@bench.example"}
+                for n in range(start + 1, min(start + batch, users) + 1)
+            ])
+
+        # draw the loans first so copies can be sized to cover the active ones
+        picked = rng.choices(book_ids, cum_weights=book_weights, k=loans)
+        active = [rng.random() < active_share for _ in range(loans)]
+        out = [0] * (books + 1)
+        for book_id, is_active in zip(picked, active):
+            out[book_id] += is_active
+
+        for start in range(0, books, batch):
+            rows = []
+            for n in range(start + 1, min(start + batch, books) + 1):
+                total = out[n] + 1 + (3 if n <= books // 100 else 0)
+                rows.append({
+                    "title": " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).capitalize() + f" {n}",
+                    "author": f"Author {rng.randint(1, max(books // 20, 1))}",
+                    "isbn": f"bench-{n}",
+                    "publication_year": rng.randint(1900, 2024),
+                    "total_copies": total,
+                    "available_copies": total - out[n],
+                })
+            db.execute(insert(Book), rows)
+
+        for start in range(0, loans, batch):
+            rows = []
+            for i in range(start, min(start + batch, loans)):
+                borrowed = now - timedelta(days=rng.uniform(0, 3 * 365))
+                returned = None if active[i] else borrowed + timedelta(days=rng.uniform(1, 30))
+                rows.append({
+                    "user_id": rng.choices(user_ids, cum_weights=user_weights)[0],
+                    "book_id": picked[i],
+                    "borrow_date": borrowed,
+                    "due_date": borrowed + timedelta(days=14),
+                    "return_date": returned,
+                    "status": LoanStatusEnum.BORROWED if active[i] else LoanStatusEnum.RETURNED,
+                })
+            db.execute(insert(Loan), rows)
+        db.commit()
+
+        active_ids = list(db.scalars(select(Loan.id).where(Loan.status == LoanStatusEnum.BORROWED)))
+
+    rng.shuffle(active_ids)
+    return Dataset(users, books, loans, book_weights, user_weights, active_ids)
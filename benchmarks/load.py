@@ -0,0 +1,230 @@
+# benchmarks/load.py
+"""
+Mixed read/borrow/return load against the whole app, in-process.
+
+Seeds a synthetic library (benchmarks/datagen.py: Zipf-skewed titles and
+readers, a loan history with some loans still out), then runs `--requests`
+requests from `--concurrency` concurrent clients through httpx's ASGI
+transport - routing, middleware, caching, serialization and the database,
+without sockets. Reports throughput and p50/p95/p99 per operation.
+
+    python -m benchmarks.load --books 100000 --loans 500000 --requests 5000
+    python -m benchmarks.load --save-baseline benchmarks/baselines/sqlite.json
+    python -m benchmarks.load --compare benchmarks/baselines/sqlite.json
+
+--compare exits with status 1 when an operation's p95 or the overall
+throughput is worse than the baseline by more than --tolerance. Baselines
+only mean something on the same machine with the same arguments.
+
+Runs against a throwaway SQLite file by default; point BENCH_DATABASE_URL at
+an empty Postgres database to use that instead. The app is configured from
+the environment as usual (set ENABLE_CACHE=false to measure without cache).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.utils.pagination import encode_cursor
+
+DEFAULT_MIX = "get_book=35,list_books=10,search=15,user_loans=10,book_loans=5,borrow=15,return=10"
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+# -------------------
+# Operations
+# -------------------
+# Each takes (client, data, rng, state) and returns the response.
+async def get_book(client, data, rng, state):
+    return await client.get(f"/books/{data.pick_book(rng)}")
+
+
+async def list_books(client, data, rng, state):
+    # mostly first pages, sometimes a deep one via a cursor
+    params = {"limit": 50}
+    if rng.random() < 0.3:
+        params["after"] = encode_cursor([rng.randint(1, data.books)])
+    return await client.get("/books/", params=params)
+
+
+async def search(client, data, rng, state):
+    return await client.get("/books/search", params={"q": data.pick_prefix(rng)})
+
+
+async def user_loans(client, data, rng, state):
+    return await client.get(f"/users/{data.pick_user(rng)}/loans")
+
+
+async def book_loans(client, data, rng, state):
+    return await client.get(f"/books/{data.pick_book(rng)}/loans")
+
+
+async def borrow(client, data, rng, state):
+    response = await client.post(
+        "/loans/borrow", params={"book_id": data.pick_book(rng)}, json={"user_id": data.pick_user(rng)}
+    )
+    if response.status_code == 200:
+        state["active"].append(response.json()["id"])
+    return response
+
+
+async def return_(client, data, rng, state):
+    if not state["active"]:
+        return await borrow(client, data, rng, state)
+    return await client.post("/loans/return", json={"loan_id": state["active"].pop()})
+
+
+OPERATIONS = {
+    "get_book": get_book, "list_books": list_books, "search": search, "user_loans": user_loans,
+    "book_loans": book_loans, "borrow": borrow, "return": return_,
+}
+
+
+# -------------------
+# Runner
+# -------------------
+async def run_load(app, data, mix: dict, requests: int, concurrency: int, rng: random.Random) -> dict:
+    """Drive `requests` requests through the app; returns the report dict."""
+    import httpx
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    plan = rng.choices(names, weights=weights, k=requests)
+    state = {"active": list(data.active_loan_ids)}
+    timings = defaultdict(list)
+    failures = defaultdict(int)
+    queue = iter(plan)
+
+    async def client_loop(client, worker_rng):
+        for name in queue:
+            start = time.perf_counter()
+            response = await OPERATIONS[name](client, data, worker_rng, state)
+            timings[name].append((time.perf_counter() - start) * 1000)
+            # a 400 on borrow means "no copy left", which is a normal outcome
+            if response.status_code >= 500 or (response.status_code >= 400 and name not in ("borrow", "return")):
+                failures[name] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                client_loop(client, random.Random(rng.random())) for _ in range(concurrency)
+            ))
+            elapsed = time.perf_counter() - start
+
+    report = {"requests": requests, "seconds": round(elapsed, 3), "throughput": round(requests / elapsed, 1), "ops": {}}
+    for name in names:
+        samples = timings[name]
+        if len(samples) < 2:
+            continue
+        cuts = statistics.quantiles(samples, n=100)
+        report["ops"][name] = {
+            "count": len(samples), "failures": failures[name],
+            "p50": round(cuts[49], 3), "p95": round(cuts[94], 3), "p99": round(cuts[98], 3),
+        }
+    return report
+
+
+def print_report(report: dict):
+    print(f"{report['requests']} requests in {report['seconds']} s: {report['throughput']} req/s")
+    print(f"  {'operation':12} {'count':>7} {'fail':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, op in report["ops"].items():
+        print(f"  {name:12} {op['count']:7} {op['failures']:5} {op['p50']:9.2f} {op['p95']:9.2f} {op['p99']:9.2f}")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Regression messages: p95 or throughput worse than baseline by more than tolerance."""
+    problems = []
+    if baseline.get("config") != report.get("config"):
+        print("warning: baseline was recorded with different arguments", file=sys.stderr)
+    if report["throughput"] < baseline["throughput"] / (1 + tolerance):
+        problems.append(f"throughput {report['throughput']} req/s vs baseline {baseline['throughput']}")
+    for name, op in report["ops"].items():
+        before = baseline["ops"].get(name)
+        if before and op["p95"] > before["p95"] * (1 + tolerance):
+            problems.append(f"{name} p95 {op['p95']:.2f} ms vs baseline {before['p95']:.2f} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--books", type=int, default=50000)
+    parser.add_argument("--loans", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight pairs, comma separated")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before --compare fails")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    tmpdir = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{tmpdir.name}/load.db"
+    # the app builds its engines from the environment at import time, so
+    # nothing from app/ (or datagen, which imports the models) is imported earlier
+    os.environ["DATABASE_URL"] = url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    # every simulated client comes from one address, which the limiter would throttle
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    from app.db.database import Base
+    from app.main import app
+    from benchmarks.datagen import seed
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    data = seed(sessionmaker(bind=engine), args.users, args.books, args.loans, rng)
+    engine.dispose()
+    print(f"seeded {args.users} users, {args.books} books, {args.loans} loans in {time.perf_counter() - start:.1f} s")
+
+    report = asyncio.run(run_load(app, data, mix, args.requests, args.concurrency, rng))
+    report["config"] = {key: getattr(args, key) for key in ("users", "books", "loans", "requests", "concurrency", "mix", "seed")}
+    report["config"]["backend"] = url.split(":", 1)[0]
+    print_report(report)
+    if tmpdir:
+        tmpdir.cleanup()
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"no regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
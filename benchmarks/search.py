@@ -0,0 +1,105 @@
+# benchmarks/search.py
+"""
+Latency of /books/search queries against a large synthetic catalog.
+
+Seeds `--books` rows (titles and authors drawn from a synthetic vocabulary
+with Zipf-skewed word frequencies, so common words match many books and
+rare ones few), then times `--queries` calls to crud.search_books with one
+or two word prefixes and prints p50/p95/p99 in milliseconds. The first page of results is what is timed -
+the same work the endpoint does per request, minus HTTP.
+
+Runs against a throwaway SQLite file (FTS5) by default; point
+BENCH_DATABASE_URL at an empty Postgres database to measure the GIN index.
+
+    python -m benchmarks.search --books 1000000 --queries 500
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.search import search_books
+from app.db.database import Base
+from app.models.models import Book
+
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+
+
+def _vocabulary(size: int, rng: random.Random):
+    # letter frequencies roughly as in English, so prefixes are shared unevenly
+    weights = list(itertools.accumulate(1 / (rank + 2) for rank in range(len(LETTERS))))
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(LETTERS, cum_weights=weights, k=rng.randint(3, 10))))
+    return list(words)
+
+
+def seed(Session, books: int, rng: random.Random, batch: int = 20000):
+    vocabulary = _vocabulary(20000, rng)
+    # skew word choice so a few words are very common, like real titles
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    with Session() as db:
+        for start in range(0, books, batch):
+            rows = []
+            for n in range(start, min(start + batch, books)):
+                title = rng.choices(vocabulary, cum_weights=weights, k=rng.randint(1, 5))
+                author = rng.choices(vocabulary, cum_weights=weights, k=2)
+                rows.append({
+                    "title": " ".join(title).capitalize(), "author": " ".join(author).title(),
+                    "isbn": f"bench-{n}", "publication_year": 1900 + n % 125,
+                    "total_copies": 1, "available_copies": 1,
+                })
+            db.execute(insert(Book), rows)
+            db.commit()
+    return vocabulary, weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{tmpdir.name}/search.db"
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    rng = random.Random(42)
+
+    start = time.perf_counter()
+    vocabulary, weights = seed(Session, args.books, rng)
+    print(f"seeded {args.books} books in {time.perf_counter() - start:.1f} s")
+
+    timings = []
+    with Session() as db:
+        for _ in range(args.queries):
+            words = rng.choices(vocabulary, cum_weights=weights, k=rng.randint(1, 2))
+            q = " ".join(word[: rng.randint(3, len(word))] for word in words)
+            start = time.perf_counter()
+            search_books(db, q, args.limit)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+    cuts = statistics.quantiles(timings, n=100)
+    print(f"{args.queries} searches, first page of {args.limit}")
+    print(f"  p50 {cuts[49]:7.2f} ms   p95 {cuts[94]:7.2f} ms   p99 {cuts[98]:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/serialization.py
+"""
+Rows per second for one page of /books/ and /loans/: the fast path against
+the path the list endpoints used before it.
+
+* orm+pydantic: load ORM objects, validate each against the response model
+                with from_attributes, then dump the Page to JSON.
+* columns+json: select the response columns as rows and encode them with the
+                standard json module (the fallback without orjson).
+* columns+orjson: the same rows encoded with orjson, when it is installed.
+
+Each variant reads and encodes `--pages` pages of `--page-size` rows from a
+throwaway SQLite file (the database work is included; it is part of what the
+fast path saves).
+
+    python -m benchmarks.serialization --rows 20000 --page-size 500
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import crud
+from app.db.database import Base
+from app.models.models import Book, Loan, LoanStatusEnum, User
+from app.schemas.schemas import Book as BookSchema, LoanResponse, Page
+from app.utils import fastjson
+from app.utils.pagination import keyset_paginate
+
+
+def seed(Session, rows: int):
+    now = datetime.utcnow()
+    with Session() as db:
+        db.execute(insert(User), [{"name": "Bench", "email": "bench@example.com"}])
+        db.execute(insert(Book), [
+            {"title": f"Book {n}", "author": f"Author {n % 997}", "isbn": f"bench-{n}",
+             "publication_year": 1900 + n % 125, "total_copies": 3, "available_copies": 2}
+            for n in range(rows)
+        ])
+        db.execute(insert(Loan), [
+            {"user_id": 1, "book_id": 1 + n % rows, "borrow_date": now,
+             "return_date": now if n % 2 else None,
+             "status": LoanStatusEnum.RETURNED if n % 2 else LoanStatusEnum.BORROWED}
+            for n in range(rows)
+        ])
+        db.commit()
+
+
+def orm_pydantic(model, schema):
+    adapter = TypeAdapter(Page[schema])
+
+    def page(db, limit, after):
+        items, next_cursor = keyset_paginate(db.query(model), [model.id], limit, after)
+        body = adapter.dump_json(adapter.validate_python({"items": items, "next_cursor": next_cursor}, from_attributes=True))
+        return body, next_cursor
+
+    return page
+
+
+def columns(get_page, use_orjson: bool):
+    def page(db, limit, after):
+        saved, fastjson.orjson = fastjson.orjson, (fastjson.orjson if use_orjson else None)
+        try:
+            items, next_cursor = get_page(db, limit, after)
+            return fastjson.page_response(items, next_cursor).body, next_cursor
+        finally:
+            fastjson.orjson = saved
+
+    return page
+
+
+def run(Session, page, pages: int, page_size: int) -> float:
+    rows = 0
+    start = time.perf_counter()
+    with Session() as db:
+        after = None
+        for _ in range(pages):
+            # after the last page the cursor is None, which starts over at the first
+            _, after = page(db, page_size, after)
+            rows += page_size
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'serialization.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        seed(Session, args.rows)
+
+        print(f"{args.pages} pages of {args.page_size} rows, rows/s")
+        for name, model, schema, get_page in [
+            ("books", Book, BookSchema, crud.get_books),
+            ("loans", Loan, LoanResponse, crud.get_loans),
+        ]:
+            variants = [("orm+pydantic", orm_pydantic(model, schema)), ("columns+json", columns(get_page, False))]
+            if fastjson.orjson is not None:
+                variants.append(("columns+orjson", columns(get_page, True)))
+            baseline = None
+            for label, page in variants:
+                rate = run(Session, page, args.pages, args.page_size)
+                baseline = baseline or rate
+                print(f"  {name:6} {label:15} {rate:10.0f}  {rate / baseline:5.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
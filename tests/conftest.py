@@ -2,8 +2,10 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from app.config.settings import settings
 from app.db.database import Base, get_db
 from app.main import app
+from app.metrics import instrument_engine
 
 # Use the same database URL as in your app, or create a separate test DB
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"  # Use SQLite for testing
@@ -12,6 +14,7 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"  # Use SQLite for testing
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+instrument_engine(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create all tables for testing
@@ -27,6 +30,9 @@ def override_get_db():
 
 app.dependency_overrides[get_db] = override_get_db
 
+# Every test client shares one address; tests that need the limiter turn it back on
+settings.RATE_LIMIT_ENABLED = False
+
 # Create test client
 client = TestClient(app)
 
@@ -37,4 +43,12 @@ def db_session():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Strict query budget: @pytest.mark.query_budget(n) fails any request in the
+# test that runs more than n statements.
+@pytest.fixture(autouse=True)
+def query_budget_marker(request, monkeypatch):
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is not None:
+        monkeypatch.setattr(settings, "QUERY_BUDGET", marker.args[0])
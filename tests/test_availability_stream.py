@@ -0,0 +1,131 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.cache import LocalRespServer
+from app.cache.resp import RespClient
+from app.config.settings import settings
+from app.db.database import Base, to_async_url
+from app.events import AvailabilityFeed, Subscription, encode_events
+from app.main import app
+from app.models.models import Book
+
+
+@pytest.fixture(autouse=True)
+def short_window(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_COALESCE_MS", 20)
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    url = f"sqlite:///{tmp_path / 'stream.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([
+            Book(id=i, title=f"T{i}", author="A", isbn=f"stream-{i}", publication_year=2020,
+                 total_copies=5, available_copies=i)
+            for i in (1, 2)
+        ])
+        db.commit()
+    yield async_sessionmaker(create_async_engine(to_async_url(url), poolclass=NullPool), class_=AsyncSession)
+    engine.dispose()
+
+
+def test_bursts_are_coalesced_and_filtered(sessions):
+    async def main():
+        feed = AvailabilityFeed(sessions)
+        one, every = feed.subscribe([1]), feed.subscribe()
+        for _ in range(5):
+            feed.changed(1)
+        feed.changed(2)
+        first = await one.next(1), await every.next(1)
+        feed.unsubscribe(one)
+        feed.unsubscribe(every)
+        return first, feed
+
+    (one, every), feed = asyncio.run(main())
+    assert one == ({1: 1}, False)
+    assert every == ({1: 1, 2: 2}, False)
+    assert feed.stats["flushes"] == 1 and feed.subscribers == 0 and not feed.by_book
+
+
+def test_slow_subscribers_are_reset_not_queued():
+    async def main():
+        subscription = Subscription(None, max_pending=2)
+        for book_id in range(3):  # one more than it may hold: the backlog is dropped
+            subscription.push(book_id, 1)
+        subscription.push(9, 3)
+        return subscription.pending, await subscription.next(0.01), await subscription.next(0.01)
+
+    pending, batch, idle = asyncio.run(main())
+    assert pending == {9: 3} and batch == ({9: 3}, True) and idle is None
+    assert encode_events(*batch).startswith(b"event: reset\n")
+
+
+def test_changes_reach_other_workers(sessions):
+    async def main():
+        server = await LocalRespServer().start()
+        writer, reader = AvailabilityFeed(sessions), AvailabilityFeed(sessions)
+        await writer.start(RespClient(port=server.port))
+        await reader.start(RespClient(port=server.port))
+        await asyncio.sleep(0.05)  # let the reader subscribe
+        subscription = reader.subscribe([2])
+        writer.changed(2)
+        batch = await subscription.next(1)
+        await writer.stop()
+        await reader.stop()
+        await server.stop()
+        return batch
+
+    assert asyncio.run(main()) == ({2: 2}, False)
+
+
+def test_stream_endpoint_pushes_borrows():
+    async def main():
+        transport = httpx.ASGITransport(app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            user = (await http.post("/users/", json={
+                "name": "Watcher", "email": f"watch-{uuid.uuid4().hex[:8]}@example.com"})).json()
+            book = (await http.post("/books/", json={
+                "title": "Streamed", "author": "Author S", "isbn": f"sse-{uuid.uuid4().hex[:12]}",
+                "publication_year": 2025, "total_copies": 3})).json()
+
+            # drive the SSE route by hand: httpx would wait for the endless body
+            received, disconnect = [], asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                received.append(message)
+
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                "scheme": "http", "path": "/books/stream", "raw_path": b"/books/stream",
+                "query_string": f"book_id={book['id']}".encode(), "root_path": "",
+                "headers": [(b"host", b"test")], "client": ("127.0.0.1", 1), "server": ("test", 80),
+            }
+            stream = asyncio.ensure_future(app(scope, receive, send))
+            while len(received) < 2:
+                await asyncio.sleep(0.01)
+            await http.post("/loans/borrow", params={"book_id": book["id"]}, json={"user_id": user["id"]})
+            while not any(b"availability" in m.get("body", b"") for m in received):
+                await asyncio.sleep(0.01)
+            disconnect.set()
+            await asyncio.wait_for(stream, 5)
+            return received, book
+
+    received, book = asyncio.run(main())
+    assert received[0]["status"] == 200
+    assert (b"content-type", b"text/event-stream; charset=utf-8") in received[0]["headers"]
+    body = b"".join(m.get("body", b"") for m in received[1:])
+    assert body.startswith(b": connected\n\n")
+    assert f'"book_id": {book["id"]}, "available_copies": 2'.encode() in body
@@ -0,0 +1,206 @@
+import asyncio
+import contextlib
+import uuid
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from fastapi_cache import FastAPICache
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import (
+    BOOKS,
+    InstrumentedBackend,
+    LRUMemoryBackend,
+    LocalRespServer,
+    backend_from_url,
+    cached,
+    request_key_builder,
+    stats,
+)
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    # the context manager runs the startup hook that initialises the cache
+    with TestClient(app) as client:
+        yield client
+
+
+def _new_book(client, copies=1):
+    return client.post("/books/", json={
+        "title": "Cached Book",
+        "author": "Author C",
+        "isbn": f"cache-{uuid.uuid4().hex[:12]}",
+        "publication_year": 2025,
+        "total_copies": copies
+    }).json()
+
+
+def _find(page, book_id):
+    return next(item for item in page["items"] if item["id"] == book_id)
+
+
+def test_repeat_list_request_is_a_cache_hit(client):
+    _new_book(client)
+    first = client.get("/books/?limit=500")
+    second = client.get("/books/?limit=500")
+
+    assert first.headers["X-FastAPI-Cache"] == "MISS"
+    assert second.headers["X-FastAPI-Cache"] == "HIT"
+    assert second.json() == first.json()
+
+
+def test_borrow_invalidates_cached_book_list(client):
+    book = _new_book(client, copies=2)
+    user = client.post("/users/", json={"name": "Reader", "email": f"{uuid.uuid4().hex[:12]}@example.com"}).json()
+    client.get("/books/?limit=500")
+    before = stats.invalidations[BOOKS]
+
+    borrowed = client.post(f"/loans/borrow?book_id={book['id']}", json={"user_id": user["id"]})
+    assert borrowed.status_code == 200
+
+    page = client.get("/books/?limit=500")
+    assert page.headers["X-FastAPI-Cache"] == "MISS"
+    assert _find(page.json(), book["id"])["available_copies"] == 1
+    assert stats.invalidations[BOOKS] == before + 1
+    assert client.get("/cache/stats").json()[BOOKS]["invalidations"] == before + 1
+
+
+def test_memory_backend_evicts_least_recently_used():
+    async def scenario():
+        backend = LRUMemoryBackend(max_entries=2)
+        await backend.set("a", b"1", 60)
+        await backend.set("b", b"2", 60)
+        await backend.get("a")
+        await backend.set("c", b"3", 60)
+        return [await backend.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [b"1", None, b"3"]
+
+
+def test_entries_without_expire_are_kept(tmp_path):
+    async def scenario():
+        backends = [LRUMemoryBackend(), backend_from_url(f"sqlite:///{tmp_path}/cache.db")]
+        for backend in backends:
+            await backend.set("forever", b"kept")
+            await backend.set("zero", b"kept", 0)
+        got = [(await backend.get_with_ttl("forever"), await backend.get("zero")) for backend in backends]
+        await backends[1].close()
+        return got
+
+    assert asyncio.run(scenario()) == [((0, b"kept"), b"kept")] * 2
+
+
+def test_sqlite_backend_is_shared_between_workers(tmp_path):
+    url = f"sqlite:///{tmp_path}/cache.db"
+
+    async def scenario():
+        worker_a, worker_b = backend_from_url(url), backend_from_url(url)
+        await worker_a.set("p:books:/books/?", b"page", 60)
+        seen_by_b = await worker_b.get_with_ttl("p:books:/books/?")
+        await worker_b.clear(namespace="p:books:")
+        after_clear = await worker_a.get("p:books:/books/?")
+        await worker_a.close()
+        await worker_b.close()
+        return seen_by_b, after_clear
+
+    (ttl, value), after_clear = asyncio.run(scenario())
+    assert value == b"page" and 0 < ttl <= 60
+    assert after_clear is None
+
+
+def test_resp_backend_against_local_server():
+    async def scenario():
+        server = await LocalRespServer().start()
+        backend = backend_from_url(f"redis://127.0.0.1:{server.port}/0")
+        await backend.set("p:books:/books/?limit=1", b"one", 60)
+        await backend.set("p:users:/users/?", b"two", 60)
+        hit = await backend.get_with_ttl("p:books:/books/?limit=1")
+        removed = await backend.clear(namespace="p:books:")
+        left = (await backend.get("p:books:/books/?limit=1"), await backend.get("p:users:/users/?"))
+        await backend.close()
+        await server.stop()
+        return hit, removed, left
+
+    (ttl, value), removed, left = asyncio.run(scenario())
+    assert value == b"one" and 0 < ttl <= 60
+    assert removed == 1
+    assert left == (None, b"two")
+
+
+@pytest.fixture
+def standalone_cache():
+    FastAPICache.reset()
+    FastAPICache.init(InstrumentedBackend(LRUMemoryBackend()), prefix="test", key_builder=request_key_builder)
+    yield
+    FastAPICache.reset()
+
+
+def _counting_app(expire, stale_ttl):
+    calls = []
+    api = FastAPI()
+
+    @api.get("/slow")
+    @cached("slow", dict, expire=expire, stale_ttl=stale_ttl)
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"call": len(calls)}
+
+    return api, calls
+
+
+def test_concurrent_misses_share_one_load(standalone_cache):
+    api, calls = _counting_app(expire=60, stale_ttl=0)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as http:
+            return await asyncio.gather(*(http.get("/slow") for _ in range(20)))
+
+    responses = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {r.json()["call"] for r in responses} == {1}
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(standalone_cache):
+    api, calls = _counting_app(expire=0, stale_ttl=60)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as http:
+            first = await http.get("/slow")
+            stale = await asyncio.gather(*(http.get("/slow") for _ in range(10)))
+            await asyncio.sleep(0.1)
+            return first, stale
+
+    first, stale = asyncio.run(scenario())
+    assert first.headers["X-FastAPI-Cache"] == "MISS"
+    assert {r.headers["X-FastAPI-Cache"] for r in stale} == {"STALE"}
+    assert {r.json()["call"] for r in stale} == {1}
+    assert len(calls) == 2
+
+
+def test_miss_loads_with_its_own_session(standalone_cache):
+    seen, api = [], FastAPI()
+
+    @contextlib.asynccontextmanager
+    async def own_session():
+        yield "own session"
+
+    async def request_session():
+        yield "request session"  # closed as soon as its client goes
+
+    @api.get("/loaded")
+    @cached("loaded", dict, expire=60, stale_ttl=0, session_factory=own_session)
+    async def loaded(db: AsyncSession = Depends(request_session)):
+        seen.append(db)
+        return {"ok": True}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test") as http:
+            return await http.get("/loaded")
+
+    assert asyncio.run(scenario()).json() == {"ok": True}
+    assert seen == ["own session"]
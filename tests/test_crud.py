@@ -1,6 +1,14 @@
+import asyncio
+import uuid
+from datetime import datetime
+
 import pytest
 from app import crud, schemas
-from app.db.database import SessionLocal
+from app.crud import async_crud
+from app.crud.bulk_import import import_lines
+from app.db.database import SessionLocal, AsyncSessionLocal
+from app.models.models import Book
+from app.utils.pagination import InvalidCursor, encode_cursor
 
 @pytest.fixture
 def db_session():
@@ -45,4 +53,76 @@ def test_borrow_and_return_book(db_session):
 
     # Return the book
     returned_loan = crud.return_book(db_session, user.id, book.id)
-    assert returned_loan.status == "returned"
\ No newline at end of file
+    assert returned_loan.status == "returned"
+
+def test_get_books_pages_are_stable_and_complete(db_session):
+    tag = uuid.uuid4().hex[:8]
+    created = [
+        crud.create_book(db_session, schemas.BookCreate(
+            title=f"Paged {i}",
+            author="Author P",
+            isbn=f"page-{tag}-{i}",
+            publication_year=2025,
+            total_copies=1
+        ))
+        for i in range(5)
+    ]
+
+    seen, after = [], None
+    while True:
+        page, after = crud.get_books(db_session, limit=2, after=after)
+        assert len(page) <= 2
+        seen.extend(book.id for book in page)
+        if after is None:
+            break
+
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen))
+    assert {book.id for book in created} <= set(seen)
+
+def test_get_books_rejects_garbage_cursor(db_session):
+    with pytest.raises(InvalidCursor):
+        crud.get_books(db_session, limit=2, after="not-a-cursor")
+
+@pytest.mark.parametrize("values", [["abc"], [1.5], [True], [None]])
+def test_cursor_values_must_match_the_key_types(db_session, values):
+    with pytest.raises(InvalidCursor):
+        crud.get_books(db_session, limit=2, after=encode_cursor(values))
+    with pytest.raises(InvalidCursor):
+        crud.get_loans(db_session, limit=2, after=encode_cursor(values))
+    with pytest.raises(InvalidCursor):
+        crud.get_overdue_loans(db_session, datetime.utcnow(), limit=2, after=encode_cursor(["2026-01-01", values[0]]))
+
+def test_async_crud_matches_sync_crud():
+    tag = uuid.uuid4().hex[:8]
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            book = await async_crud.create_book(db, schemas.BookCreate(
+                title="Async Book",
+                author="Author D",
+                isbn=f"async-{tag}",
+                publication_year=2025,
+                total_copies=2
+            ))
+            fetched = await async_crud.get_book(db, book.id)
+            return book, fetched
+
+    book, fetched = asyncio.run(scenario())
+    assert fetched.id == book.id
+    assert fetched.available_copies == 2
+
+def test_bulk_import_upserts_and_reports_bad_rows(db_session):
+    isbn = f"bulk-{uuid.uuid4().hex[:8]}"
+    lines = [
+        "title,author,isbn,publication_year,total_copies\n",
+        f"First,Author I,{isbn},2020,2\n",
+        f"Broken,Author I,{isbn}-x,soon,2\n",
+        f"Second,Author I,{isbn},2021,4\n",
+    ]
+    report = import_lines(db_session, "books", "csv", lines, chunk_size=2)
+
+    assert report["failed"] == 1
+    assert report["errors"][0]["line"] == 3
+    book = db_session.query(Book).filter(Book.isbn == isbn).one()
+    assert (book.title, book.total_copies, book.available_copies) == ("Second", 4, 4)
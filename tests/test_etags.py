@@ -0,0 +1,135 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.main import app
+from app.utils import fastjson
+from app.utils.etag import etag_matches, if_match_version
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def _book(client, copies=2):
+    return client.post("/books/", json={
+        "title": "Tagged Book", "author": "Author E", "isbn": f"etag-{uuid.uuid4().hex[:12]}",
+        "publication_year": 2025, "total_copies": copies,
+    }).json()
+
+
+def _user(client):
+    return client.post("/users/", json={"name": "Poller", "email": f"poll-{uuid.uuid4().hex[:8]}@example.com"}).json()
+
+
+@pytest.mark.parametrize("cache_control", [None, "no-store"])
+def test_if_none_match_returns_304(client, cache_control):
+    book = _book(client)
+    headers = {"Cache-Control": cache_control} if cache_control else {}
+    first = client.get(f"/books/{book['id']}", headers=headers)
+    assert first.status_code == 200 and first.json()["version"] == 1
+    etag = first.headers["etag"]
+    assert etag == '"1.2"'
+
+    again = client.get(f"/books/{book['id']}", headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+
+
+def test_uncached_304_skips_encoding(client, monkeypatch):
+    book = _book(client)
+    headers = {"Cache-Control": "no-store"}
+    etag = client.get(f"/books/{book['id']}", headers=headers).headers["etag"]
+
+    encoded = []
+    monkeypatch.setattr(fastjson, "dumps", lambda obj: encoded.append(obj) or b"{}")
+    again = client.get(f"/books/{book['id']}", headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304 and not encoded
+
+
+def test_borrow_changes_book_tag(client):
+    book, user = _book(client), _user(client)
+    etag = client.get(f"/books/{book['id']}").headers["etag"]
+    client.post("/loans/borrow", params={"book_id": book["id"]}, json={"user_id": user["id"]})
+
+    response = client.get(f"/books/{book['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] == '"1.1"'
+
+
+def test_list_pages_are_tagged(client):
+    user = _user(client)
+    page = client.get(f"/users/{user['id']}/loans")
+    etag = page.headers["etag"]
+    assert client.get(f"/users/{user['id']}/loans", headers={"If-None-Match": etag}).status_code == 304
+
+    book = _book(client)
+    loan = client.post("/loans/borrow", params={"book_id": book["id"]}, json={"user_id": user["id"]}).json()
+    changed = client.get(f"/users/{user['id']}/loans", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+    etag = changed.headers["etag"]
+    client.post("/loans/return", json={"loan_id": loan["id"]})
+    returned = client.get(f"/users/{user['id']}/loans", headers={"If-None-Match": etag})
+    assert returned.status_code == 200 and returned.json()["items"][0]["version"] == 2
+
+
+def test_if_match_on_update(client):
+    book = _book(client)
+    etag = client.get(f"/books/{book['id']}").headers["etag"]
+    edit = {**{k: book[k] for k in ("author", "isbn", "publication_year", "total_copies")}, "title": "Edited"}
+
+    updated = client.put(f"/books/{book['id']}", json=edit, headers={"If-Match": etag})
+    assert updated.status_code == 200 and updated.json()["version"] == 2
+    assert updated.headers["etag"] == '"2.2"'
+
+    # a second edit based on the old tag loses
+    stale = client.put(f"/books/{book['id']}", json={**edit, "title": "Lost"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert client.put(f"/books/{book['id']}", json=edit, headers={"If-Match": "nonsense"}).status_code == 412
+    assert client.get(f"/books/{book['id']}").json()["title"] == "Edited"
+
+    # without If-Match the edit is unconditional
+    assert client.put(f"/books/{book['id']}", json={**edit, "title": "Again"}).status_code == 200
+
+
+def test_update_book_detects_concurrent_edit(db_session):
+    book = crud.create_book(db_session, schemas.BookCreate(
+        title="Race", author="A", isbn=f"race-{uuid.uuid4().hex[:12]}", publication_year=2000, total_copies=1,
+    ))
+    edit = schemas.BookCreate(title="Race 2", author="A", isbn=book.isbn, publication_year=2000, total_copies=1)
+    crud.update_book(db_session, book.id, edit, expected_version=1)
+    with pytest.raises(crud.VersionConflict):
+        crud.update_book(db_session, book.id, edit, expected_version=1)
+
+
+def test_update_book_keeps_a_borrow_committed_meanwhile(db_session):
+    book = crud.create_book(db_session, schemas.BookCreate(
+        title="Busy", author="A", isbn=f"busy-{uuid.uuid4().hex[:12]}", publication_year=2000, total_copies=2,
+    ))
+    user = crud.create_user(db_session, schemas.UserCreate(name="B", email=f"busy-{uuid.uuid4().hex[:8]}@example.com"))
+
+    statements = []
+
+    @event.listens_for(db_session, "do_orm_execute")
+    def borrow_meanwhile(state):
+        statements.append(state.statement)
+        if len(statements) == 2:  # update_book has read the book
+            with state.session.get_bind().connect() as other, Session(bind=other) as db:
+                crud.create_loan(db, book.id, user.id)
+
+    edit = schemas.BookCreate(title="Busy", author="A", isbn=book.isbn, publication_year=2000, total_copies=3)
+    assert crud.update_book(db_session, book.id, edit).available_copies == 2
+
+
+def test_etag_helpers():
+    assert etag_matches('W/"3.1", "4.0"', '"4.0"')
+    assert etag_matches("*", '"1"')
+    assert not etag_matches('"3.1"', '"3.2"') and not etag_matches(None, '"1"')
+    assert if_match_version('"7.12"') == 7 and if_match_version("*") is None
+    with pytest.raises(ValueError):
+        if_match_version("7")
@@ -0,0 +1,76 @@
+import asyncio
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud, schemas
+from app.crud.async_crud import export_chunks
+from app.db.database import SessionLocal
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def loans():
+    """Three loans on a fresh book: two still out, one returned."""
+    db = SessionLocal()
+    try:
+        book = crud.create_book(db, schemas.BookCreate(
+            title="Ledger", author="Clerk", isbn=f"export-{uuid.uuid4().hex[:12]}",
+            publication_year=2024, total_copies=3,
+        ))
+        user = crud.create_user(db, schemas.UserCreate(name="Auditor", email=f"{uuid.uuid4().hex[:12]}@example.com"))
+        made = [crud.create_loan(db, book.id, user.id) for _ in range(3)]
+        crud.return_loan(db, made[0].id)
+        yield [loan.id for loan in made]
+    finally:
+        db.close()
+
+
+def test_export_loans_ndjson_filters_by_status_and_date(client, loans):
+    since = (datetime.utcnow() - timedelta(minutes=5)).isoformat()
+    response = client.get("/loans/export", params={"status": "borrowed", "since": since})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "content-length" not in response.headers
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    ours = [row for row in rows if row["id"] in loans]
+    assert [row["id"] for row in ours] == loans[1:]
+    assert all(row["status"] == "borrowed" and row["return_date"] is None for row in ours)
+
+    future = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    assert client.get("/loans/export", params={"since": future}).text == ""
+
+
+def test_export_books_csv(client, loans):
+    response = client.get("/books/export", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert rows and set(rows[0]) == {
+        "id", "title", "author", "isbn", "publication_year", "total_copies", "available_copies",
+    }
+    assert [int(row["id"]) for row in rows] == sorted(int(row["id"]) for row in rows)
+
+
+def test_export_is_sent_one_batch_per_chunk(loans):
+    async def collect():
+        return [chunk async for chunk in export_chunks("loans", "ndjson", 2)]
+
+    chunks = asyncio.run(collect())
+
+    assert chunks[0] == b""  # no header for ndjson
+    assert all(chunk.count(b"\n") <= 2 for chunk in chunks)
+    assert sum(chunk.count(b"\n") for chunk in chunks) >= 3
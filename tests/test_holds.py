@@ -0,0 +1,197 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app import crud, schemas
+from app.config.settings import settings
+from app.crud.bulk_import import import_lines
+from app.db.database import Base, to_async_url
+from app.jobs import expire_lapsed_holds
+from app.main import app
+from app.models.models import Book, HoldStatusEnum, Loan, LoanStatusEnum, User
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """One title with two copies, both out on loan (ids 1 and 2), and five patrons."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'holds.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([User(id=i, name=f"Reader {i}", email=f"r{i}@example.com") for i in range(1, 6)])
+        db.add(Book(id=1, title="Hot", author="A", isbn="hold-1", publication_year=2024,
+                    total_copies=2, available_copies=0))
+        db.add_all([Loan(user_id=1, book_id=1, due_date=NOW, status=LoanStatusEnum.BORROWED) for _ in range(2)])
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def _queue(db, *users):
+    return [crud.create_hold(db, 1, user).id for user in users]
+
+
+def _available(db):
+    return crud.get_book(db, 1).available_copies
+
+
+def test_queue_positions(engine):
+    with Session(engine) as db:
+        holds = _queue(db, 2, 3, 4)
+        assert [crud.get_hold(db, 1, hold).position for hold in holds] == [1, 2, 3]
+        with pytest.raises(Exception, match="already has an open hold"):
+            crud.create_hold(db, 1, 3)
+
+        crud.cancel_hold(db, 1, holds[0])
+        assert [crud.get_hold(db, 1, hold).position for hold in holds] == [None, 1, 2]
+
+
+def test_copy_returned_while_queueing_goes_to_the_hold(engine):
+    with Session(engine) as db:
+        statements = []
+
+        @event.listens_for(db, "do_orm_execute")
+        def return_meanwhile(state):
+            statements.append(state.statement)
+            if len(statements) == 2:  # create_hold has seen no copy on the shelf
+                with Session(engine) as other:
+                    crud.return_loan(other, 1)
+
+        hold = crud.create_hold(db, 1, 2)
+        assert hold.status == HoldStatusEnum.READY and _available(db) == 0
+
+
+def test_return_hands_the_copy_to_the_head_of_the_queue(engine):
+    with Session(engine) as db:
+        first, second = _queue(db, 2, 3)
+        crud.return_loan(db, 1, hold_hours=24)
+
+        ready = crud.get_hold(db, 1, first)
+        assert ready.status == HoldStatusEnum.READY and ready.position is None
+        assert ready.ready_until > NOW + timedelta(hours=23)
+        assert crud.get_hold(db, 1, second).position == 1
+        assert _available(db) == 0
+
+        # nobody but the patron can take the held copy
+        with pytest.raises(Exception, match="Book not available"):
+            crud.create_loan(db, 1, 4)
+        loan = crud.create_loan(db, 1, 2)
+        assert loan.user_id == 2 and _available(db) == 0
+        assert crud.get_hold(db, 1, first).status == HoldStatusEnum.FULFILLED
+
+
+def test_pickup_window_defaults_to_the_setting(engine, monkeypatch):
+    monkeypatch.setattr(settings, "HOLD_PICKUP_HOURS", 2)
+    with Session(engine) as db:
+        (hold,) = _queue(db, 2)
+        crud.return_loan(db, 1)
+        assert crud.get_hold(db, 1, hold).ready_until < NOW + timedelta(hours=3)
+
+
+def test_batch_return_serves_the_queue_then_the_shelf(engine):
+    with Session(engine) as db:
+        (hold,) = _queue(db, 2)
+        committed, _ = crud.return_loans_batch(db, [1, 2])
+        assert committed
+        assert crud.get_hold(db, 1, hold).status == HoldStatusEnum.READY
+        assert _available(db) == 1
+
+        # the held copy goes to its patron inside a batch borrow too
+        committed, results = crud.create_loans_batch(db, [schemas.LoanCreate(user_id=2, book_id=1)])
+        assert committed and results[0][1] is None and _available(db) == 1
+
+
+def test_added_copies_serve_the_queue_first(engine):
+    with Session(engine) as db:
+        first, second = _queue(db, 2, 3)
+        edit = schemas.BookCreate(title="Hot", author="A", isbn="hold-1", publication_year=2024, total_copies=3)
+        crud.update_book(db, 1, edit)
+        assert crud.get_hold(db, 1, first).status == HoldStatusEnum.READY
+        assert crud.get_hold(db, 1, second).position == 1
+        assert _available(db) == 0
+        with pytest.raises(Exception, match="Book not available"):
+            crud.create_loan(db, 1, 4)  # a walk-in does not jump the queue
+
+        import_lines(db, "books", "jsonl", [
+            '{"title": "Hot", "author": "A", "isbn": "hold-1", "publication_year": 2024, "total_copies": 5}'
+        ], 10)
+        assert crud.get_hold(db, 1, second).status == HoldStatusEnum.READY
+        assert _available(db) == 1
+
+
+def test_lapsed_holds_pass_the_copy_on(engine):
+    with Session(engine) as db:
+        first, second = _queue(db, 2, 3)
+        crud.return_loan(db, 1, hold_hours=1)
+        later = NOW + timedelta(hours=2)
+
+        assert [row.id for row in crud.expire_holds(db, later, batch_size=10)] == [first]
+        assert crud.get_hold(db, 1, first).status == HoldStatusEnum.EXPIRED
+        assert crud.get_hold(db, 1, second).status == HoldStatusEnum.READY
+        assert _available(db) == 0
+
+        # nobody left in the queue: the copy goes back on the shelf
+        crud.expire_holds(db, later + timedelta(days=3), batch_size=10)
+        assert _available(db) == 1
+
+
+def test_expiry_job(engine):
+    with Session(engine) as db:
+        _queue(db, 2)
+        crud.return_loan(db, 1, hold_hours=-1)
+    url = to_async_url(engine.url.render_as_string(hide_password=False))
+    factory = async_sessionmaker(create_async_engine(url, poolclass=NullPool), class_=AsyncSession,
+                                 expire_on_commit=False)
+    assert asyncio.run(expire_lapsed_holds(factory)) == 1
+    with Session(engine) as db:
+        assert _available(db) == 1
+
+
+def test_promotion_uses_the_queue_index(engine):
+    with Session(engine) as db:
+        _queue(db, 2, 3)
+    statements = []
+    with engine.connect() as conn:
+        conn.connection.set_trace_callback(statements.append)
+        with Session(bind=conn) as db:
+            crud.return_loan(db, 1)
+            crud.get_hold(db, 1, 2)
+        promote = next(sql for sql in statements if sql.startswith("UPDATE holds"))
+        position = statements[-1]
+        plans = [
+            " ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql))
+            for sql in (promote, position)
+        ]
+    assert all("ix_holds_waiting_book_id_id" in plan for plan in plans)
+
+
+def test_holds_api():
+    client = TestClient(app)
+    user = client.post("/users/", json={"name": "Queuer", "email": f"queue-{uuid.uuid4().hex[:8]}@example.com"}).json()
+    book = client.post("/books/", json={
+        "title": "Waitlisted", "author": "Author H", "isbn": f"hold-{uuid.uuid4().hex[:12]}",
+        "publication_year": 2025, "total_copies": 1,
+    }).json()
+    url = f"/books/{book['id']}/holds"
+    assert client.post(url, json={"user_id": user["id"]}).status_code == 400  # still on the shelf
+
+    loan = client.post("/loans/borrow", params={"book_id": book["id"]}, json={"user_id": user["id"]}).json()
+    hold = client.post(url, json={"user_id": user["id"]})
+    assert hold.status_code == 200 and hold.json()["status"] == "waiting" and hold.json()["position"] == 1
+
+    client.post("/loans/return", json={"loan_id": loan["id"]})
+    ready = client.get(f"{url}/{hold.json()['id']}").json()
+    assert ready["status"] == "ready" and ready["ready_until"] is not None
+
+    cancelled = client.delete(f"{url}/{hold.json()['id']}")
+    assert cancelled.status_code == 200 and cancelled.json()["status"] == "cancelled"
+    assert client.get(f"/books/{book['id']}", headers={"Cache-Control": "no-store"}).json()["available_copies"] == 1
+    assert client.get(f"{url}/999999").status_code == 404
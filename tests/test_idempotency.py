@@ -0,0 +1,140 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from starlette.responses import JSONResponse
+
+from app import crud
+from app.db.database import Base, to_async_url
+from app.idempotency import IdempotencyMiddleware
+from app.jobs import purge_expired_idempotency_keys
+from app.main import app
+from app.models.models import IdempotencyKey
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    url = f"sqlite:///{tmp_path / 'idempotency.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    yield async_sessionmaker(create_async_engine(to_async_url(url), poolclass=NullPool), class_=AsyncSession,
+                             expire_on_commit=False)
+    engine.dispose()
+
+
+def _key():
+    return {"Idempotency-Key": uuid.uuid4().hex}
+
+
+def test_borrow_retry_is_replayed(client):
+    user = client.post("/users/", json={"name": "Kiosk", "email": f"kiosk-{uuid.uuid4().hex[:8]}@example.com"}).json()
+    book = client.post("/books/", json={
+        "title": "Retried Book", "author": "Author K", "isbn": f"idem-{uuid.uuid4().hex[:12]}",
+        "publication_year": 2025, "total_copies": 3,
+    }).json()
+    headers = _key()
+    borrow = lambda: client.post("/loans/borrow", params={"book_id": book["id"]},
+                                 json={"user_id": user["id"]}, headers=headers)
+
+    first, retry = borrow(), borrow()
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json() and retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert client.get(f"/books/{book['id']}", headers={"Cache-Control": "no-store"}).json()["available_copies"] == 2
+
+    # same key, different request
+    other = client.post("/loans/borrow", params={"book_id": book["id"]}, json={"user_id": 0}, headers=headers)
+    assert other.status_code == 422
+
+
+def test_create_retry_does_not_hit_the_unique_constraint(client):
+    headers, body = _key(), {"name": "Once", "email": f"once-{uuid.uuid4().hex[:8]}@example.com"}
+    first = client.post("/users/", json=body, headers=headers)
+    assert client.post("/users/", json=body, headers=headers).json() == first.json()
+    assert client.post("/users/", json=body).status_code == 400
+    assert client.post("/users/", json=body, headers={"Idempotency-Key": ""}).status_code == 400
+
+
+def _counting_app(calls, gate=None, fail_first=False):
+    async def endpoint(scope, receive, send):
+        calls.append(scope["path"])
+        if gate is not None:
+            await gate.wait()
+        status = 500 if fail_first and len(calls) == 1 else 201
+        await JSONResponse({"call": len(calls)}, status_code=status)(scope, receive, send)
+    return endpoint
+
+
+def test_duplicate_waits_for_the_original(sessions):
+    calls, gate = [], asyncio.Event()
+
+    async def main():
+        transport = httpx.ASGITransport(IdempotencyMiddleware(_counting_app(calls, gate), session_factory=sessions))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            headers = _key()
+            first = asyncio.ensure_future(http.post("/loans/borrow", json={}, headers=headers))
+            while not calls:
+                await asyncio.sleep(0.01)
+            second = asyncio.ensure_future(http.post("/loans/borrow", json={}, headers=headers))
+            await asyncio.sleep(0.05)
+            gate.set()
+            return await first, await second
+
+    first, second = asyncio.run(main())
+    assert calls == ["/loans/borrow"]
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json() == {"call": 1}
+
+
+def test_server_errors_are_not_stored(sessions):
+    calls = []
+
+    async def main():
+        transport = httpx.ASGITransport(IdempotencyMiddleware(_counting_app(calls, fail_first=True),
+                                                              session_factory=sessions))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            headers = _key()
+            return [await http.post("/books/", json={}, headers=headers) for _ in range(3)]
+
+    responses = asyncio.run(main())
+    assert [r.status_code for r in responses] == [500, 201, 201]
+    assert len(calls) == 2
+
+
+def test_expired_keys_are_taken_over_and_purged(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        assert crud.claim_idempotency_key(db, b"k" * 16, b"f" * 16, NOW, NOW + timedelta(seconds=60)) is None
+        held = crud.claim_idempotency_key(db, b"k" * 16, b"f" * 16, NOW, NOW + timedelta(seconds=60))
+        assert held.status_code is None
+        # once the lease is over, a retry may run the request again
+        later = NOW + timedelta(seconds=61)
+        assert crud.claim_idempotency_key(db, b"k" * 16, b"f" * 16, later, later + timedelta(seconds=60)) is None
+
+        for i in range(5):
+            db.add(IdempotencyKey(key=bytes([i]) * 16, fingerprint=b"f" * 16, status_code=200, body=b"{}",
+                                  expires_at=NOW - timedelta(seconds=i)))
+        db.commit()
+
+    url = to_async_url(engine.url.render_as_string(hide_password=False))
+    factory = async_sessionmaker(create_async_engine(url, poolclass=NullPool), class_=AsyncSession)
+    assert asyncio.run(purge_expired_idempotency_keys(factory, batch_size=2)) == 5
+    with Session(engine) as db:
+        assert list(db.scalars(select(IdempotencyKey.key))) == [b"k" * 16]
+    engine.dispose()
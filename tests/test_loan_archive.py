@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app import crud
+from app.crud.export import export_statement
+from app.db.database import Base, to_async_url
+from app.jobs import archive_returned_loans
+from app.models.models import ArchivedLoan, Book, Loan, LoanStatusEnum, User
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([
+            User(id=1, name="Reader A", email="a@example.com"),
+            Book(id=1, title="T1", author="A", isbn="arch-1", publication_year=2020,
+                 total_copies=50, available_copies=45),
+        ])
+        # ids 1-6 returned two years ago, 7-9 ten days ago, 10-14 still out
+        for i in range(14):
+            borrowed = NOW - timedelta(days=800 if i < 6 else 20)
+            returned = borrowed + timedelta(days=10) if i < 9 else None
+            db.add(Loan(user_id=1, book_id=1, borrow_date=borrowed, return_date=returned,
+                        status=LoanStatusEnum.RETURNED if returned else LoanStatusEnum.BORROWED))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def _ids(rows):
+    return [row.id for row in rows]
+
+
+def test_archive_moves_only_old_returned_loans_in_batches(engine):
+    cutoff = NOW - timedelta(days=365)
+    with Session(engine) as db:
+        assert crud.archive_loans(db, cutoff, batch_size=4) == 4
+        assert crud.archive_loans(db, cutoff, batch_size=4) == 2
+        assert crud.archive_loans(db, cutoff, batch_size=4) == 0
+
+        assert sorted(db.scalars(select(ArchivedLoan.id))) == [1, 2, 3, 4, 5, 6]
+        assert sorted(db.scalars(select(Loan.id))) == list(range(7, 15))
+        archived = db.get(ArchivedLoan, (1, NOW - timedelta(days=800)))
+        assert archived.status == LoanStatusEnum.RETURNED and archived.user_id == 1
+
+
+def test_archived_ids_are_never_handed_out_again(engine):
+    with Session(engine) as db:
+        for loan_id in range(10, 15):
+            crud.return_loan(db, loan_id)
+        crud.archive_loans(db, NOW + timedelta(days=1), batch_size=100)
+        assert db.scalar(select(func.count()).select_from(Loan)) == 0
+        assert crud.create_loan(db, 1, 1).id == 15
+
+
+def test_history_pages_span_both_tables(engine):
+    with Session(engine) as db:
+        before = _ids(crud.get_user_loans(db, 1, limit=100)[0])
+        crud.archive_loans(db, NOW - timedelta(days=365), batch_size=100)
+
+        pages, cursor = [], None
+        while True:
+            rows, cursor = crud.get_user_loans(db, 1, limit=4, after=cursor)
+            pages.append(_ids(rows))
+            if cursor is None:
+                break
+        assert [loan_id for page in pages for loan_id in page] == before == list(range(1, 15))
+        assert pages[0] == [1, 2, 3, 4]
+
+        returned, _ = crud.get_book_loans(db, 1, LoanStatusEnum.RETURNED, limit=100)
+        assert _ids(returned) == list(range(1, 10))
+        active, _ = crud.get_loans(db, 100, None, LoanStatusEnum.BORROWED)
+        assert _ids(active) == list(range(10, 15))
+
+
+def test_active_reads_skip_the_archive():
+    active = str(export_statement("loans", status=LoanStatusEnum.BORROWED))
+    assert "loans_archive" not in active
+    assert "loans_archive" in str(export_statement("loans"))
+
+
+def test_export_includes_archived_loans(engine):
+    with Session(engine) as db:
+        crud.archive_loans(db, NOW - timedelta(days=365), batch_size=100)
+        rows = db.execute(export_statement("loans", until=NOW - timedelta(days=365))).all()
+    assert [row.id for row in rows] == [1, 2, 3, 4, 5, 6]
+
+
+def test_archival_job(engine):
+    url = to_async_url(engine.url.render_as_string(hide_password=False))
+    async_engine = create_async_engine(url, poolclass=NullPool)
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    moved = asyncio.run(archive_returned_loans(factory, retention_days=365, batch_size=4))
+    assert moved == 6
+    # a short window takes the recent returns too, never the active loans
+    assert asyncio.run(archive_returned_loans(factory, retention_days=1, batch_size=4, max_batches=1)) == 3
+    with Session(engine) as db:
+        assert db.scalar(select(func.count()).select_from(Loan)) == 5
+
+
+@pytest.mark.parametrize("call,index", [
+    (lambda db: crud.get_user_loans(db, 1), "ix_loans_archive_user_id_id"),
+    (lambda db: crud.get_book_loans(db, 1, LoanStatusEnum.RETURNED), "ix_loans_archive_book_id_id"),
+])
+def test_archive_lookups_use_index(engine, call, index):
+    statements = []
+    with engine.connect() as conn:
+        conn.connection.set_trace_callback(statements.append)
+        with Session(bind=conn) as db:
+            call(db)
+        plan = " ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statements[-1]))
+    assert index in plan
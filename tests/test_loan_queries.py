@@ -0,0 +1,102 @@
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.db.database import Base
+from app.models.models import Book, Loan, LoanStatusEnum, User
+
+
+def _seed(db):
+    db.add_all([
+        User(id=1, name="Reader A", email="a@example.com"),
+        User(id=2, name="Reader B", email="b@example.com"),
+        Book(id=1, title="T1", author="A", isbn="q-1", publication_year=2020, total_copies=50, available_copies=50),
+        Book(id=2, title="T2", author="A", isbn="q-2", publication_year=2020, total_copies=50, available_copies=50),
+    ])
+    db.add_all([
+        Loan(user_id=1 + i % 2, book_id=1 + i % 2, borrow_date=datetime.utcnow(),
+             status=LoanStatusEnum.BORROWED if i % 3 else LoanStatusEnum.RETURNED)
+        for i in range(60)
+    ])
+    db.commit()
+
+
+def _captured(engine, call):
+    """Run a crud call and return the (sql, params) of the SELECT it issued."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with Session(engine) as db:
+            call(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return statements[-1]
+
+
+LOOKUPS = [
+    (lambda db: crud.get_user_loans(db, 1), "ix_loans_user_id_status_id"),
+    (lambda db: crud.get_user_loans(db, 1, LoanStatusEnum.BORROWED), "ix_loans_user_id_status_id"),
+    (lambda db: crud.get_book_loans(db, 2, LoanStatusEnum.RETURNED, 5), "ix_loans_book_id_status_id"),
+    (lambda db: crud.get_loans(db, 10, None, LoanStatusEnum.BORROWED), "ix_loans_active_id"),
+]
+
+
+@pytest.fixture(scope="module")
+def sqlite_engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        _seed(db)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("call,index", LOOKUPS)
+def test_sqlite_loan_lookups_use_index(sqlite_engine, call, index):
+    statement, parameters = _captured(sqlite_engine, call)
+    with sqlite_engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+    assert index in plan
+
+
+def test_loan_lookups_filter_and_paginate(sqlite_engine):
+    with Session(sqlite_engine) as db:
+        first, cursor = crud.get_user_loans(db, 1, LoanStatusEnum.BORROWED, limit=5)
+        rest, end = crud.get_user_loans(db, 1, LoanStatusEnum.BORROWED, limit=100, after=cursor)
+
+    loans = first + rest
+    assert len(first) == 5 and end is None
+    assert [loan.id for loan in loans] == sorted(loan.id for loan in loans)
+    assert all(loan.user_id == 1 and loan.status == LoanStatusEnum.BORROWED for loan in loans)
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+@pytest.mark.parametrize("call,index", LOOKUPS)
+def test_postgres_loan_lookups_use_index(call, index):
+    # The seeded tables are tiny, so disable sequential scans: the question
+    # is whether the planner *can* answer the query from the index.
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    try:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            _seed(db)
+            db.execute(text("ANALYZE loans"))
+            db.commit()
+        statement, parameters = _captured(engine, call)
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            plan = " ".join(row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters))
+        assert index in plan
+    finally:
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
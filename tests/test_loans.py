@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+
+from app import crud, schemas
+from app.db.database import SessionLocal
+from app.models.models import Book
+
+
+@pytest.fixture
+def db_session():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _book(db, copies):
+    return crud.create_book(db, schemas.BookCreate(
+        title="Kiosk Book",
+        author="Author K",
+        isbn=f"kiosk-{uuid.uuid4().hex[:12]}",
+        publication_year=2025,
+        total_copies=copies
+    )).id
+
+
+def _items(*book_ids):
+    return [schemas.LoanCreate(user_id=1, book_id=book_id) for book_id in book_ids]
+
+
+def test_atomic_batch_borrow_rolls_back_everything(db_session):
+    plenty, scarce = _book(db_session, 3), _book(db_session, 1)
+
+    committed, results = crud.create_loans_batch(db_session, _items(plenty, scarce, scarce))
+
+    assert committed is False
+    assert [error for _, error in results] == ["Batch rolled back", "Book not available", "Book not available"]
+    assert db_session.get(Book, plenty).available_copies == 3
+    assert db_session.get(Book, scarce).available_copies == 1
+
+
+def test_partial_batch_borrow_commits_what_it_can(db_session):
+    plenty, scarce = _book(db_session, 3), _book(db_session, 1)
+
+    committed, results = crud.create_loans_batch(db_session, _items(plenty, scarce, scarce), atomic=False)
+
+    assert committed is True
+    assert [loan is not None for loan, _ in results] == [True, True, False]
+    assert results[1][0].book_id == scarce
+    assert db_session.get(Book, plenty).available_copies == 2
+    assert db_session.get(Book, scarce).available_copies == 0
+
+
+def test_batch_return_restores_copies_per_title(db_session):
+    book_id = _book(db_session, 2)
+    _, results = crud.create_loans_batch(db_session, _items(book_id, book_id))
+    loan_ids = [loan.id for loan, _ in results]
+
+    committed, results = crud.return_loans_batch(db_session, loan_ids + [loan_ids[0]], atomic=False)
+
+    assert committed is True
+    assert [error for _, error in results] == [None, None, "Duplicate loan_id in batch"]
+    assert db_session.get(Book, book_id).available_copies == 2
@@ -0,0 +1,50 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import Histogram, Registry, registry, requests_in_flight
+
+
+def _sample(text, name, **labels):
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(wanted)}\}} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_histogram_exposition_is_cumulative():
+    local = Registry()
+    latency = local.register(Histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(("/x",), value)
+
+    text = local.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert _sample(text, "t_seconds_bucket", route="/x", le="0.1") == 2  # le is inclusive
+    assert _sample(text, "t_seconds_bucket", route="/x", le="1") == 3
+    assert _sample(text, "t_seconds_bucket", route="/x", le="+Inf") == 4
+    assert _sample(text, "t_seconds_count", route="/x") == 4
+    assert _sample(text, "t_seconds_sum", route="/x") == pytest.approx(3.65)
+
+
+def test_requests_are_labelled_by_route_template():
+    registry.reset()
+    with TestClient(app) as client:
+        client.get("/books/987654321")
+        client.get("/books/987654321")
+        client.get("/no/such/path")
+        client.post("/loans/return", content=b'{"loan_id":987654321}', headers={"Content-Type": "application/json"})
+        text = client.get("/metrics").text
+
+    assert _sample(text, "http_request_duration_seconds_count",
+                   method="GET", route="/books/{book_id}", status="404") == 2
+    assert _sample(text, "http_request_duration_seconds_count",
+                   method="GET", route="<unmatched>", status="404") == 1
+    assert _sample(text, "http_request_size_bytes_sum", method="POST", route="/loans/return") == \
+        len(b'{"loan_id":987654321}')
+    assert _sample(text, "http_response_size_bytes_sum",
+                   method="GET", route="/books/{book_id}", status="404") == 2 * len(b'{"detail":"Book not found"}')
+    assert _sample(text, "http_requests_in_flight", method="GET") == 1  # the /metrics request itself
+    assert requests_in_flight._values[("GET",)] == 0
+    assert "# TYPE db_pool_in_use gauge" in text and "# TYPE cache_hits_total counter" in text
@@ -0,0 +1,134 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app import crud, schemas
+from app.db.database import Base, to_async_url
+from app.jobs import Scheduler, process_overdue_loans
+from app.main import app
+from app.models.models import Book, Loan, LoanStatusEnum, User
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'overdue.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([
+            User(id=1, name="Reader A", email="a@example.com"),
+            Book(id=1, title="T1", author="A", isbn="due-1", publication_year=2020,
+                 total_copies=50, available_copies=40),
+        ])
+        # ids 1-6 overdue by 6..1 days, 7 overdue but returned, 8-10 not due yet
+        for i in range(10):
+            due = NOW - timedelta(days=6 - i) if i < 7 else NOW + timedelta(days=i)
+            db.add(Loan(user_id=1, book_id=1, borrow_date=due - timedelta(days=14), due_date=due,
+                        status=LoanStatusEnum.RETURNED if i == 6 else LoanStatusEnum.BORROWED))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def _ids(rows):
+    return [row.id for row in rows]
+
+
+def test_borrow_sets_due_date(engine):
+    with Session(engine) as db:
+        loan = crud.create_loan(db, 1, 1, loan_days=21)
+        assert loan.due_date - loan.borrow_date == timedelta(days=21)
+        _, results = crud.create_loans_batch(db, [schemas.LoanCreate(user_id=1, book_id=1)], loan_days=7)
+        assert results[0][0].due_date - results[0][0].borrow_date == timedelta(days=7)
+
+
+def test_overdue_list_pages_by_due_date(engine):
+    with Session(engine) as db:
+        first, cursor = crud.get_overdue_loans(db, NOW, limit=4)
+        rest, end = crud.get_overdue_loans(db, NOW, limit=4, after=cursor)
+    assert _ids(first) == [1, 2, 3, 4] and _ids(rest) == [5, 6] and end is None
+
+
+def test_mark_overdue_stamps_each_loan_once(engine):
+    with Session(engine) as db:
+        assert _ids(crud.mark_overdue_loans(db, NOW, batch_size=4)) == [1, 2, 3, 4]
+        assert _ids(crud.mark_overdue_loans(db, NOW, batch_size=4)) == [5, 6]
+        assert crud.mark_overdue_loans(db, NOW, batch_size=4) == []
+        # still listed as overdue until returned
+        assert len(crud.get_overdue_loans(db, NOW)[0]) == 6
+
+
+def test_overdue_scan_uses_unnotified_index(engine):
+    statements = []
+    with engine.connect() as conn:
+        with Session(bind=conn) as db:
+            crud.mark_overdue_loans(db, NOW, batch_size=4)  # already stamped: out of the scan's index
+        conn.exec_driver_sql("ANALYZE")
+        conn.connection.set_trace_callback(statements.append)
+        with Session(bind=conn) as db:
+            crud.mark_overdue_loans(db, NOW, batch_size=4)
+        update_sql = next(sql for sql in statements if sql.startswith("UPDATE loans"))
+        plan = " ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + update_sql))
+    assert "ix_loans_unnotified_due_date" in plan
+
+
+def test_process_overdue_loans_is_bounded(engine):
+    url = to_async_url(engine.url.render_as_string(hide_password=False))
+    factory = async_sessionmaker(create_async_engine(url, poolclass=NullPool), class_=AsyncSession,
+                                 expire_on_commit=False)
+    notices = []
+
+    async def collect(loans):
+        notices.append(_ids(loans))
+
+    assert asyncio.run(process_overdue_loans(factory, batch_size=2, max_batches=2, notify=collect)) == 4
+    assert asyncio.run(process_overdue_loans(factory, batch_size=2, max_batches=2, notify=collect)) == 2
+    assert notices == [[1, 2], [3, 4], [5, 6]]
+
+
+def test_scheduler_runs_jobs_and_survives_failures():
+    calls = []
+
+    async def ok():
+        calls.append("ok")
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def main():
+        scheduler = Scheduler()
+        scheduler.every(0.01, ok)
+        scheduler.every(0.01, broken, "broken")
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return scheduler.snapshot()
+
+    stats = asyncio.run(main())
+    assert stats["ok"]["runs"] >= 2 and stats["ok"]["failures"] == 0
+    assert stats["broken"]["runs"] >= 2 and stats["broken"]["failures"] == stats["broken"]["runs"]
+    assert len(calls) == stats["ok"]["runs"]
+
+
+def test_overdue_endpoint(db_session):
+    client = TestClient(app)
+    user = client.post("/users/", json={"name": "Late Reader", "email": f"late-{uuid.uuid4().hex[:8]}@example.com"})
+    book = client.post("/books/", json={
+        "title": "Overdue Book", "author": "Author O", "isbn": f"due-{uuid.uuid4().hex[:12]}",
+        "publication_year": 2025, "total_copies": 1,
+    })
+    loan = client.post("/loans/borrow", params={"book_id": book.json()["id"]}, json={"user_id": user.json()["id"]})
+    assert loan.status_code == 200 and loan.json()["due_date"] is not None
+
+    db_session.execute(update(Loan).where(Loan.id == loan.json()["id"]).values(due_date=NOW - timedelta(days=1)))
+    db_session.commit()
+    overdue = client.get("/loans/overdue", params={"limit": 500}).json()["items"]
+    assert loan.json()["id"] in [item["id"] for item in overdue]
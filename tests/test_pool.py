@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config.settings import settings
+from app.db.pool import (
+    MeasuredAsyncAdaptedQueuePool,
+    MeasuredQueuePool,
+    engine_options,
+    pool_snapshot,
+    warm_up,
+)
+from app.main import app
+
+
+def test_engine_options_for_postgres(monkeypatch):
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 2500)
+
+    sync = engine_options("postgresql+psycopg2://u:p@db/libro")
+    assert sync["poolclass"] is MeasuredQueuePool
+    assert sync["pool_size"] == settings.DB_POOL_SIZE and sync["pool_recycle"] == settings.DB_POOL_RECYCLE
+    assert sync["connect_args"] == {"options": "-c statement_timeout=2500"}
+
+    asyncpg = engine_options("postgresql+asyncpg://u:p@db/libro")
+    assert asyncpg["poolclass"] is MeasuredAsyncAdaptedQueuePool
+    assert asyncpg["connect_args"] == {"server_settings": {"statement_timeout": "2500"}}
+
+
+def test_engine_options_leave_non_queue_pools_alone():
+    options = engine_options("sqlite+aiosqlite:///./other.db")
+    assert "poolclass" not in options and "pool_size" not in options and "connect_args" not in options
+
+
+def test_pool_counts_waits_overflow_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=MeasuredQueuePool,
+        pool_size=1, max_overflow=1, pool_timeout=0.05,
+    )
+    first, second = engine.connect(), engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    snapshot = pool_snapshot(engine)
+    assert snapshot["in_use"] == 2 and snapshot["overflow"] == 1
+    assert snapshot["checkouts"] == 3 and snapshot["overflow_events"] == 1 and snapshot["timeouts"] == 1
+    assert snapshot["checkout_wait_max_ms"] >= 50
+
+    first.close()
+    second.close()
+    engine.dispose()
+
+
+def test_warm_up_fills_the_pool(tmp_path):
+    async def scenario():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'warm.db'}", poolclass=MeasuredAsyncAdaptedQueuePool, pool_size=3,
+        )
+        try:
+            opened = await warm_up(engine, 10)
+            return opened, pool_snapshot(engine)
+        finally:
+            await engine.dispose()
+
+    opened, snapshot = asyncio.run(scenario())
+    assert opened == 3 and snapshot["idle"] == 3 and snapshot["in_use"] == 0
+
+
+def test_pool_stats_endpoint():
+    with TestClient(app) as client:
+        body = client.get("/db/pool/stats").json()
+    assert body["sync"]["pool"] == "MeasuredQueuePool" and "checkout_wait_avg_ms" in body["sync"]
+    assert "pool" in body["async"]
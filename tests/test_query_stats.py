@@ -0,0 +1,67 @@
+import logging
+import re
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.db.database import Base
+from app.main import app
+from app.metrics import QueryBudgetExceeded, instrument_engine, query_budget, track_queries
+from app.models.models import Book, Loan, LoanStatusEnum, User
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('queries') / 'queries.db'}")
+    Base.metadata.create_all(bind=engine)
+    instrument_engine(engine)
+    with Session(engine) as db:
+        db.add_all([User(id=n, name=f"R{n}", email=f"r{n}@example.com") for n in range(1, 6)])
+        db.add(Book(id=1, title="T", author="A", isbn="qs-1", publication_year=2020, total_copies=9, available_copies=4))
+        db.add_all([Loan(user_id=n, book_id=1, status=LoanStatusEnum.BORROWED) for n in range(1, 6)])
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def test_lazy_loads_are_counted_and_blow_the_budget(engine):
+    with Session(engine) as db, pytest.raises(QueryBudgetExceeded, match="6 queries, budget is 2"):
+        with query_budget(2):
+            for loan in db.scalars(select(Loan)).all():
+                loan.user.name  # one lazy load per loan
+
+    with Session(engine) as db, track_queries() as stats:
+        db.scalars(select(Loan)).all()
+    assert stats.count == 1
+    assert stats.seconds > 0
+
+
+def test_slow_queries_are_logged_with_params_and_plan(engine, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(settings, "SLOW_QUERY_EXPLAIN", True)
+    with caplog.at_level(logging.WARNING, logger="app.metrics.queries"), Session(engine) as db:
+        with track_queries() as stats:
+            db.scalars(select(Loan).where(Loan.user_id == 3)).all()
+
+    assert stats.count == 1  # the EXPLAIN itself is not counted
+    [record] = [r for r in caplog.records if r.getMessage().startswith("Slow query")]
+    message = record.getMessage()
+    assert "FROM loans" in message and "params=(3," in message
+    assert "ix_loans_user_id_status_id" in message
+
+
+def test_responses_carry_server_timing():
+    with TestClient(app) as client:
+        response = client.get(f"/books/{uuid.uuid4().int % 10**9 + 10**9}")
+    match = re.fullmatch(r'db;dur=(\d+\.\d);desc="(\d+) queries"', response.headers["server-timing"])
+    assert match and int(match.group(2)) >= 1
+
+
+@pytest.mark.query_budget(0)
+def test_strict_mode_fails_requests_over_budget():
+    with TestClient(app) as client, pytest.raises(QueryBudgetExceeded, match="GET /books/"):
+        client.get(f"/books/{uuid.uuid4().int % 10**9 + 10**9}")
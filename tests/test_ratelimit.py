@@ -0,0 +1,90 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings
+from app.ratelimit import MemoryStore, RateLimiter, RateLimitMiddleware, SQLiteStore, rejections
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = MemoryStore() if request.param == "memory" else SQLiteStore(str(tmp_path / "rl.db"))
+    yield store
+    store.close()
+
+
+def test_burst_then_steady_rate(store):
+    clock = Clock()
+    limiter = RateLimiter(store, 60, burst=3, clock=clock)  # one per second, three at once
+
+    assert [limiter.check("a", "GET", "/books/").allowed for _ in range(4)] == [True, True, True, False]
+    denied = limiter.check("a", "GET", "/books/")
+    assert denied.retry_after == pytest.approx(1.0)
+    assert limiter.check("b", "GET", "/books/").allowed  # other clients are unaffected
+
+    clock.now += 1.0
+    decision = limiter.check("a", "GET", "/books/")
+    assert decision.allowed and decision.remaining == 0
+    clock.now += 10
+    assert limiter.check("a", "GET", "/books/").remaining == 2  # the bucket refills only up to the burst
+
+
+def test_route_and_client_limits(store):
+    clock = Clock()
+    limiter = RateLimiter(store, 100, routes={"POST /loans/borrow": 1, "GET /books/{book_id}/loans": 2},
+                          clients={"vip": 500}, clock=clock)
+
+    assert limiter.check("a", "POST", "/loans/borrow").allowed
+    assert not limiter.check("a", "POST", "/loans/borrow").allowed
+    assert limiter.check("a", "GET", "/loans/").allowed  # the default bucket is separate
+    assert [limiter.check("a", "GET", "/books/7/loans").allowed for _ in range(3)] == [True, True, False]
+    assert limiter.check("vip", "GET", "/books/").limit == 500
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    clock = Clock()
+    workers = [RateLimiter(SQLiteStore(str(tmp_path / "shared.db")), 60, burst=2, clock=clock) for _ in range(2)]
+    assert workers[0].check("a", "GET", "/").allowed
+    assert workers[1].check("a", "GET", "/").allowed
+    assert not workers[0].check("a", "GET", "/").allowed
+    for limiter in workers:
+        limiter.store.close()
+
+
+def test_check_costs_microseconds():
+    limiter = RateLimiter(MemoryStore(), 10**9)
+    start = time.perf_counter()
+    for n in range(20000):
+        limiter.check(f"client-{n % 500}", "GET", "/books/")
+    assert (time.perf_counter() - start) / 20000 < 50e-6
+
+
+def test_middleware_answers_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    api = FastAPI()
+
+    @api.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    api.add_middleware(RateLimitMiddleware, limiter=RateLimiter(MemoryStore(), 30, burst=2))
+    client = TestClient(api)
+    before = rejections["default"]
+
+    assert [client.get("/ping").status_code for _ in range(2)] == [200, 200]
+    response = client.get("/ping")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    assert response.headers["ratelimit-limit"] == "30"
+    assert rejections["default"] == before + 1
+    assert client.get("/metrics").status_code == 404  # exempt paths skip the limiter
@@ -0,0 +1,91 @@
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config.settings import settings
+from app.db import database
+from app.db.routing import STICKY_COOKIE, STICKY_HEADER
+from app.main import app
+from app.models.models import Book
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A second SQLite file standing in for a replica that has not caught up."""
+    url = f"sqlite:///{tmp_path}/replica.db"
+    sync_engine = create_engine(url)
+    database.Base.metadata.create_all(sync_engine)
+    read_engine = create_async_engine(database.to_async_url(url), poolclass=NullPool)
+    monkeypatch.setattr(settings, "READ_DATABASE_URL", url)
+    monkeypatch.setattr(
+        database, "ReadAsyncSessionLocal",
+        async_sessionmaker(read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False),
+    )
+    yield sync_engine
+    sync_engine.dispose()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def _new_book(client):
+    return client.post("/books/", json={
+        "title": "Replicated Book",
+        "author": "Author R",
+        "isbn": f"replica-{uuid.uuid4().hex[:12]}",
+        "publication_year": 2025,
+        "total_copies": 1,
+    })
+
+
+def test_reads_go_to_the_replica(replica, client):
+    with replica.begin() as conn:
+        conn.execute(insert(Book).values(
+            id=900001, title="Only on the replica", author="R", isbn="replica-only",
+            publication_year=2025, total_copies=1, available_copies=1,
+        ))
+
+    response = client.get("/books/900001", headers={"Cache-Control": "no-store"})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Only on the replica"
+
+
+def test_writer_reads_its_own_write_from_the_primary(replica, client):
+    created = _new_book(client)
+    assert created.status_code == 200
+    assert STICKY_COOKIE in created.cookies
+    book_id = created.json()["id"]
+
+    # the writer is sticky to the primary; anyone else reads the stale replica
+    assert client.get(f"/books/{book_id}").status_code == 200
+    with TestClient(app) as other:
+        assert other.get(f"/books/{book_id}").status_code == 404
+        # clients without a cookie jar can echo the header instead
+        sticky = {STICKY_HEADER: created.headers[STICKY_HEADER]}
+        assert other.get(f"/books/{book_id}", headers=sticky).status_code == 200
+
+
+def test_stickiness_expires(replica, client):
+    book_id = _new_book(client).json()["id"]
+    client.cookies.set(STICKY_COOKIE, "%.3f" % (time.time() - 1))
+    assert client.get(f"/books/{book_id}").status_code == 404
+
+
+def test_failed_write_does_not_stick(replica, client):
+    response = client.put("/books/999999", json={"title": "Nope"})
+    assert response.status_code >= 400
+    assert STICKY_COOKIE not in response.cookies
+
+
+def test_no_replica_means_no_cookie(client):
+    response = _new_book(client)
+    assert response.status_code == 200
+    assert STICKY_COOKIE not in response.cookies
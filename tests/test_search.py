@@ -0,0 +1,117 @@
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app import crud, schemas
+from app.crud.search import _postgres_candidates, search_books, search_terms
+from app.db.database import SessionLocal
+from app.models.models import Book, book_search_document
+from app.utils.pagination import InvalidCursor, encode_cursor
+
+
+@pytest.fixture
+def db_session():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def word():
+    # a token no other test's books contain
+    return f"zq{uuid.uuid4().hex[:10]}"
+
+
+def _book(db, title, author, isbn=None):
+    return crud.create_book(db, schemas.BookCreate(
+        title=title, author=author, isbn=isbn or f"search-{uuid.uuid4().hex[:12]}",
+        publication_year=2020, total_copies=1,
+    ))
+
+
+def test_search_ranks_title_matches_first(db_session, word):
+    by_author = _book(db_session, "Collected Essays", f"{word} Smith")
+    by_title = _book(db_session, f"The {word} Chronicles", "Jane Doe")
+
+    books, cursor = search_books(db_session, word.upper())
+
+    assert [book.id for book in books] == [by_title.id, by_author.id]
+    assert cursor is None
+
+
+def test_search_requires_every_word_and_treats_the_last_as_a_prefix(db_session, word):
+    match = _book(db_session, f"{word} Nights", "Amira Haddad")
+    _book(db_session, f"{word} Days", "Someone Else")
+    _book(db_session, f"{word}ian Haddad", "Someone Else")
+
+    books, _ = search_books(db_session, f"{word} hadd")
+
+    assert [book.id for book in books] == [match.id]
+
+
+def test_search_keeps_the_best_window_of_matches(db_session, word):
+    for n in range(5):
+        _book(db_session, f"Volume {n}", f"{word} Author")
+    best = _book(db_session, f"{word} Omnibus", "Someone Else")  # matched last, ranked first
+
+    books, cursor = search_books(db_session, word, limit=2, window=3)
+    rest, end = search_books(db_session, word, limit=2, after=cursor, window=3)
+
+    assert books[0].id == best.id
+    assert len(books) + len(rest) == 3 and end is None
+
+
+def test_search_exact_isbn(db_session, word):
+    book = _book(db_session, "Plain Title", "Plain Author", isbn=f"978-{word}")
+
+    assert [b.id for b in search_books(db_session, f" 978-{word} ")[0]] == [book.id]
+
+
+def test_search_pages_do_not_overlap(db_session, word):
+    ids = {_book(db_session, f"{word} volume {n}", "Series Author").id for n in range(7)}
+
+    seen, cursor = [], None
+    while True:
+        books, cursor = search_books(db_session, word, limit=3, after=cursor)
+        seen += [book.id for book in books]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) and set(seen) == ids
+
+
+def test_search_follows_title_updates_and_deletes(db_session, word):
+    draft = f"zq{uuid.uuid4().hex[:10]}"
+    book = _book(db_session, f"Working {draft}", "Author A")
+    crud.update_book(db_session, book.id, schemas.BookCreate(
+        title=f"Final {word}", author="Author A", isbn=book.isbn, publication_year=2020, total_copies=1,
+    ))
+    assert [b.id for b in search_books(db_session, word)[0]] == [book.id]
+    assert search_books(db_session, draft) == ([], None)
+
+    crud.delete_book(db_session, book.id)
+    assert search_books(db_session, word) == ([], None)
+
+
+def test_search_ignores_punctuation_and_rejects_bad_cursors(db_session):
+    assert search_books(db_session, '"*) (:') == ([], None)
+    with pytest.raises(InvalidCursor):
+        search_books(db_session, "anything", after="WyJ4IiwxXQ")  # ["x",1]
+    with pytest.raises(InvalidCursor):
+        search_books(db_session, "anything", after=encode_cursor([0.5, True]))
+
+
+def test_postgres_search_uses_indexed_expression():
+    # the planner only uses ix_books_search if the query repeats its expression verbatim
+    index = next(i for i in Book.__table__.indexes if i.name == "ix_books_search")
+    indexed = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    statement = _postgres_candidates(search_terms("harry pot"), 1000)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    document = str(book_search_document().compile(dialect=postgresql.dialect()))
+    assert document.replace("books.", "") in indexed
+    assert f"WHERE ({document}) @@ to_tsquery('simple'" in sql
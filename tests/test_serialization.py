@@ -0,0 +1,50 @@
+import uuid
+
+import pytest
+from pydantic import TypeAdapter
+
+from app import crud, schemas
+from app.db.database import SessionLocal
+from app.models.models import Book, Loan
+from app.utils import fastjson
+
+
+@pytest.fixture
+def db_session():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(fastjson, "orjson", None)
+    elif fastjson.orjson is None:
+        pytest.skip("orjson not installed")
+
+
+def _validated(model, orm_rows, next_cursor):
+    adapter = TypeAdapter(schemas.Page[model])
+    return adapter.dump_json(adapter.validate_python({"items": orm_rows, "next_cursor": next_cursor}, from_attributes=True))
+
+
+def test_fast_path_matches_validated_output(db_session, encoder):
+    book = crud.create_book(db_session, schemas.BookCreate(
+        title="Grüße aus Köln", author="Anon", isbn=f"fast-{uuid.uuid4().hex[:12]}",
+        publication_year=1999, total_copies=2,
+    ))
+    user = crud.create_user(db_session, schemas.UserCreate(name="Reader", email=f"{uuid.uuid4().hex[:12]}@example.com"))
+    returned = crud.create_loan(db_session, book.id, user.id)
+    crud.return_loan(db_session, returned.id)
+    crud.create_loan(db_session, book.id, user.id)
+
+    rows, cursor = crud.get_book_loans(db_session, book.id)
+    loans = db_session.query(Loan).filter(Loan.book_id == book.id).order_by(Loan.id).all()
+    assert fastjson.page_response(rows, cursor).body == _validated(schemas.LoanResponse, loans, cursor)
+
+    rows, cursor = crud.get_books(db_session, limit=3)
+    books = db_session.query(Book).order_by(Book.id).limit(3).all()
+    assert fastjson.page_response(rows, cursor).body == _validated(schemas.Book, books, cursor)
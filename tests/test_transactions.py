@@ -0,0 +1,83 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+
+from app import crud, schemas
+from app.crud import async_crud
+from app.crud.crud import _borrow_cte_statement
+from app.db.database import AsyncSessionLocal, SessionLocal
+from app.models.models import Book, Loan
+
+
+def _create_book(copies):
+    with SessionLocal() as db:
+        book = crud.create_book(db, schemas.BookCreate(
+            title="Contended Book",
+            author="Author E",
+            isbn=f"race-{uuid.uuid4().hex[:12]}",
+            publication_year=2025,
+            total_copies=copies
+        ))
+        return book.id
+
+
+def _create_users(count):
+    tag = uuid.uuid4().hex[:8]
+    with SessionLocal() as db:
+        return [
+            crud.create_user(db, schemas.UserCreate(
+                name=f"Borrower {n}",
+                email=f"race-{tag}-{n}@example.com"
+            )).id
+            for n in range(count)
+        ]
+
+
+def test_parallel_borrows_never_oversell():
+    copies, attempts = 25, 200
+    book_id = _create_book(copies)
+    user_ids = _create_users(attempts)
+
+    async def borrow(user_id):
+        async with AsyncSessionLocal() as db:
+            try:
+                await async_crud.create_loan(db, book_id, user_id)
+                return True
+            except Exception:
+                return False
+
+    async def stampede():
+        return await asyncio.gather(*(borrow(user_id) for user_id in user_ids))
+
+    results = asyncio.run(stampede())
+
+    assert sum(results) == copies
+    with SessionLocal() as db:
+        assert db.get(Book, book_id).available_copies == 0
+        loans = db.scalar(select(func.count()).select_from(Loan).where(Loan.book_id == book_id))
+        assert loans == copies
+
+
+def test_return_is_single_shot():
+    book_id = _create_book(1)
+    [user_id] = _create_users(1)
+    with SessionLocal() as db:
+        loan = crud.create_loan(db, book_id, user_id)
+        crud.return_loan(db, loan.id)
+        with pytest.raises(Exception, match="Loan not valid for return"):
+            crud.return_loan(db, loan.id)
+        assert db.get(Book, book_id).available_copies == 1
+
+
+def test_postgres_borrow_is_one_statement():
+    now = datetime.utcnow()
+    sql = str(_borrow_cte_statement(1, 2, now, now).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("WITH claimed_book AS")
+    assert "available_copies >" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql  # sharded titles: pick a slot nobody holds
+    assert "RETURNING" in sql